@@ -0,0 +1,51 @@
+from fastapi import APIRouter, Header, HTTPException, status
+from pydantic import BaseModel
+from typing import Optional
+
+from services.jobs import jobs
+from services.maintenance import check_admin_key, start_password_reset
+
+# Modelo para el restablecimiento masivo de contraseñas
+class PasswordResetRequest(BaseModel):
+    new_password: str
+    role: Optional[str] = None          # shortname del rol
+    course_id: Optional[int] = None     # usuarios matriculados en el curso
+    institution: Optional[str] = None
+    department: Optional[str] = None
+
+
+router = APIRouter(
+    prefix="/api/admin",
+    tags=["admin"],
+)
+
+
+# ----- MANTENIMIENTO (requiere la cabecera X-Admin-Key) ----- #
+
+@router.post("/passwords/reset", status_code=status.HTTP_202_ACCEPTED)
+async def reset_passwords(reset: PasswordResetRequest, x_admin_key: str = Header(...)):
+    check_admin_key(x_admin_key)
+    job = await start_password_reset(
+        reset.new_password,
+        role=reset.role,
+        course_id=reset.course_id,
+        institution=reset.institution,
+        department=reset.department
+    )
+    return job.snapshot()
+
+@router.get("/jobs")
+async def list_jobs(x_admin_key: str = Header(...)):
+    check_admin_key(x_admin_key)
+    return [job.snapshot() for job in jobs.list()]
+
+@router.get("/jobs/{job_id}")
+async def get_job(job_id: str, x_admin_key: str = Header(...)):
+    check_admin_key(x_admin_key)
+    job = jobs.get(job_id)
+    if not job:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Job not found"
+        )
+    return job.snapshot()
@@ -1,9 +1,12 @@
 
-from fastapi import APIRouter, HTTPException, status
+from fastapi import APIRouter, HTTPException, Request, status
 from typing import List, Optional
 from datetime import datetime
-import bcrypt
 from db import prisma_client as prisma
+from exceptions import NotFoundError
+from services import cascade
+from services.http_cache import collection_response
+from services.response_cache import entity_tag, purge
 
 from models.base import AssignmentBase, AssignmentResponse
 
@@ -13,6 +16,10 @@ router = APIRouter(
     responses={404: {"description": "Not found"}}
 )
 
+# Las tareas y sus fechas de entrega deben verse al instante: siempre se
+# revalida, pero sin cambios la respuesta es un 304 sin cuerpo
+CACHE_CONTROL = "private, no-cache"
+
 
 
 # ----- OPERACIONES CRUD PARA ASSIGNACIONES ----- #
@@ -85,6 +92,7 @@ async def create_assignment(
                 }
             )
         
+        purge("Assignment")
         return new_assignment
     except Exception as e:
         raise HTTPException(
@@ -93,7 +101,7 @@ async def create_assignment(
         )
 
 @router.get("/courses/{course_id}/assignments", response_model=List[AssignmentResponse])
-async def get_course_assignments(course_id: int):
+async def get_course_assignments(course_id: int, request: Request):
     # Verificar si el curso existe
     course = await prisma.course.find_unique(where={"id": course_id})
     if not course:
@@ -103,9 +111,9 @@ async def get_course_assignments(course_id: int):
         )
     
     # Obtener las tareas del curso
-    assignments = await prisma.assignment.find_many(where={"course": course_id})
+    assignments = await prisma.assignment.find_many(where={"course": course_id}, order={"id": "asc"})
     
-    return assignments
+    return collection_response(request, AssignmentResponse, assignments, CACHE_CONTROL)
 
 @router.get("/assignments/{assignment_id}", response_model=AssignmentResponse)
 async def get_assignment(assignment_id: int):
@@ -155,6 +163,7 @@ async def update_assignment(assignment_id: int, assignment: AssignmentBase):
                     }
                 )
         
+        purge(entity_tag("Assignment", assignment_id))
         return updated_assignment
     except Exception as e:
         raise HTTPException(
@@ -165,30 +174,15 @@ async def update_assignment(assignment_id: int, assignment: AssignmentBase):
 @router.delete("/assignments/{assignment_id}", response_model=AssignmentResponse)
 async def delete_assignment(assignment_id: int):
     try:
-        # Eliminar las entregas asociadas
-        await prisma.submission.delete_many(
-            where={"assignment": assignment_id}
-        )
-        
-        # Eliminar el ítem de calificación si existe
-        grade_item = await prisma.gradeitem.find_first(
-            where={
-                "itemmodule": "assign",
-                "iteminstance": assignment_id
-            }
-        )
-        
-        if grade_item:
-            await prisma.gradeitem.delete(
-                where={"id": grade_item.id}
-            )
-        
-        # Eliminar la tarea
-        deleted_assignment = await prisma.assignment.delete(
-            where={"id": assignment_id}
-        )
-        
+        # Calificaciones, ítem de calificación, entregas y tarea en una transacción
+        deleted_assignment = await cascade.delete_assignment(assignment_id)
+        purge("Assignment")
         return deleted_assignment
+    except NotFoundError as e:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=e.message
+        )
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
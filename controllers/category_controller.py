@@ -2,8 +2,11 @@
 from fastapi import APIRouter, HTTPException, status
 from typing import List, Optional
 from datetime import datetime
-import bcrypt
 from db import prisma_client as prisma
+from exceptions import ConflictError, NotFoundError
+from services import cascade
+from services.reference_data import get_categories as get_cached_categories, get_category as get_cached_category, invalidate_categories
+from services.response_cache import entity_tag, purge
 
 from models.base import CategoryBase, CategoryResponse
 
@@ -32,7 +35,8 @@ async def create_category(category: CategoryBase):
                 "path": category.path
             }
         )
-        
+        invalidate_categories()
+        purge("Category")
         return new_category
     except Exception as e:
         raise HTTPException(
@@ -42,16 +46,12 @@ async def create_category(category: CategoryBase):
 
 @router.get("/categories", response_model=List[CategoryResponse])
 async def get_categories(parent: Optional[int] = None):
-    if parent is not None:
-        categories = await prisma.category.find_many(where={"parent": parent})
-    else:
-        categories = await prisma.category.find_many()
-    
+    categories = await get_cached_categories(parent)
     return categories
 
 @router.get("/categories/{category_id}", response_model=CategoryResponse)
 async def get_category(category_id: int):
-    category = await prisma.category.find_unique(where={"id": category_id})
+    category = await get_cached_category(category_id)
     
     if not category:
         raise HTTPException(
@@ -79,7 +79,8 @@ async def update_category(category_id: int, category: CategoryBase):
                 "path": category.path
             }
         )
-        
+        invalidate_categories()
+        purge(entity_tag("Category", category_id))
         return updated_category
     except Exception as e:
         raise HTTPException(
@@ -90,22 +91,21 @@ async def update_category(category_id: int, category: CategoryBase):
 @router.delete("/categories/{category_id}", response_model=CategoryResponse)
 async def delete_category(category_id: int):
     try:
-        # Verificar si hay cursos asociados
-        category_courses = await prisma.categorycourse.find_many(
-            where={"categoryId": category_id}
+        # La verificación de cursos asociados y el borrado van en una transacción
+        deleted_category = await cascade.delete_category(category_id)
+        invalidate_categories()
+        purge("Category")
+        return deleted_category
+    except NotFoundError as e:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=e.message
         )
-        
-        if category_courses:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="Cannot delete category with associated courses"
-            )
-        
-        deleted_category = await prisma.category.delete(
-            where={"id": category_id}
+    except ConflictError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=e.message
         )
-        
-        return deleted_category
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
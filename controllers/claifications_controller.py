@@ -6,6 +6,7 @@ from datetime import datetime
 from db import prisma_client as prisma
 
 from models.base import GradeBase, GradeResponse, GradeItemResponse
+from services.pubsub import GRADE_PUBLISHED, publish_record
 
 router = APIRouter(
     prefix="/api",
@@ -55,6 +56,7 @@ async def create_grade(course_id: int, grade: GradeBase):
                     "timemodified": now
                 }
             )
+            await publish_record(GRADE_PUBLISHED, updated_grade.userid, updated_grade)
             return updated_grade
         else:
             # Crear una nueva calificación
@@ -72,6 +74,7 @@ async def create_grade(course_id: int, grade: GradeBase):
                     "timemodified": now
                 }
             )
+            await publish_record(GRADE_PUBLISHED, new_grade.userid, new_grade)
             return new_grade
     except Exception as e:
         raise HTTPException(
@@ -155,6 +158,7 @@ async def update_grade(grade_id: int, grade: GradeBase):
                 "timemodified": datetime.utcnow()
             }
         )
+        await publish_record(GRADE_PUBLISHED, updated_grade.userid, updated_grade)
         
         return updated_grade
     except Exception as e:
@@ -1,11 +1,16 @@
 
 
-from fastapi import APIRouter, HTTPException, status
+from fastapi import APIRouter, HTTPException, Query, Request, Response, status
 from typing import List, Optional
 from datetime import datetime
 from db import prisma_client as prisma
+from exceptions import NotFoundError
+from services import courses as course_service
+from services.http_cache import entity_response
+from services.response_cache import entity_tag, purge
+from services.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, fetch_page, set_next_page_header
 
-from models.base import CourseBase, CourseResponse
+from models.base import CourseBase, CourseCreate, CourseResponse
 
 router = APIRouter(
     prefix="/api",
@@ -13,73 +18,62 @@ router = APIRouter(
     responses={404: {"description": "Not found"}}
 )
 
+# Los cursos cambian poco: el navegador puede reutilizar la respuesta un minuto
+# y después revalidarla con ETag / Last-Modified
+CACHE_CONTROL = "private, max-age=60, must-revalidate"
+
 
 # ----- OPERACIONES CRUD PARA CURSOS ----- #
 
 @router.post("/courses", response_model=CourseResponse)
-async def create_course(course: CourseBase):
+async def create_course(course: CourseCreate):
     try:
-        # Verificar si la categoría existe
-        category = await prisma.category.find_unique(where={"id": course.category})
-        if not category:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="Category does not exist"
-            )
-        
-        # Crear el curso
-        now = datetime.utcnow()
-        new_course = await prisma.course.create(
-            data={
-                "category": course.category,
-                "sortorder": course.sortorder,
-                "fullname": course.fullname,
-                "shortname": course.shortname,
-                "idnumber": course.idnumber,
-                "summary": course.summary,
-                "format": course.format,
-                "showgrades": True,
-                "newsitems": 5,
-                "startdate": course.startdate,
-                "enddate": course.enddate,
-                "visible": course.visible,
-                "groupmode": 0,
-                "timecreated": now,
-                "timemodified": now
-            }
+        # Curso, categoría, secciones y contenido de plantilla en una transacción
+        return await course_service.create_course(course)
+    except NotFoundError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=e.message
         )
-        
-        # Crear la relación con la categoría
-        await prisma.categorycourse.create(
-            data={
-                "categoryId": course.category,
-                "courseId": new_course.id
-            }
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Error creating course: {str(e)}"
         )
-        
-        # Crear sección inicial del curso
-        await prisma.coursesection.create(
-            data={
-                "course": new_course.id,
-                "section": 0,
-                "name": "General",
-                "summary": "Sección general",
-                "visible": True,
-                "timemodified": now
-            }
+
+@router.post("/courses/batch", response_model=List[CourseResponse])
+async def create_courses_batch(courses: List[CourseCreate]):
+    if not courses:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="No courses to create"
+        )
+    if len(courses) > course_service.COURSE_BATCH_MAX:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"At most {course_service.COURSE_BATCH_MAX} courses per batch"
+        )
+    try:
+        # Todo el catálogo en una transacción: se crean todos los cursos o ninguno
+        return await course_service.create_courses(courses)
+    except NotFoundError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=e.message
         )
-        
-        return new_course
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
-            detail=f"Error creating course: {str(e)}"
+            detail=f"Error creating courses: {str(e)}"
         )
 
 @router.get("/courses", response_model=List[CourseResponse])
 async def get_courses(
+    response: Response,
     category: Optional[int] = None,
-    visible_only: bool = True
+    visible_only: bool = True,
+    after: Optional[int] = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE)
 ):
     # Construir condiciones de búsqueda
     where_conditions = {}
@@ -88,12 +82,14 @@ async def get_courses(
     if visible_only:
         where_conditions["visible"] = True
     
-    courses = await prisma.course.find_many(where=where_conditions)
+    # Paginación por id: ?after=<último id recibido>&limit=<tamaño>
+    courses, has_next = await fetch_page(prisma.course, where_conditions, after, limit)
+    set_next_page_header(response, courses, has_next)
     
     return courses
 
 @router.get("/courses/{course_id}", response_model=CourseResponse)
-async def get_course(course_id: int):
+async def get_course(course_id: int, request: Request):
     course = await prisma.course.find_unique(where={"id": course_id})
     
     if not course:
@@ -102,7 +98,7 @@ async def get_course(course_id: int):
             detail="Course not found"
         )
     
-    return course
+    return entity_response(request, CourseResponse, course, CACHE_CONTROL)
 
 @router.put("/courses/{course_id}", response_model=CourseResponse)
 async def update_course(course_id: int, course: CourseBase):
@@ -132,7 +128,7 @@ async def update_course(course_id: int, course: CourseBase):
                 "timemodified": datetime.utcnow()
             }
         )
-        
+        purge(entity_tag("Course", course_id))
         return updated_course
     except Exception as e:
         raise HTTPException(
@@ -151,7 +147,8 @@ async def delete_course(course_id: int):
                 "timemodified": datetime.utcnow()
             }
         )
-        
+        # Deja de aparecer en los listados de cursos visibles
+        purge("Course")
         return deleted_course
     except Exception as e:
         raise HTTPException(
@@ -1,10 +1,11 @@
 
-from fastapi import APIRouter, HTTPException, status
+from fastapi import APIRouter, HTTPException, Request, status
 from typing import List, Optional
 from datetime import datetime
 from db import prisma_client as prisma
 
 from models.base import EnrollmentBase, EnrollmentResponse
+from services.bulk_import import BULK_CHUNK_SIZE, BULK_LOOKUP_SIZE, chunked, read_rows, row_report, summarize, validate_row
 
 router = APIRouter(
     prefix="/api",
@@ -80,6 +81,103 @@ async def create_enrollment(enrollment: EnrollmentBase):
             detail=f"Error creating enrollment: {str(e)}"
         )
 
+async def _existing_ids(model, ids: List[int]) -> set:
+    # Validación por conjuntos: una consulta IN por bloque en lugar de una por fila
+    found = set()
+    for ids_chunk in chunked(ids, BULK_LOOKUP_SIZE):
+        records = await model.find_many(where={"id": {"in": list(ids_chunk)}})
+        found.update(record.id for record in records)
+    return found
+
+
+async def _enrolled_pairs(user_ids: List[int], course_ids: List[int]) -> set:
+    # Una sola búsqueda de las matrículas existentes de estos usuarios en estos cursos
+    pairs = set()
+    for users_chunk in chunked(user_ids, BULK_LOOKUP_SIZE):
+        enrollments = await prisma.enrollment.find_many(
+            where={"userid": {"in": list(users_chunk)}, "courseid": {"in": course_ids}}
+        )
+        pairs.update((enrollment.userid, enrollment.courseid) for enrollment in enrollments)
+    return pairs
+
+
+@router.post("/enrollments/bulk")
+async def bulk_create_enrollments(request: Request):
+    # Acepta una lista JSON o un CSV (userid,courseid,enrolid,status,timestart,timeend)
+    rows = await read_rows(request)
+    
+    report = [None] * len(rows)
+    valid = []
+    for index, row in enumerate(rows):
+        enrollment, error = validate_row(EnrollmentBase, row)
+        if error:
+            report[index] = row_report(index, "error", error)
+        else:
+            valid.append((index, enrollment))
+    
+    user_ids = sorted({enrollment.userid for _, enrollment in valid})
+    course_ids = sorted({enrollment.courseid for _, enrollment in valid})
+    existing_users = await _existing_ids(prisma.user, user_ids)
+    existing_courses = await _existing_ids(prisma.course, course_ids)
+    enrolled = await _enrolled_pairs(
+        [user_id for user_id in user_ids if user_id in existing_users],
+        [course_id for course_id in course_ids if course_id in existing_courses]
+    )
+    
+    pending = []
+    batch_pairs = set()
+    for index, enrollment in valid:
+        pair = (enrollment.userid, enrollment.courseid)
+        fields = {"userid": enrollment.userid, "courseid": enrollment.courseid}
+        if enrollment.courseid not in existing_courses:
+            report[index] = row_report(index, "error", "Course not found", **fields)
+        elif enrollment.userid not in existing_users:
+            report[index] = row_report(index, "error", "User not found", **fields)
+        elif pair in enrolled:
+            report[index] = row_report(index, "skipped", "User is already enrolled in this course", **fields)
+        elif pair in batch_pairs:
+            report[index] = row_report(index, "skipped", "Duplicate row in this import", **fields)
+        else:
+            batch_pairs.add(pair)
+            pending.append((index, enrollment))
+    
+    # Matrículas y registros de compleción por bloques, cada bloque en su transacción
+    now = datetime.utcnow()
+    for batch in chunked(pending, BULK_CHUNK_SIZE):
+        try:
+            async with prisma.tx() as transaction:
+                await transaction.enrollment.create_many(data=[
+                    {
+                        "enrolid": enrollment.enrolid,
+                        "userid": enrollment.userid,
+                        "courseid": enrollment.courseid,
+                        "status": enrollment.status,
+                        "timestart": enrollment.timestart,
+                        "timeend": enrollment.timeend,
+                        "timecreated": now,
+                        "timemodified": now
+                    }
+                    for _, enrollment in batch
+                ])
+                await transaction.coursecompletion.create_many(data=[
+                    {
+                        "userid": enrollment.userid,
+                        "course": enrollment.courseid,
+                        "timeenrolled": now,
+                        "timestarted": now
+                    }
+                    for _, enrollment in batch
+                ])
+            result, detail = "created", None
+        except Exception as e:
+            result, detail = "error", f"Error creating enrollment: {str(e)}"
+        for index, enrollment in batch:
+            report[index] = row_report(
+                index, result, detail, userid=enrollment.userid, courseid=enrollment.courseid
+            )
+    
+    return {"summary": summarize(report), "rows": report}
+
 @router.get("/courses/{course_id}/enrollments", response_model=List[EnrollmentResponse])
 async def get_course_enrollments(course_id: int):
     # Verificar si el curso existe
@@ -1,11 +1,34 @@
-from fastapi import APIRouter, HTTPException, UploadFile, File, Form, status
-from fastapi.responses import FileResponse
+from fastapi import APIRouter, HTTPException, Query, Request, UploadFile, File, Form, status
+from fastapi.responses import StreamingResponse
+from starlette.concurrency import run_in_threadpool
 from typing import Optional, List
 import os
-import shutil
 from datetime import datetime
 import uuid
 from db import prisma_client as prisma
+from models.base import UploadSessionCreate
+from services.reference_data import TEACHER_ROLES, user_has_role
+from services.archives import ArchiveEntry, secure_name, stream_zip, unique_names
+from services.downloads import file_download
+from services.pubsub import SUBMISSION_RECEIVED, publish_record
+from services.thumbnails import (
+    THUMBNAIL_MEDIA_TYPE,
+    THUMBNAIL_SIZES,
+    generate_thumbnails,
+    thumbnail_path,
+    thumbnail_paths,
+    thumbnail_size,
+)
+from services.upload_sessions import (
+    abort_completion,
+    begin_completion,
+    create_session,
+    discard_session,
+    get_session,
+    save_chunk,
+    session_status,
+)
+from services.uploads import assemble_upload, save_upload
 
 # Configurar la ruta para almacenar archivos
 UPLOAD_DIR = "uploads"
@@ -29,13 +52,82 @@ router = APIRouter(
     responses={404: {"description": "Not found"}},
 )
 
-# Endpoint para subir archivos de tareas
-@router.post("/assignment/{assignment_id}")
-async def upload_assignment_file(
-    assignment_id: int,
-    user_id: int,
-    file: UploadFile = File(...),
-):
+
+def _file_record(component: str, stored, filename: str, mimetype: Optional[str], user_id: int, now: datetime) -> dict:
+    # Metadatos del archivo guardado; la ruta se almacena relativa a UPLOAD_DIR
+    return {
+        "component": component,
+        "path": os.path.relpath(stored.path, UPLOAD_DIR),
+        "filename": filename,
+        "filesize": stored.size,
+        "contenthash": stored.sha256,
+        "mimetype": mimetype,
+        "userid": user_id,
+        "timecreated": now,
+    }
+
+
+def _stored_path(file_record) -> str:
+    return os.path.join(UPLOAD_DIR, file_record.path)
+
+
+def _remove_file(path: str) -> None:
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+def _remove_profile_files(path: str) -> None:
+    for file_path in [path, *thumbnail_paths(path)]:
+        _remove_file(file_path)
+
+
+async def _create_submission_with_file(assignment_id: int, user_id: int, stored, filename: str, mimetype: Optional[str]):
+    now = datetime.utcnow()
+    submission_data = {
+        "assignment": assignment_id,
+        "userid": user_id,
+        "timecreated": now,
+        "timemodified": now,
+        "status": "submitted",
+        "attemptnumber": 0,
+        "latest": True
+    }
+    
+    # La entrega y sus metadatos se guardan en una sola transacción
+    async with prisma.tx() as transaction:
+        # Buscar la entrega previa más reciente
+        existing_submission = await transaction.submission.find_first(
+            where={
+                "assignment": assignment_id,
+                "userid": user_id
+            },
+            order={"attemptnumber": "desc"}
+        )
+        
+        if existing_submission:
+            # Marcar la última entrega como no actual
+            await transaction.submission.update_many(
+                where={
+                    "assignment": assignment_id,
+                    "userid": user_id
+                },
+                data={"latest": False}
+            )
+            
+            # Incrementar el número de intento
+            submission_data["attemptnumber"] = existing_submission.attemptnumber + 1
+        
+        # Crear la nueva entrega con el archivo asociado
+        new_submission = await transaction.submission.create(data=submission_data)
+        file_data = _file_record("assignment", stored, filename, mimetype, user_id, now)
+        file_data["submissionid"] = new_submission.id
+        await transaction.file.create(data=file_data)
+    
+    return new_submission
+
+async def _check_can_submit(assignment_id: int, user_id: int):
     # Verificar si la tarea existe
     assignment = await prisma.assignment.find_unique(where={"id": assignment_id})
     if not assignment:
@@ -57,66 +149,155 @@ async def upload_assignment_file(
     if not enrollment:
         raise HTTPException(status_code=403, detail="User not enrolled in this course")
     
-    # Crear un nombre único para el archivo
-    file_extension = os.path.splitext(file.filename)[1]
+    return assignment
+
+
+def _submission_file_path(assignment_id: int, user_id: int, filename: str):
+    # Crear un nombre único para el archivo (el directorio de la tarea se crea al guardar)
+    file_extension = os.path.splitext(filename)[1]
     unique_filename = f"{uuid.uuid4()}{file_extension}"
-    
-    # Crear directorio para la tarea si no existe
     assignment_submission_dir = os.path.join(ASSIGNMENT_DIR, str(assignment_id), str(user_id))
-    if not os.path.exists(assignment_submission_dir):
-        os.makedirs(assignment_submission_dir)
-    
-    # Guardar el archivo
-    file_path = os.path.join(assignment_submission_dir, unique_filename)
-    with open(file_path, "wb") as buffer:
-        shutil.copyfileobj(file.file, buffer)
-    
-    # Crear o actualizar la entrega en la base de datos
-    now = datetime.utcnow()
-    submission_data = {
-        "assignment": assignment_id,
-        "userid": user_id,
-        "timecreated": now,
-        "timemodified": now,
-        "status": "submitted",
-        "attemptnumber": 0,
-        "latest": True
-    }
-    
-    # Buscar entregas previas
-    existing_submission = await prisma.submission.find_first(
-        where={
-            "assignment": assignment_id,
-            "userid": user_id
-        }
-    )
-    
-    if existing_submission:
-        # Marcar la última entrega como no actual
-        await prisma.submission.update_many(
-            where={
-                "assignment": assignment_id,
-                "userid": user_id
-            },
-            data={"latest": False}
-        )
-        
-        # Incrementar el número de intento
-        submission_data["attemptnumber"] = existing_submission.attemptnumber + 1
-    
-    # Crear la nueva entrega
-    new_submission = await prisma.submission.create(data=submission_data)
+    return unique_filename, os.path.join(assignment_submission_dir, unique_filename)
+
+
+async def _submit_file(assignment_id: int, user_id: int, filename: str, mimetype: Optional[str], unique_filename: str, stored):
+    # Crear la entrega en la base de datos junto con los metadatos del archivo
+    new_submission = await _create_submission_with_file(assignment_id, user_id, stored, filename, mimetype)
+    await publish_record(SUBMISSION_RECEIVED, assignment_id, new_submission)
     
     return {
-        "filename": file.filename,
+        "filename": filename,
         "stored_filename": unique_filename,
+        "size": stored.size,
+        "sha256": stored.sha256,
         "submission_id": new_submission.id,
         "message": "File uploaded successfully"
     }
 
+# Endpoint para subir archivos de tareas
+@router.post("/assignment/{assignment_id}")
+async def upload_assignment_file(
+    assignment_id: int,
+    user_id: int,
+    file: UploadFile = File(...),
+):
+    await _check_can_submit(assignment_id, user_id)
+    
+    # Guardar el archivo
+    unique_filename, file_path = _submission_file_path(assignment_id, user_id, file.filename)
+    stored = await save_upload(file, file_path, "assignment")
+    
+    return await _submit_file(assignment_id, user_id, file.filename, file.content_type, unique_filename, stored)
+
+# Subidas reanudables: crear sesión, enviar bloques, consultar estado y completar
+@router.post("/assignment/{assignment_id}/uploads", status_code=status.HTTP_201_CREATED)
+async def create_assignment_upload(assignment_id: int, user_id: int, upload: UploadSessionCreate):
+    await _check_can_submit(assignment_id, user_id)
+    
+    session = await create_session(
+        "assignment",
+        {"assignment_id": assignment_id, "user_id": user_id},
+        upload.filename,
+        upload.size,
+        upload.content_type
+    )
+    return await session_status(session)
+
+@router.put("/uploads/{upload_id}/chunks/{index}")
+async def upload_chunk(upload_id: str, index: int, request: Request):
+    session = await get_session(upload_id)
+    size = await save_chunk(session, index, request)
+    return {"upload_id": upload_id, "index": index, "size": size}
+
+@router.get("/uploads/{upload_id}")
+async def get_upload_status(upload_id: str):
+    session = await get_session(upload_id)
+    return await session_status(session)
+
+@router.post("/uploads/{upload_id}/complete")
+async def complete_upload(upload_id: str):
+    session = await get_session(upload_id)
+    assignment_id, user_id = session["assignment_id"], session["user_id"]
+    
+    chunk_paths = await begin_completion(session)
+    stored = None
+    try:
+        # La matrícula pudo cambiar desde que se creó la sesión
+        await _check_can_submit(assignment_id, user_id)
+        unique_filename, file_path = _submission_file_path(assignment_id, user_id, session["filename"])
+        stored = await assemble_upload(chunk_paths, file_path, "assignment")
+        result = await _submit_file(
+            assignment_id, user_id, session["filename"], session["content_type"], unique_filename, stored
+        )
+    except BaseException:
+        # Los bloques se conservan para poder reintentar
+        if stored is not None:
+            await run_in_threadpool(_remove_file, stored.path)
+        await abort_completion(session)
+        raise
+    
+    await discard_session(session)
+    return result
+
+@router.delete("/uploads/{upload_id}")
+async def cancel_upload(upload_id: str):
+    session = await get_session(upload_id)
+    await discard_session(session)
+    return {"message": "Upload cancelled"}
+
+# Endpoint para exportar en un ZIP las entregas actuales de una tarea
+# (se declara antes de la descarga individual para que "export" no se tome como submission_id)
+@router.get("/assignment/{assignment_id}/export")
+async def export_assignment_submissions(assignment_id: int, user_id: int):
+    assignment = await prisma.assignment.find_unique(where={"id": assignment_id})
+    if not assignment:
+        raise HTTPException(status_code=404, detail="Assignment not found")
+
+    # Una sola verificación de permisos para todo el lote
+    is_teacher = await user_has_role(user_id, assignment.course, TEACHER_ROLES)
+    if not is_teacher:
+        raise HTTPException(status_code=403, detail="Not authorized to export submissions")
+
+    # Entregas actuales con su usuario y su archivo más reciente en una sola consulta
+    submissions = await prisma.submission.find_many(
+        where={"assignment": assignment_id, "latest": True},
+        include={
+            "user": True,
+            "files": {"order_by": {"id": "desc"}, "take": 1}
+        },
+        order={"userid": "asc"}
+    )
+    submissions = [submission for submission in submissions if submission.files]
+    if not submissions:
+        raise HTTPException(status_code=404, detail="No submission files found")
+
+    # Nombres por entrada: usuario_intento.ext
+    names = unique_names(
+        f"{secure_name(submission.user.username)}_{submission.attemptnumber}"
+        f"{os.path.splitext(submission.files[0].filename)[1]}"
+        for submission in submissions
+    )
+    entries = [
+        ArchiveEntry(
+            name=name,
+            path=_stored_path(submission.files[0]),
+            size=submission.files[0].filesize,
+            modified=submission.timemodified,
+            mimetype=submission.files[0].mimetype
+        )
+        for name, submission in zip(names, submissions)
+    ]
+
+    return StreamingResponse(
+        stream_zip(entries),
+        media_type="application/zip",
+        headers={"Content-Disposition": f'attachment; filename="assignment_{assignment_id}_submissions.zip"'}
+    )
+
 # Endpoint para descargar archivo de tarea
 @router.get("/assignment/{assignment_id}/{submission_id}")
 async def download_assignment_file(
+    request: Request,
     assignment_id: int,
     submission_id: int,
     user_id: int = None
@@ -133,40 +314,27 @@ async def download_assignment_file(
         if not assignment:
             raise HTTPException(status_code=404, detail="Assignment not found")
         
-        # Obtener roles del usuario en el contexto del curso
-        user_roles = await prisma.userrole.find_many(
-            where={
-                "userid": user_id,
-                "contextid": assignment.course  # Asumiendo que contextid representa el curso
-            },
-            include={"role": True}
-        )
-        
-        # Verificar si el usuario tiene rol de profesor
-        is_teacher = False
-        for user_role in user_roles:
-            if user_role.role.shortname in ["teacher", "editingteacher"]:
-                is_teacher = True
-                break
+        # Verificar si el usuario tiene rol de profesor en el contexto del curso
+        # (contextid representa el curso)
+        is_teacher = await user_has_role(user_id, assignment.course, TEACHER_ROLES)
         
         if not is_teacher:
             raise HTTPException(status_code=403, detail="Not authorized to access this submission")
     
-    # Buscar el archivo en el directorio
-    submission_dir = os.path.join(ASSIGNMENT_DIR, str(assignment_id), str(submission.userid))
-    
-    # Obtener el archivo más reciente (podría mejorarse para manejar múltiples archivos)
-    files = os.listdir(submission_dir) if os.path.exists(submission_dir) else []
-    if not files:
+    # Archivo asociado a esta entrega (búsqueda por índice en mdl_files)
+    stored_file = await prisma.file.find_first(
+        where={"submissionid": submission_id},
+        order={"id": "desc"}
+    )
+    if not stored_file:
         raise HTTPException(status_code=404, detail="No submission files found")
     
-    # Ordenar por fecha de modificación para obtener el más reciente
-    files.sort(key=lambda x: os.path.getmtime(os.path.join(submission_dir, x)), reverse=True)
-    latest_file = files[0]
-    
-    return FileResponse(
-        path=os.path.join(submission_dir, latest_file),
-        filename=f"submission_{submission_id}_{latest_file}"
+    # Soporta Range/If-Range para reanudar descargas
+    return file_download(
+        request,
+        _stored_path(stored_file),
+        stored_file,
+        filename=f"submission_{submission_id}_{stored_file.filename}"
     )
 
 # Endpoint para subir recursos del curso
@@ -188,21 +356,8 @@ async def upload_resource_file(
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     
-    # Verificar si el usuario tiene permisos para subir recursos
-    user_roles = await prisma.userrole.find_many(
-        where={
-            "userid": user_id,
-            "contextid": course_id  # Asumiendo que contextid representa el curso
-        },
-        include={"role": True}
-    )
-    
-    # Verificar si el usuario tiene rol de profesor
-    is_teacher = False
-    for user_role in user_roles:
-        if user_role.role.shortname in ["teacher", "editingteacher"]:
-            is_teacher = True
-            break
+    # Verificar si el usuario tiene rol de profesor para subir recursos
+    is_teacher = await user_has_role(user_id, course_id, TEACHER_ROLES)
     
     if not is_teacher:
         raise HTTPException(status_code=403, detail="Not authorized to upload resources")
@@ -211,57 +366,56 @@ async def upload_resource_file(
     file_extension = os.path.splitext(file.filename)[1]
     unique_filename = f"{uuid.uuid4()}{file_extension}"
     
-    # Crear directorio para el recurso si no existe
+    # Guardar el archivo (el directorio del curso se crea si no existe)
     resource_course_dir = os.path.join(RESOURCE_DIR, str(course_id))
-    if not os.path.exists(resource_course_dir):
-        os.makedirs(resource_course_dir)
-    
-    # Guardar el archivo
     file_path = os.path.join(resource_course_dir, unique_filename)
-    with open(file_path, "wb") as buffer:
-        shutil.copyfileobj(file.file, buffer)
+    stored = await save_upload(file, file_path, "resource")
     
-    # Crear el recurso en la base de datos
+    # Crear el recurso en la base de datos junto con los metadatos del archivo
     now = datetime.utcnow()
-    new_resource = await prisma.resource.create(data={
-        "course": course_id,
-        "name": name,
-        "intro": description,
-        "introformat": 1,  # Formato básico
-        "timemodified": now
-    })
+    async with prisma.tx() as transaction:
+        new_resource = await transaction.resource.create(data={
+            "course": course_id,
+            "name": name,
+            "intro": description,
+            "introformat": 1,  # Formato básico
+            "timemodified": now
+        })
+        file_data = _file_record("resource", stored, file.filename, file.content_type, user_id, now)
+        file_data["resourceid"] = new_resource.id
+        await transaction.file.create(data=file_data)
     
     return {
         "resource_id": new_resource.id,
         "filename": file.filename,
         "stored_filename": unique_filename,
+        "size": stored.size,
+        "sha256": stored.sha256,
         "message": "Resource uploaded successfully"
     }
 
 # Endpoint para descargar recursos del curso
 @router.get("/resource/{resource_id}")
-async def download_resource_file(resource_id: int):
+async def download_resource_file(request: Request, resource_id: int):
     # Verificar si el recurso existe
     resource = await prisma.resource.find_unique(where={"id": resource_id})
     if not resource:
         raise HTTPException(status_code=404, detail="Resource not found")
     
-    # Buscar el archivo en el directorio
-    resource_dir = os.path.join(RESOURCE_DIR, str(resource.course))
-    
-    # En un sistema real, habría una tabla que asocia recursos con sus archivos
-    # Aquí, simplemente buscamos el archivo más reciente
-    files = os.listdir(resource_dir) if os.path.exists(resource_dir) else []
-    if not files:
+    # Archivo asociado a este recurso (búsqueda por índice en mdl_files)
+    stored_file = await prisma.file.find_first(
+        where={"resourceid": resource_id},
+        order={"id": "desc"}
+    )
+    if not stored_file:
         raise HTTPException(status_code=404, detail="No resource files found")
     
-    # Ordenar por fecha de modificación para obtener el más reciente
-    files.sort(key=lambda x: os.path.getmtime(os.path.join(resource_dir, x)), reverse=True)
-    latest_file = files[0]
-    
-    return FileResponse(
-        path=os.path.join(resource_dir, latest_file),
-        filename=f"resource_{resource_id}_{latest_file}"
+    # Soporta Range/If-Range para reanudar descargas y buscar en videos
+    return file_download(
+        request,
+        _stored_path(stored_file),
+        stored_file,
+        filename=f"resource_{resource_id}_{stored_file.filename}"
     )
 
 # Endpoint para subir imagen de perfil
@@ -280,46 +434,75 @@ async def upload_profile_image(
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     
-    # Crear un nombre único para el archivo
+    # Crear un nombre único para el archivo (evita pisar la imagen que se está sirviendo)
     file_extension = os.path.splitext(file.filename)[1]
-    unique_filename = f"profile_{user_id}{file_extension}"
+    unique_filename = f"profile_{user_id}_{uuid.uuid4().hex}{file_extension}"
     
     # Guardar el archivo
     user_profile_dir = os.path.join(PROFILE_DIR, str(user_id))
-    if not os.path.exists(user_profile_dir):
-        os.makedirs(user_profile_dir)
-    
     file_path = os.path.join(user_profile_dir, unique_filename)
-    with open(file_path, "wb") as buffer:
-        shutil.copyfileobj(file.file, buffer)
+    stored = await save_upload(file, file_path, "profile")
+    
+    # Generar las miniaturas en el pool de procesos; si la imagen no se puede
+    # decodificar se descarta la subida
+    try:
+        await generate_thumbnails(stored.path)
+    except HTTPException:
+        await run_in_threadpool(_remove_profile_files, stored.path)
+        raise
+    
+    # Reemplazar los metadatos de la imagen anterior
+    now = datetime.utcnow()
+    async with prisma.tx() as transaction:
+        previous_files = await transaction.file.find_many(
+            where={"userid": user_id, "component": "profile"}
+        )
+        await transaction.file.delete_many(
+            where={"userid": user_id, "component": "profile"}
+        )
+        await transaction.file.create(data=_file_record("profile", stored, file.filename, file.content_type, user_id, now))
+    
+    # Borrar del disco las imágenes anteriores y sus miniaturas
+    for previous_file in previous_files:
+        await run_in_threadpool(_remove_profile_files, _stored_path(previous_file))
     
     return {
         "filename": unique_filename,
+        "size": stored.size,
+        "thumbnails": list(THUMBNAIL_SIZES),
         "message": "Profile image uploaded successfully"
     }
 
 # Endpoint para obtener imagen de perfil
 @router.get("/profile/{user_id}")
-async def get_profile_image(user_id: int):
-    # Verificar si el usuario existe
-    user = await prisma.user.find_unique(where={"id": user_id})
-    if not user:
-        raise HTTPException(status_code=404, detail="User not found")
-    
-    # Buscar archivo de perfil del usuario
-    user_profile_dir = os.path.join(PROFILE_DIR, str(user_id))
-    
-    if not os.path.exists(user_profile_dir):
-        raise HTTPException(status_code=404, detail="Profile image not found")
-    
-    # Buscar la imagen de perfil
-    profile_files = [f for f in os.listdir(user_profile_dir) if f.startswith("profile_")]
+async def get_profile_image(request: Request, user_id: int, size: Optional[int] = Query(None, gt=0)):
+    # Imagen de perfil actual (búsqueda por índice en mdl_files)
+    profile_file = await prisma.file.find_first(
+        where={"userid": user_id, "component": "profile"},
+        order={"timecreated": "desc"}
+    )
     
-    if not profile_files:
+    if not profile_file:
+        # Verificar si el usuario existe para devolver el error correcto
+        user = await prisma.user.find_unique(where={"id": user_id})
+        if not user:
+            raise HTTPException(status_code=404, detail="User not found")
         raise HTTPException(status_code=404, detail="Profile image not found")
     
-    # Devolver la imagen más reciente
-    profile_files.sort(key=lambda x: os.path.getmtime(os.path.join(user_profile_dir, x)), reverse=True)
-    latest_profile = profile_files[0]
+    original_path = _stored_path(profile_file)
+    
+    # Con size se sirve la miniatura más chica que lo cubra
+    thumbnail = thumbnail_size(size) if size else None
+    if thumbnail is not None:
+        path = thumbnail_path(original_path, thumbnail)
+        if not await run_in_threadpool(os.path.exists, path):
+            # Imágenes subidas antes de generar miniaturas
+            try:
+                await generate_thumbnails(original_path)
+            except HTTPException:
+                return file_download(request, original_path, profile_file)
+        return file_download(
+            request, path, profile_file, variant=str(thumbnail), media_type=THUMBNAIL_MEDIA_TYPE
+        )
     
-    return FileResponse(path=os.path.join(user_profile_dir, latest_profile))
+    return file_download(request, original_path, profile_file)
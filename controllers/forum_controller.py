@@ -3,8 +3,13 @@ from fastapi import APIRouter, HTTPException, status
 from typing import List, Optional
 from datetime import datetime
 from db import prisma_client as prisma
+from exceptions import NotFoundError
+from services import cascade
+from services.pubsub import FORUM_POST_ADDED, publish_record
 
-from models.base import ForumBase, ForumResponse, ForumDiscussionBase, ForumDiscussionResponse
+from models.base import (
+    ForumBase, ForumResponse, ForumDiscussionBase, ForumDiscussionResponse, ForumPostBase, ForumPostResponse
+)
 
 router = APIRouter(
     prefix="/api",
@@ -122,28 +127,13 @@ async def update_forum(forum_id: int, forum: ForumBase):
 @router.delete("/forums/{forum_id}", response_model=ForumResponse)
 async def delete_forum(forum_id: int):
     try:
-        # Eliminar discusiones y mensajes asociados
-        discussions = await prisma.forumdiscussion.find_many(
-            where={"forum": forum_id}
-        )
-        
-        for discussion in discussions:
-            # Eliminar mensajes
-            await prisma.forumpost.delete_many(
-                where={"discussion": discussion.id}
-            )
-            
-            # Eliminar discusión
-            await prisma.forumdiscussion.delete(
-                where={"id": discussion.id}
-            )
-        
-        # Eliminar el foro
-        deleted_forum = await prisma.forum.delete(
-            where={"id": forum_id}
+        # Mensajes, discusiones y foro en una transacción con borrados por conjunto
+        return await cascade.delete_forum(forum_id)
+    except NotFoundError as e:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=e.message
         )
-        
-        return deleted_forum
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -215,10 +205,11 @@ async def create_forum_discussion(
         )
         
         # Actualizar el primer mensaje con el ID de la discusión
-        await prisma.forumpost.update(
+        first_post = await prisma.forumpost.update(
             where={"id": first_post.id},
             data={"discussion": new_discussion.id}
         )
+        await publish_record(FORUM_POST_ADDED, new_discussion.id, first_post)
         
         return new_discussion
     except Exception as e:
@@ -280,19 +271,66 @@ async def update_discussion(discussion_id: int, discussion: ForumDiscussionBase)
 @router.delete("/discussions/{discussion_id}", response_model=ForumDiscussionResponse)
 async def delete_discussion(discussion_id: int):
     try:
-        # Eliminar mensajes asociados
-        await prisma.forumpost.delete_many(
-            where={"discussion": discussion_id}
-        )
-        
-        # Eliminar la discusión
-        deleted_discussion = await prisma.forumdiscussion.delete(
-            where={"id": discussion_id}
+        # Mensajes y discusión en una transacción
+        return await cascade.delete_discussion(discussion_id)
+    except NotFoundError as e:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=e.message
         )
-        
-        return deleted_discussion
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail=f"Error deleting discussion: {str(e)}"
-        )
\ No newline at end of file
+        )
+
+# ----- MENSAJES DEL FORO ----- #
+
+@router.post("/discussions/{discussion_id}/posts", response_model=ForumPostResponse)
+async def create_forum_post(discussion_id: int, post: ForumPostBase):
+    if post.discussion != discussion_id:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Discussion ID in path does not match discussion ID in post data"
+        )
+    
+    discussion = await prisma.forumdiscussion.find_unique(where={"id": discussion_id})
+    if not discussion:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Discussion not found"
+        )
+    
+    user = await prisma.user.find_unique(where={"id": post.userid})
+    if not user:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="User not found"
+        )
+    
+    try:
+        now = datetime.utcnow()
+        new_post = await prisma.forumpost.create(
+            data={
+                "discussion": discussion_id,
+                "parent": post.parent,
+                "userid": post.userid,
+                "created": now,
+                "modified": now,
+                "subject": post.subject,
+                "message": post.message,
+                "messageformat": post.messageformat,
+                "mailed": 0,
+                "totalscore": 0,
+                "mailnow": 0
+            }
+        )
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Error creating post: {str(e)}"
+        )
+    
+    # Los suscriptores de forumPostAdded reciben el mensaje sin consultar
+    await publish_record(FORUM_POST_ADDED, discussion_id, new_post)
+    return new_post
@@ -1,9 +1,10 @@
 from fastapi import APIRouter, HTTPException, status
 from pydantic import BaseModel
-from bcrypt import checkpw
-import bcrypt
 from fastapi import Body
 from db import prisma_client
+from services.passwords import hash_password, verify_password
+from services.maintenance import check_admin_key, start_password_reset
+from services.reference_data import get_user_roles
 
 # Modelo para la solicitud de login
 class LoginRequest(BaseModel):
@@ -25,6 +26,7 @@ class LoginResponse(BaseModel):
 class BulkPasswordUpdateResponse(BaseModel):
     success: bool
     count: int = None
+    job_id: str = None
     message: str = None
 
 # Modelo para solicitud de actualización masiva
@@ -51,19 +53,16 @@ async def login(login_data: LoginRequest):
     )
     
     # Verificar si el usuario existe y la contraseña es correcta
-    if not user or not checkpw(login_data.password.encode('utf-8'), user.password.encode('utf-8')):
+    if not user or not await verify_password(login_data.password, user.password):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Credenciales incorrectas"
         )
     
-    # Obtener roles del usuario
-    user_roles = await prisma_client.userrole.find_many(
-        where={"userid": user.id},
-        include={"role": True}
-    )
+    # Obtener roles del usuario (los datos de cada rol vienen de la caché)
+    user_roles = await get_user_roles(user.id)
     
-    roles = [{"id": ur.role.id, "name": ur.role.name, "shortname": ur.role.shortname} for ur in user_roles]
+    roles = [{"id": role.id, "name": role.name, "shortname": role.shortname} for role in user_roles]
     
     
     # Devolver información del usuario
@@ -97,10 +96,10 @@ async def update_password(update_data: UpdatePasswordRequest):
         )
     
     # Actualizar la contraseña del usuario
-    hashed_new_password = bcrypt.hashpw(update_data.new_password.encode('utf-8'), bcrypt.gensalt())
+    hashed_new_password = await hash_password(update_data.new_password)
     await prisma_client.user.update(
         where={"id": user.id},
-        data={"password": hashed_new_password.decode('utf-8')}
+        data={"password": hashed_new_password}
     )
     
     return LoginResponse(
@@ -111,46 +110,15 @@ async def update_password(update_data: UpdatePasswordRequest):
 
 @router.put("/reset-all-passwords", response_model=BulkPasswordUpdateResponse)
 async def reset_all_passwords(update_data: BulkPasswordUpdateRequest):
-    # Verificar la clave de administrador (esto debería ser más seguro en producción)
-    # En un entorno real, deberías usar variables de entorno o un sistema de secretos
-    ADMIN_SECRET_KEY = "papi_claude"  # Cambia esto en producción
+    # La clave de administrador se configura con la variable ADMIN_SECRET_KEY
+    check_admin_key(update_data.admin_key)
     
-    if update_data.admin_key != ADMIN_SECRET_KEY:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Clave de administrador incorrecta"
-        )
-     
-    try:
-        # Obtener todos los usuarios
-        users = await prisma_client.user.find_many()
-        
-        # Encriptar la nueva contraseña una sola vez (todos tendrán la misma)
-        hashed_password = bcrypt.hashpw(
-            update_data.new_password.encode('utf-8'), 
-            bcrypt.gensalt()
-        ).decode('utf-8')
-        
-        # Contador de usuarios actualizados
-        updated_count = 0
-        
-        # Actualizar cada usuario individualmente
-        for user in users:
-            await prisma_client.user.update(
-                where={"id": user.id},
-                data={"password": hashed_password}
-            )
-            updated_count += 1
-        
-        return BulkPasswordUpdateResponse(
-            success=True,
-            count=updated_count,
-            message=f"Se actualizaron {updated_count} contraseñas exitosamente"
-        )
-        
-    except Exception as e:
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=f"Error al actualizar contraseñas: {str(e)}"
-        )
-    
\ No newline at end of file
+    # Un solo UPDATE por bloque de ids en segundo plano; el progreso se consulta
+    # en GET /api/admin/jobs/{job_id}
+    job = await start_password_reset(update_data.new_password)
+    
+    return BulkPasswordUpdateResponse(
+        success=True,
+        job_id=job.id,
+        message=f"Actualización de contraseñas iniciada (tarea {job.id})"
+    )
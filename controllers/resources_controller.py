@@ -1,8 +1,9 @@
 
-from fastapi import APIRouter, HTTPException, status
+from fastapi import APIRouter, HTTPException, Request, status
 from typing import List, Optional
 from datetime import datetime
 from db import prisma_client as prisma
+from services.http_cache import collection_response
 
 from models.base import ResourceBase, ResourceResponse
 
@@ -12,6 +13,9 @@ router = APIRouter(
     responses={404: {"description": "Not found"}}
 )
 
+# Los recursos de un curso cambian pocas veces por periodo
+CACHE_CONTROL = "private, max-age=300, must-revalidate"
+
 
 # ----- OPERACIONES CRUD PARA RECURSOS ----- #
 
@@ -57,7 +61,7 @@ async def create_resource(course_id: int, resource: ResourceBase):
         )
 
 @router.get("/courses/{course_id}/resources", response_model=List[ResourceResponse])
-async def get_course_resources(course_id: int):
+async def get_course_resources(course_id: int, request: Request):
     # Verificar si el curso existe
     course = await prisma.course.find_unique(where={"id": course_id})
     if not course:
@@ -68,10 +72,11 @@ async def get_course_resources(course_id: int):
     
     # Obtener los recursos
     resources = await prisma.resource.find_many(
-        where={"course": course_id}
+        where={"course": course_id},
+        order={"id": "asc"}
     )
     
-    return resources
+    return collection_response(request, ResourceResponse, resources, CACHE_CONTROL)
 
 @router.get("/resources/{resource_id}", response_model=ResourceResponse)
 async def get_resource(resource_id: int):
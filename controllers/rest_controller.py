@@ -1,8 +1,10 @@
 from fastapi import APIRouter, HTTPException, status
 from typing import List, Optional
 from datetime import datetime
-import bcrypt
 from db import prisma_client as prisma
+from exceptions import ConflictError, NotFoundError
+from services import cascade
+from services.passwords import hash_password
 
 from models.base import (
     UserBase, UserResponse,
@@ -117,7 +119,7 @@ async def create_user(user: UserBase):
             )
         
          # Encriptar la contraseña
-        hashed_password = bcrypt.hashpw(user.password.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
+        hashed_password = await hash_password(user.password)
         # Crear el nuevo usuario
         now = datetime.utcnow()
         new_user = await prisma.user.create(
@@ -455,22 +457,18 @@ async def update_category(category_id: int, category: CategoryBase):
 @router.delete("/categories/{category_id}", response_model=CategoryResponse)
 async def delete_category(category_id: int):
     try:
-        # Verificar si hay cursos asociados
-        category_courses = await prisma.categorycourse.find_many(
-            where={"categoryId": category_id}
+        # La verificación de cursos asociados y el borrado van en una transacción
+        return await cascade.delete_category(category_id)
+    except NotFoundError as e:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=e.message
         )
-        
-        if category_courses:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="Cannot delete category with associated courses"
-            )
-        
-        deleted_category = await prisma.category.delete(
-            where={"id": category_id}
+    except ConflictError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=e.message
         )
-        
-        return deleted_category
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -627,30 +625,13 @@ async def update_assignment(assignment_id: int, assignment: AssignmentBase):
 @router.delete("/assignments/{assignment_id}", response_model=AssignmentResponse)
 async def delete_assignment(assignment_id: int):
     try:
-        # Eliminar las entregas asociadas
-        await prisma.submission.delete_many(
-            where={"assignment": assignment_id}
-        )
-        
-        # Eliminar el ítem de calificación si existe
-        grade_item = await prisma.gradeitem.find_first(
-            where={
-                "itemmodule": "assign",
-                "iteminstance": assignment_id
-            }
-        )
-        
-        if grade_item:
-            await prisma.gradeitem.delete(
-                where={"id": grade_item.id}
-            )
-        
-        # Eliminar la tarea
-        deleted_assignment = await prisma.assignment.delete(
-            where={"id": assignment_id}
+        # Calificaciones, ítem de calificación, entregas y tarea en una transacción
+        return await cascade.delete_assignment(assignment_id)
+    except NotFoundError as e:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=e.message
         )
-        
-        return deleted_assignment
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -1064,28 +1045,13 @@ async def update_forum(forum_id: int, forum: ForumBase):
 @router.delete("/forums/{forum_id}", response_model=ForumResponse)
 async def delete_forum(forum_id: int):
     try:
-        # Eliminar discusiones y mensajes asociados
-        discussions = await prisma.forumdiscussion.find_many(
-            where={"forum": forum_id}
-        )
-        
-        for discussion in discussions:
-            # Eliminar mensajes
-            await prisma.forumpost.delete_many(
-                where={"discussion": discussion.id}
-            )
-            
-            # Eliminar discusión
-            await prisma.forumdiscussion.delete(
-                where={"id": discussion.id}
-            )
-        
-        # Eliminar el foro
-        deleted_forum = await prisma.forum.delete(
-            where={"id": forum_id}
+        # Mensajes, discusiones y foro en una transacción con borrados por conjunto
+        return await cascade.delete_forum(forum_id)
+    except NotFoundError as e:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=e.message
         )
-        
-        return deleted_forum
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -1222,17 +1188,13 @@ async def update_discussion(discussion_id: int, discussion: ForumDiscussionBase)
 @router.delete("/discussions/{discussion_id}", response_model=ForumDiscussionResponse)
 async def delete_discussion(discussion_id: int):
     try:
-        # Eliminar mensajes asociados
-        await prisma.forumpost.delete_many(
-            where={"discussion": discussion_id}
-        )
-        
-        # Eliminar la discusión
-        deleted_discussion = await prisma.forumdiscussion.delete(
-            where={"id": discussion_id}
+        # Mensajes y discusión en una transacción
+        return await cascade.delete_discussion(discussion_id)
+    except NotFoundError as e:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=e.message
         )
-        
-        return deleted_discussion
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -3,6 +3,8 @@ from fastapi import APIRouter, HTTPException, status
 from typing import List, Optional
 from datetime import datetime
 from db import prisma_client as prisma
+from services.reference_data import get_role as get_cached_role, get_roles as get_cached_roles, invalidate_roles
+from services.response_cache import entity_tag, purge
 
 from models.base import RoleBase, RoleResponse
 
@@ -26,6 +28,8 @@ async def create_role(role: RoleBase):
                 "archetype": role.archetype
             }
         )
+        invalidate_roles()
+        purge("Role")
         return new_role
     except Exception as e:
         raise HTTPException(
@@ -35,12 +39,12 @@ async def create_role(role: RoleBase):
 
 @router.get("/roles", response_model=List[RoleResponse])
 async def get_roles():
-    roles = await prisma.role.find_many()
+    roles = await get_cached_roles()
     return roles
 
 @router.get("/roles/{role_id}", response_model=RoleResponse)
 async def get_role(role_id: int):
-    role = await prisma.role.find_unique(where={"id": role_id})
+    role = await get_cached_role(role_id)
     if not role:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -61,6 +65,8 @@ async def update_role(role_id: int, role: RoleBase):
                 "archetype": role.archetype
             }
         )
+        invalidate_roles()
+        purge(entity_tag("Role", role_id))
         return updated_role
     except Exception as e:
         raise HTTPException(
@@ -72,6 +78,8 @@ async def update_role(role_id: int, role: RoleBase):
 async def delete_role(role_id: int):
     try:
         deleted_role = await prisma.role.delete(where={"id": role_id})
+        invalidate_roles()
+        purge("Role")
         return deleted_role
     except Exception as e:
         raise HTTPException(
@@ -1,8 +1,11 @@
 
-from fastapi import APIRouter, HTTPException, status
+from fastapi import APIRouter, HTTPException, Query, Response, status
 from typing import List, Optional
 from datetime import datetime
 from db import prisma_client as prisma
+from services.reference_data import get_course_sections, invalidate_course_sections
+from services.response_cache import entity_tag, purge
+from services.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, fetch_page, set_next_page_header
 
 from models.base import SectionBase, SectionResponse
 
@@ -14,8 +17,14 @@ router = APIRouter(
 
         
 @router.get("/sections", response_model=List[SectionResponse])
-async def get_sections():
-    sections = await prisma.coursesection.find_many()
+async def get_sections(
+    response: Response,
+    after: Optional[int] = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE)
+):
+    # Paginación por id: ?after=<último id recibido>&limit=<tamaño>
+    sections, has_next = await fetch_page(prisma.coursesection, None, after, limit)
+    set_next_page_header(response, sections, has_next)
     return sections
         
 @router.get("/sections/{course_id}", response_model=SectionResponse)
@@ -29,7 +38,7 @@ async def get_section_modules(course_id:int):
         )
     
     # Obtener las secciones del curso
-    sections = await prisma.coursesection.find_many(where={"course": course_id})
+    sections = await get_course_sections(course_id)
     
     return sections
 
@@ -53,6 +62,8 @@ async def create_section(section: SectionBase):
                 "timemodified": timemodified
             }
         )
+        invalidate_course_sections(new_section.course)
+        purge("CourseSection")
         return new_section
     except Exception as e:
         raise HTTPException(
@@ -63,6 +74,8 @@ async def create_section(section: SectionBase):
 @router.put("/sections/{section_id}", response_model=SectionResponse)
 async def update_section(section_id: int, section: SectionBase):
     try:
+        # Curso anterior: si la sección cambió de curso hay que invalidar ambos listados
+        existing_section = await prisma.coursesection.find_unique(where={"id": section_id})
         updated_section = await prisma.coursesection.update(
             where={"id": section_id},
             data={
@@ -72,6 +85,10 @@ async def update_section(section_id: int, section: SectionBase):
                 "timemodified": datetime.utcnow()
             }
         )
+        if existing_section is not None and existing_section.course != updated_section.course:
+            invalidate_course_sections(existing_section.course)
+        invalidate_course_sections(updated_section.course)
+        purge(entity_tag("CourseSection", section_id))
         return updated_section
     except Exception as e:
         raise HTTPException(
@@ -85,6 +102,8 @@ async def delete_section(section_id: int):
         deleted_section = await prisma.coursesection.delete(
             where={"id": section_id}
         )
+        invalidate_course_sections(deleted_section.course)
+        purge("CourseSection")
         return deleted_section
     except Exception as e:
         raise HTTPException(
@@ -6,6 +6,7 @@ from datetime import datetime
 from db import prisma_client as prisma
 
 from models.base import SubmissionBase, SubmissionResponse
+from services.pubsub import SUBMISSION_RECEIVED, publish_record
 
 router = APIRouter(
     prefix="/api",
@@ -63,6 +64,7 @@ async def create_submission(assignment_id: int, submission: SubmissionBase):
                 "timemodified": now
             }
         )
+        await publish_record(SUBMISSION_RECEIVED, assignment_id, new_submission)
         
         return new_submission
     except Exception as e:
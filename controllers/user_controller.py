@@ -1,9 +1,12 @@
 
-from fastapi import APIRouter, HTTPException, status
+from fastapi import APIRouter, HTTPException, Query, Request, Response, status
 from typing import List, Optional
 from datetime import datetime
-import bcrypt
 from db import prisma_client as prisma
+from services.passwords import hash_password
+from services.bulk_import import read_rows
+from services.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, fetch_page, set_next_page_header
+from services.user_import import import_users, new_user_data
 
 from models.base import UserBase, UserResponse
 
@@ -35,28 +38,11 @@ async def create_user(user: UserBase):
             )
         
          # Encriptar la contraseña
-        hashed_password = bcrypt.hashpw(user.password.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
+        hashed_password = await hash_password(user.password)
         # Crear el nuevo usuario
         now = datetime.utcnow()
         new_user = await prisma.user.create(
-            data={
-                "username": user.username,
-                "password": hashed_password,  # En producción, esto debería estar hasheado
-                "firstname": user.firstname,
-                "lastname": user.lastname,
-                "email": user.email,
-                "institution": user.institution,
-                "department": user.department,
-                "auth": "manual",
-                "confirmed": False,
-                "lang": "es",
-                "timezone": "99",
-                "deleted": False,
-                "suspended": False,
-                "mnethostid": 1,
-                "timecreated": now,
-                "timemodified": now
-            }
+            data=new_user_data(user, hashed_password, now)
         )
         
         return new_user
@@ -66,22 +52,34 @@ async def create_user(user: UserBase):
             detail=f"Error creating user: {str(e)}"
         )
 
+@router.post("/users/bulk")
+async def bulk_create_users(request: Request):
+    # Lista JSON o CSV (username,password,firstname,lastname,email,institution,department)
+    rows = await read_rows(request)
+    return await import_users(rows)
+
 @router.get("/users", response_model=List[UserResponse])
-async def get_users(search: Optional[str] = None):
+async def get_users(
+    response: Response,
+    search: Optional[str] = None,
+    after: Optional[int] = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE)
+):
     # Buscar usuarios
+    where_conditions = {}
     if search:
-        users = await prisma.user.find_many(
-            where={
-                "OR": [
-                    {"username": {"contains": search}},
-                    {"firstname": {"contains": search}},
-                    {"lastname": {"contains": search}},
-                    {"email": {"contains": search}}
-                ]
-            }
-        )
-    else:
-        users = await prisma.user.find_many()
+        where_conditions = {
+            "OR": [
+                {"username": {"contains": search}},
+                {"firstname": {"contains": search}},
+                {"lastname": {"contains": search}},
+                {"email": {"contains": search}}
+            ]
+        }
+    
+    # Paginación por id: ?after=<último id recibido>&limit=<tamaño>
+    users, has_next = await fetch_page(prisma.user, where_conditions, after, limit)
+    set_next_page_header(response, users, has_next)
     
     return users
 
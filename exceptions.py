@@ -7,4 +7,8 @@ class UnauthorizedError(Exception):
     def __init__(self, message="Unauthorized"):
         self.message = message
         super().__init__(self.message)
-        
\ No newline at end of file
+        
+class ConflictError(Exception):
+    def __init__(self, message="Conflict"):
+        self.message = message
+        super().__init__(self.message)
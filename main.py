@@ -2,6 +2,9 @@ from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
 from contextlib import asynccontextmanager
 from strawberry.asgi import GraphQL
+from strawberry.http import GraphQLRequestData
+from strawberry.types import ExecutionResult
+from graphql import GraphQLError
 from schema import schema
 from controllers.file_controller import router as file_router
 # from controllers.rest_controller import router as rest_router
@@ -16,19 +19,79 @@ from controllers.forum_controller import router as forum_controller
 from controllers.enrrollments_controller import router as enrollments_router
 from controllers.summision_controller import router as summision_router
 from controllers.category_controller import router as category_router
+from controllers.resources_controller import router as resources_router
+from controllers.admin_controller import router as admin_router
 
 
 from db import prisma_client
+from services.loaders import create_loaders
+from services.logging_config import AccessLogMiddleware, configure_logging
+from services.metrics import PrometheusMiddleware, instrument_prisma, metrics_endpoint
+from services.jobs import jobs
+from services.passwords import password_hasher
+from services.persisted_queries import PersistedQueryError, persisted_hash, resolve_query
+from services.pubsub import pubsub
+from services.response_cache import CACHE_POLICY, cache_control, response_cache
+from services.thumbnails import thumbnail_generator
+from services.user_import import shutdown as shutdown_user_import
 import logging
 
-# Configurar logging para toda la aplicación
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-)
+# Configurar logging para toda la aplicación (JSON, escrito desde un hilo en segundo plano)
+configure_logging()
 logger = logging.getLogger(__name__)
 
+# Contadores y latencias por modelo para todas las consultas de Prisma
+instrument_prisma(prisma_client)
+
 class CustomGraphQL(GraphQL):
+    async def get_context(self, request, response):
+        context = await super().get_context(request, response)
+        # DataLoaders nuevos por solicitud para agrupar las relaciones anidadas
+        context["loaders"] = create_loaders()
+        return context
+
+    def should_render_graphql_ide(self, request):
+        # Un GET de una consulta persistida no trae "query" pero no pide el IDE
+        if request.query_params.get("extensions") is not None:
+            return False
+        return super().should_render_graphql_ide(request)
+
+    async def parse_http_body(self, request):
+        data = await super().parse_http_body(request)
+        # Strawberry no expone "extensions" del cuerpo; se leen para las persisted queries
+        if request.method == "GET":
+            extensions = request.query_params.get("extensions")
+            extensions = self.parse_json(extensions) if extensions else None
+        elif "application/json" in (request.content_type or ""):
+            body = self.parse_json(await request.get_body())
+            extensions = body.get("extensions") if isinstance(body, dict) else None
+        else:
+            extensions = None
+        sha256_hash = persisted_hash(extensions)
+        if sha256_hash is None:
+            return data
+        return GraphQLRequestData(
+            query=resolve_query(data.query, sha256_hash),
+            variables=data.variables,
+            operation_name=data.operation_name,
+            protocol=data.protocol,
+        )
+
+    async def execute_operation(self, request, context, root_value):
+        try:
+            result = await super().execute_operation(request, context, root_value)
+        except PersistedQueryError as e:
+            # Formato de Apollo: el cliente reintenta con el texto de la consulta
+            return ExecutionResult(data=None, errors=[GraphQLError(e.message, extensions={"code": e.code})])
+        # Las consultas persistidas por GET tienen una URL estable: se cachean
+        # según las pistas @cacheControl de los campos pedidos
+        if request.method == "GET" and "extensions" in request.query_params:
+            policy = context.get(CACHE_POLICY)
+            if not isinstance(result, ExecutionResult) or result.errors:
+                policy = None
+            context["response"].headers["Cache-Control"] = cache_control(policy)
+        return result
+
     async def process_result(self, request, result):
         # Log GraphQL errors
         if result.errors:
@@ -44,11 +107,19 @@ async def lifespan(app: FastAPI):
     logger.info("Conectando a la base de datos...")
     await prisma_client.connect()
     logger.info("Conexión a la base de datos establecida")
+    # Con Redis, escucha las purgas de la caché de respuestas de otros workers
+    response_cache.start()
     yield  # La aplicación está en ejecución
     # Código que se ejecuta al cerrar la aplicación
+    await jobs.shutdown()
+    await response_cache.shutdown()
+    await pubsub.close()
     logger.info("Cerrando conexión a la base de datos...")
     await prisma_client.disconnect()
     logger.info("Conexión a la base de datos cerrada")
+    password_hasher.shutdown()
+    thumbnail_generator.shutdown()
+    shutdown_user_import()
 
 
 app = FastAPI(title="Campus Virtual API", description="Backend API para Campus Virtual", lifespan=lifespan)
@@ -69,21 +140,24 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    # Los listados REST devuelven el cursor de la siguiente página en este header
+    expose_headers=["X-Next-Cursor"],
 )
 
-# Logging middleware para registrar todas las solicitudes
-@app.middleware("http")
-async def log_requests(request, call_next):
-    logger.info(f"Request: {request.method} {request.url}")
-    response = await call_next(request)
-    logger.info(f"Response status: {response.status_code}")
-    return response
+# Access log estructurado: muestrea las respuestas exitosas y registra siempre errores y solicitudes lentas
+app.add_middleware(AccessLogMiddleware)
+
+# Se agrega al final para quedar como el middleware más externo y medir la solicitud completa
+app.add_middleware(PrometheusMiddleware)
 
 # Añadir la ruta de GraphQL con la versión personalizada que hace logging de errores
 graphql_app = CustomGraphQL(schema)
 app.add_route("/graphql", graphql_app)
 app.add_websocket_route("/graphql", graphql_app)
 
+# Endpoint para el scrape de Prometheus (job "app" en prometheus.yml)
+app.add_route("/metrics", metrics_endpoint, include_in_schema=False)
+
 # Incluir los routers
 app.include_router(login_router)  # Añadido el router de login
 app.include_router(file_router)
@@ -97,12 +171,13 @@ app.include_router(enrollments_router)
 app.include_router(role_router)
 app.include_router(summision_router)
 app.include_router(category_router)
+app.include_router(resources_router)
+app.include_router(admin_router)
 
 # app.include_router(rest_router)
 
 @app.get("/")
 def read_root():
-    logger.info("Acceso a la ruta raíz")
     return {
         "message": "Bienvenido a la API del Campus Virtual",
         "docs": "/docs",
@@ -114,8 +189,11 @@ async def healthcheck():
     try:
         # Verificar conexión a la base de datos     
         await prisma_client.role.count()
-        logger.info("Healthcheck ejecutado correctamente")
-        return {"status": "ok", "message": "API y base de datos funcionando correctamente"}
+        return {
+            "status": "ok",
+            "message": "API y base de datos funcionando correctamente",
+            "password_hasher": password_hasher.snapshot(),
+        }
     except Exception as e:
         error_msg = f"Error en el healthcheck: {str(e)}"
         logger.error(error_msg)
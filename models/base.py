@@ -1,4 +1,4 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from typing import Optional, List
 from datetime import datetime
 
@@ -48,6 +48,25 @@ class CourseBase(BaseModel):
     enddate: Optional[datetime] = None
     visible: bool = True
 
+class CourseTemplateForum(BaseModel):
+    name: str
+    intro: str = ""
+    type: str = "general"
+
+class CourseTemplateGradeItem(BaseModel):
+    itemname: str
+    itemtype: str = "manual"
+    grademax: int = 100
+    grademin: int = 0
+    gradepass: int = 0
+
+class CourseCreate(CourseBase):
+    # Secciones numeradas además de la sección General
+    sections: int = Field(0, ge=0, le=52)
+    # Contenido de plantilla opcional
+    forums: List[CourseTemplateForum] = []
+    grade_items: List[CourseTemplateGradeItem] = []
+
 class CourseResponse(CourseBase):
     id: int
     timecreated: datetime
@@ -253,4 +272,9 @@ class SectionResponse(SectionBase):
     timemodified: datetime
     
     class Config:
-        from_attributes = True
\ No newline at end of file
+        from_attributes = True
+
+class UploadSessionCreate(BaseModel):
+    filename: str
+    size: int
+    content_type: Optional[str] = None
@@ -0,0 +1,56 @@
+-- CreateIndex
+CREATE INDEX "mdl_course_sections_course_section_idx" ON "mdl_course_sections"("course", "section");
+
+-- CreateIndex
+CREATE INDEX "mdl_role_assignments_userid_contextid_idx" ON "mdl_role_assignments"("userid", "contextid");
+
+-- CreateIndex
+CREATE INDEX "mdl_user_enrolments_userid_courseid_status_idx" ON "mdl_user_enrolments"("userid", "courseid", "status");
+
+-- CreateIndex
+CREATE INDEX "mdl_user_enrolments_courseid_idx" ON "mdl_user_enrolments"("courseid");
+
+-- CreateIndex
+CREATE INDEX "mdl_assign_course_duedate_idx" ON "mdl_assign"("course", "duedate");
+
+-- CreateIndex
+CREATE INDEX "mdl_assign_duedate_idx" ON "mdl_assign"("duedate");
+
+-- CreateIndex
+CREATE INDEX "mdl_assign_section_idx" ON "mdl_assign"("section");
+
+-- CreateIndex
+CREATE INDEX "mdl_assign_submission_assignment_userid_idx" ON "mdl_assign_submission"("assignment", "userid");
+
+-- CreateIndex
+CREATE INDEX "mdl_assign_submission_userid_idx" ON "mdl_assign_submission"("userid");
+
+-- CreateIndex
+CREATE INDEX "mdl_course_completions_userid_course_idx" ON "mdl_course_completions"("userid", "course");
+
+-- CreateIndex
+CREATE INDEX "mdl_course_completions_course_idx" ON "mdl_course_completions"("course");
+
+-- CreateIndex
+CREATE INDEX "mdl_forum_course_idx" ON "mdl_forum"("course");
+
+-- CreateIndex
+CREATE INDEX "mdl_forum_discussions_forum_idx" ON "mdl_forum_discussions"("forum");
+
+-- CreateIndex
+CREATE INDEX "mdl_forum_posts_discussion_created_idx" ON "mdl_forum_posts"("discussion", "created");
+
+-- CreateIndex
+CREATE INDEX "mdl_grade_items_courseid_idx" ON "mdl_grade_items"("courseid");
+
+-- CreateIndex
+CREATE INDEX "mdl_grade_items_itemmodule_iteminstance_idx" ON "mdl_grade_items"("itemmodule", "iteminstance");
+
+-- CreateIndex
+CREATE INDEX "mdl_grade_grades_userid_itemid_idx" ON "mdl_grade_grades"("userid", "itemid");
+
+-- CreateIndex
+CREATE INDEX "mdl_grade_grades_itemid_idx" ON "mdl_grade_grades"("itemid");
+
+-- CreateIndex
+CREATE INDEX "mdl_resource_course_idx" ON "mdl_resource"("course");
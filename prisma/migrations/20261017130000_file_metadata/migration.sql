@@ -0,0 +1,37 @@
+-- CreateTable
+CREATE TABLE "mdl_files" (
+    "id" SERIAL NOT NULL,
+    "component" TEXT NOT NULL,
+    "path" TEXT NOT NULL,
+    "filename" TEXT NOT NULL,
+    "filesize" INTEGER NOT NULL,
+    "contenthash" TEXT NOT NULL,
+    "mimetype" TEXT,
+    "userid" INTEGER NOT NULL,
+    "submissionid" INTEGER,
+    "resourceid" INTEGER,
+    "timecreated" TIMESTAMP(3) NOT NULL,
+
+    CONSTRAINT "mdl_files_pkey" PRIMARY KEY ("id")
+);
+
+-- CreateIndex
+CREATE INDEX "mdl_files_submissionid_idx" ON "mdl_files"("submissionid");
+
+-- CreateIndex
+CREATE INDEX "mdl_files_resourceid_idx" ON "mdl_files"("resourceid");
+
+-- CreateIndex
+CREATE INDEX "mdl_files_userid_component_timecreated_idx" ON "mdl_files"("userid", "component", "timecreated");
+
+-- CreateIndex
+CREATE INDEX "mdl_files_contenthash_idx" ON "mdl_files"("contenthash");
+
+-- AddForeignKey
+ALTER TABLE "mdl_files" ADD CONSTRAINT "mdl_files_userid_fkey" FOREIGN KEY ("userid") REFERENCES "mdl_user"("id") ON DELETE CASCADE ON UPDATE CASCADE;
+
+-- AddForeignKey
+ALTER TABLE "mdl_files" ADD CONSTRAINT "mdl_files_submissionid_fkey" FOREIGN KEY ("submissionid") REFERENCES "mdl_assign_submission"("id") ON DELETE CASCADE ON UPDATE CASCADE;
+
+-- AddForeignKey
+ALTER TABLE "mdl_files" ADD CONSTRAINT "mdl_files_resourceid_fkey" FOREIGN KEY ("resourceid") REFERENCES "mdl_resource"("id") ON DELETE CASCADE ON UPDATE CASCADE;
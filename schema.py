@@ -3,18 +3,27 @@ from strawberry.fastapi import GraphQLRouter
 from fastapi import FastAPI
 import uvicorn
 from datetime import datetime
-from typing import List, Optional, Any, Dict, Union
-import bcrypt
-from bcrypt import checkpw, gensalt, hashpw
+from typing import List, Optional, Any, AsyncGenerator, Dict, Union, Generic, TypeVar
 from db import prisma_client
+from prisma import models
 from exceptions import NotFoundError, UnauthorizedError
+from services.pagination import (
+    DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, clamp_limit, decode_cursor, encode_cursor, fetch_page
+)
+from services.loaders import create_loaders
+from services.metrics import GraphQLMetricsExtension
+from services.passwords import hash_password, verify_password
+from services.persisted_queries import DocumentCache
+from services.projection import projected
+from services.pubsub import FORUM_POST_ADDED, GRADE_PUBLISHED, SUBMISSION_RECEIVED, channel, pubsub
+from services.query_cost import QueryCostLimiter
+from services.response_cache import CacheControl, GraphQLResponseCache, entity_tag, purge
+from services.reference_data import (
+    get_categories, get_category, get_course_sections, get_role, get_roles,
+    invalidate_course_sections, invalidate_roles
+)
 import logging
 
-# Configurar logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-)
 logger = logging.getLogger(__name__)
 
 # User Types
@@ -34,7 +43,8 @@ class User:
     timemodified: datetime
 
 # Course Types
-@strawberry.type
+# Datos de catálogo: mismas respuestas para todos los estudiantes (services/response_cache.py)
+@strawberry.type(directives=[CacheControl(max_age=60)])
 class Course:
     id: int
     category: int
@@ -50,7 +60,28 @@ class Course:
     timecreated: datetime
     timemodified: datetime
 
-@strawberry.type
+    # Relaciones resueltas con DataLoaders (una consulta por tipo y solicitud)
+    @strawberry.field
+    async def sections(self, info: strawberry.Info) -> List["CourseSection"]:
+        return await info.context["loaders"]["sections_by_course"].load(self.id)
+
+    @strawberry.field
+    async def assignments(self, info: strawberry.Info) -> List["Assignment"]:
+        return await info.context["loaders"]["assignments_by_course"].load(self.id)
+
+    @strawberry.field
+    async def forums(self, info: strawberry.Info) -> List["Forum"]:
+        return await info.context["loaders"]["forums_by_course"].load(self.id)
+
+    @strawberry.field
+    async def grade_items(self, info: strawberry.Info) -> List["GradeItem"]:
+        return await info.context["loaders"]["grade_items_by_course"].load(self.id)
+
+    @strawberry.field
+    async def enrollments(self, info: strawberry.Info) -> List["Enrollment"]:
+        return await info.context["loaders"]["enrollments_by_course"].load(self.id)
+
+@strawberry.type(directives=[CacheControl(max_age=60)])
 class CourseSection:
     id: int
     course: int
@@ -61,7 +92,11 @@ class CourseSection:
     visible: bool
     timemodified: datetime
 
-@strawberry.type
+    @strawberry.field
+    async def assignments(self, info: strawberry.Info) -> List["Assignment"]:
+        return await info.context["loaders"]["assignments_by_section"].load(self.id)
+
+@strawberry.type(directives=[CacheControl(max_age=300)])
 class Category:
     id: int
     name: str
@@ -92,7 +127,7 @@ class CourseModule:
     visible: bool
 
 # Role Types
-@strawberry.type
+@strawberry.type(directives=[CacheControl(max_age=300)])
 class Role:
     id: int
     name: str
@@ -110,7 +145,7 @@ class UserRole:
     timemodified: datetime
 
 # Assignment Types
-@strawberry.type
+@strawberry.type(directives=[CacheControl(max_age=60)])
 class Assignment:
     id: int
     course: int
@@ -121,6 +156,14 @@ class Assignment:
     allowsubmissionsfromdate: Optional[datetime]
     grade: Optional[int]
     timemodified: datetime
+
+    @strawberry.field
+    async def submissions(self, info: strawberry.Info) -> List["Submission"]:
+        return await info.context["loaders"]["submissions_by_assignment"].load(self.id)
+
+    @strawberry.field
+    async def course_info(self, info: strawberry.Info) -> Optional[Course]:
+        return await info.context["loaders"]["course_by_id"].load(self.course)
     
 @strawberry.type
 class Section:
@@ -144,6 +187,10 @@ class Submission:
     attemptnumber: int
     latest: bool
 
+    @strawberry.field
+    async def user(self, info: strawberry.Info) -> Optional[User]:
+        return await info.context["loaders"]["user_by_id"].load(self.userid)
+
 # Forum Types
 @strawberry.type
 class Forum:
@@ -154,6 +201,10 @@ class Forum:
     intro: str
     timemodified: datetime
 
+    @strawberry.field
+    async def discussions(self, info: strawberry.Info) -> List["ForumDiscussion"]:
+        return await info.context["loaders"]["discussions_by_forum"].load(self.id)
+
 @strawberry.type
 class ForumDiscussion:
     id: int
@@ -163,6 +214,14 @@ class ForumDiscussion:
     userid: int
     timemodified: datetime
 
+    @strawberry.field
+    async def posts(self, info: strawberry.Info) -> List["ForumPost"]:
+        return await info.context["loaders"]["posts_by_discussion"].load(self.id)
+
+    @strawberry.field
+    async def user(self, info: strawberry.Info) -> Optional[User]:
+        return await info.context["loaders"]["user_by_id"].load(self.userid)
+
 @strawberry.type
 class ForumPost:
     id: int
@@ -174,6 +233,10 @@ class ForumPost:
     subject: str
     message: str
 
+    @strawberry.field
+    async def user(self, info: strawberry.Info) -> Optional[User]:
+        return await info.context["loaders"]["user_by_id"].load(self.userid)
+
 # Grade Types
 @strawberry.type
 class GradeItem:
@@ -187,6 +250,10 @@ class GradeItem:
     timecreated: datetime
     timemodified: datetime
 
+    @strawberry.field
+    async def grades(self, info: strawberry.Info) -> List["Grade"]:
+        return await info.context["loaders"]["grades_by_item"].load(self.id)
+
 @strawberry.type
 class Grade:
     id: int
@@ -197,6 +264,10 @@ class Grade:
     timecreated: datetime
     timemodified: datetime
 
+    @strawberry.field
+    async def grade_item(self, info: strawberry.Info) -> Optional[GradeItem]:
+        return await info.context["loaders"]["grade_item_by_id"].load(self.itemid)
+
 # Enrollment Types
 @strawberry.type
 class Enrollment:
@@ -204,13 +275,23 @@ class Enrollment:
     enrolid: int
     userid: int
     courseid: int
-    course: Course
     status: int
     timestart: Optional[datetime]
     timeend: Optional[datetime]
     timecreated: datetime
     timemodified: datetime
 
+    @strawberry.field
+    async def course(self, info: strawberry.Info) -> Optional[Course]:
+        # Reutilizar el curso si la consulta ya lo trajo con include
+        if self.course is not None:
+            return self.course
+        return await info.context["loaders"]["course_by_id"].load(self.courseid)
+
+    @strawberry.field
+    async def user(self, info: strawberry.Info) -> Optional[User]:
+        return await info.context["loaders"]["user_by_id"].load(self.userid)
+
 @strawberry.type
 class CourseCompletion:
     id: int
@@ -231,6 +312,43 @@ class UserResponse:
     user: Optional[User] = None
     error: Optional[ErrorResponse] = None
 
+# Tipos de conexión estilo Relay para paginación por cursor
+T = TypeVar("T")
+
+@strawberry.type(directives=[CacheControl(inherit_max_age=True)])
+class PageInfo:
+    has_next_page: bool
+    end_cursor: Optional[str]
+
+@strawberry.type(directives=[CacheControl(inherit_max_age=True)])
+class Edge(Generic[T]):
+    cursor: str
+    node: T
+
+@strawberry.type(directives=[CacheControl(inherit_max_age=True)])
+class Connection(Generic[T]):
+    edges: List[Edge[T]]
+    page_info: PageInfo
+
+async def paginate(delegate, where: Optional[Dict[str, Any]], first: Optional[int], after: Optional[str]) -> Connection:
+    limit = clamp_limit(first)
+    records, has_next = await fetch_page(delegate, where, decode_cursor(after), limit)
+    edges = [Edge(cursor=encode_cursor(record.id), node=record) for record in records]
+    return Connection(
+        edges=edges,
+        page_info=PageInfo(
+            has_next_page=has_next,
+            end_cursor=edges[-1].cursor if edges else None,
+        ),
+    )
+
+# Camino hasta los nodos dentro de una conexión, para la proyección de columnas
+CONNECTION_NODE = ("edges", "node")
+
+async def find_capped(delegate, where: Optional[Dict[str, Any]] = None) -> List[Any]:
+    # Las listas sin paginar quedan limitadas al tamaño máximo de página
+    return await delegate.find_many(where=where or {}, take=MAX_PAGE_SIZE, order={"id": "asc"})
+
 # Input Types for Mutations
 @strawberry.input
 class RoleInput:
@@ -294,28 +412,36 @@ class SectionInput:
 @strawberry.type
 class Query:
     # User Queries
-    @strawberry.field
-    async def users(self) -> List[User]:       
-        users = await prisma_client.user.find_many()       
+    @strawberry.field(deprecation_reason="Limitado a MAX_PAGE_SIZE registros, usar usersConnection")
+    async def users(self, info: strawberry.Info) -> List[User]:
+        users = await find_capped(projected(info, models.User))
         return users
 
     @strawberry.field
-    async def user(self, user_id: int) -> User:      
-        user = await prisma_client.user.find_unique(where={"id": user_id})       
+    async def users_connection(self, info: strawberry.Info, first: int = DEFAULT_PAGE_SIZE, after: Optional[str] = None) -> Connection[User]:
+        return await paginate(projected(info, models.User, CONNECTION_NODE), None, first, after)
+
+    @strawberry.field
+    async def user(self, info: strawberry.Info, user_id: int) -> User:
+        user = await projected(info, models.User).find_unique(where={"id": user_id})       
         if not user:
             logger.error(f"User not found: {user_id}")
             raise Exception("User not found")
         return user
 
     # Course Queries
-    @strawberry.field
-    async def courses(self) -> List[Course]:        
-        courses = await prisma_client.course.find_many()       
+    @strawberry.field(deprecation_reason="Limitado a MAX_PAGE_SIZE registros, usar coursesConnection")
+    async def courses(self, info: strawberry.Info) -> List[Course]:
+        courses = await find_capped(projected(info, models.Course))
         return courses
 
+    @strawberry.field(directives=[CacheControl(max_age=60)])
+    async def courses_connection(self, info: strawberry.Info, first: int = DEFAULT_PAGE_SIZE, after: Optional[str] = None) -> Connection[Course]:
+        return await paginate(projected(info, models.Course, CONNECTION_NODE), None, first, after)
+
     @strawberry.field
-    async def course(self, course_id: int) -> Course:        
-        course = await prisma_client.course.find_unique(where={"id": course_id})
+    async def course(self, info: strawberry.Info, course_id: int) -> Course:
+        course = await projected(info, models.Course).find_unique(where={"id": course_id})
         
         if not course:
             logger.error(f"Course not found: {course_id}")
@@ -324,18 +450,18 @@ class Query:
 
     @strawberry.field
     async def course_sections(self, course_id: int) -> List[CourseSection]:        
-        sections = await prisma_client.coursesection.find_many(where={"course": course_id})        
+        sections = await get_course_sections(course_id)        
         return sections
 
     # Category Queries
     @strawberry.field
     async def categories(self) -> List[Category]:        
-        categories = await prisma_client.category.find_many()       
+        categories = await get_categories()       
         return categories
 
     @strawberry.field
     async def category(self, category_id: int) -> Category:       
-        category = await prisma_client.category.find_unique(where={"id": category_id})
+        category = await get_category(category_id)
         
         if not category:
             logger.error(f"Category not found: {category_id}")
@@ -345,7 +471,7 @@ class Query:
     # Role Queries
     @strawberry.field
     async def roles(self) -> List[Role]:        
-        roles = await prisma_client.role.find_many()
+        roles = await get_roles()
         
         if not roles:
             logger.error("Roles not found")
@@ -354,52 +480,64 @@ class Query:
 
     @strawberry.field
     async def role(self, role_id: int) -> Role:       
-        role = await prisma_client.role.find_unique(where={"id": role_id})        
+        role = await get_role(role_id)        
         if not role:
             logger.error(f"Role not found: {role_id}")
             raise Exception("Role not found")
         return role
 
     # Assignment Queries
-    @strawberry.field
-    async def assignments(self, course_id: Optional[int] = None, section_id: Optional[int] = None) -> List[Assignment]:       
+    @strawberry.field(deprecation_reason="Limitado a MAX_PAGE_SIZE registros, usar assignmentsConnection")
+    async def assignments(self, info: strawberry.Info, course_id: Optional[int] = None, section_id: Optional[int] = None) -> List[Assignment]:
+        delegate = projected(info, models.Assignment)
         if course_id and section_id:
-            assignments = await prisma_client.assignment.find_many(where={"course": course_id, "section": section_id})
+            assignments = await find_capped(delegate, {"course": course_id, "section": section_id})
         else:
-            assignments = await prisma_client.assignment.find_many()      
+            assignments = await find_capped(delegate)
         return assignments
+
+    @strawberry.field(directives=[CacheControl(max_age=60)])
+    async def assignments_connection(
+        self,
+        info: strawberry.Info,
+        course_id: Optional[int] = None,
+        section_id: Optional[int] = None,
+        first: int = DEFAULT_PAGE_SIZE,
+        after: Optional[str] = None,
+    ) -> Connection[Assignment]:
+        where = {}
+        if course_id:
+            where["course"] = course_id
+        if section_id:
+            where["section"] = section_id
+        return await paginate(projected(info, models.Assignment, CONNECTION_NODE), where, first, after)
     
     # Todas las asignaciones
     @strawberry.field
-    async def AllAssigments(self) -> List[Assignment]:        
-        assignments = await prisma_client.assignment.find_many()       
+    async def AllAssigments(self, info: strawberry.Info) -> List[Assignment]:
+        assignments = await find_capped(projected(info, models.Assignment))
         return assignments
     
     @strawberry.field
-    async def AllAssigmentsProx(self) -> List[Assignment]:        
+    async def AllAssigmentsProx(self, info: strawberry.Info) -> List[Assignment]:
         today = datetime.utcnow()
-        assignments = await prisma_client.assignment.find_many(
-        where={"duedate": {"gte": today}}
-    )      
+        assignments = await find_capped(projected(info, models.Assignment), {"duedate": {"gte": today}})
         return assignments
     
     # Asignaciones del curso
     @strawberry.field
-    async def CourseAssignmentsProx(self, course_id: Optional[int] = None) -> List[Assignment]:       
+    async def CourseAssignmentsProx(self, info: strawberry.Info, course_id: Optional[int] = None) -> List[Assignment]:
         today = datetime.utcnow()
+        delegate = projected(info, models.Assignment)
         if course_id:
-            assignments = await prisma_client.assignment.find_many(
-            where={"course": course_id, "duedate": {"gte": today}}
-        )
+            assignments = await find_capped(delegate, {"course": course_id, "duedate": {"gte": today}})
         else:
-            assignments = await prisma_client.assignment.find_many(
-            where={"duedate": {"gte": today}}
-        )    
+            assignments = await find_capped(delegate, {"duedate": {"gte": today}})
         return assignments
 
     @strawberry.field
-    async def assignment(self, assignment_id: int) -> Assignment:       
-        assignment = await prisma_client.assignment.find_unique(where={"id": assignment_id})      
+    async def assignment(self, info: strawberry.Info, assignment_id: int) -> Assignment:
+        assignment = await projected(info, models.Assignment).find_unique(where={"id": assignment_id})      
         if not assignment:
             logger.error(f"Assignment not found: {assignment_id}")
             raise Exception("Assignment not found")
@@ -430,11 +568,20 @@ class Query:
         discussions = await prisma_client.forumdiscussion.find_many(where={"forum": forum_id})       
         return discussions
 
-    @strawberry.field
+    @strawberry.field(deprecation_reason="Limitado a MAX_PAGE_SIZE registros, usar forumPostsConnection")
     async def forum_posts(self, discussion_id: int) -> List[ForumPost]:       
-        posts = await prisma_client.forumpost.find_many(where={"discussion": discussion_id})       
+        posts = await find_capped(prisma_client.forumpost, {"discussion": discussion_id})
         return posts
 
+    @strawberry.field
+    async def forum_posts_connection(
+        self,
+        discussion_id: int,
+        first: int = DEFAULT_PAGE_SIZE,
+        after: Optional[str] = None,
+    ) -> Connection[ForumPost]:
+        return await paginate(prisma_client.forumpost, {"discussion": discussion_id}, first, after)
+
     # Grade Queries
     @strawberry.field
     async def course_grades(self, course_id: int) -> List[GradeItem]:      
@@ -469,7 +616,7 @@ class Query:
     
     @strawberry.field
     async def sections(self, course_id: int) -> List[Section]:
-        sections = await prisma_client.coursesection.find_many(where={"course": course_id})
+        sections = await get_course_sections(course_id)
         return sections
 
 # Mutation Type
@@ -488,6 +635,8 @@ class Mutation:
                 "archetype": input.archetype
             }
         )
+        invalidate_roles()
+        purge("Role")
         
         return new_role
 
@@ -512,6 +661,8 @@ class Mutation:
         if not updated_role:
             logger.error(f"Role not found: {role_id}")
             raise Exception("Role not found")
+        invalidate_roles()
+        purge(entity_tag("Role", role_id))
         return updated_role
 
     @strawberry.mutation
@@ -522,6 +673,8 @@ class Mutation:
         if not deleted_role:
             logger.error(f"Role not found: {role_id}")
             raise Exception("Role not found")
+        invalidate_roles()
+        purge("Role")
         return deleted_role
 
     # User Mutations
@@ -530,7 +683,7 @@ class Mutation:
         
         now = datetime.utcnow()
         # Ensure password is hashed before storing
-        hashed_password = bcrypt.hashpw(input.password.encode("utf-8"), bcrypt.gensalt()).decode("utf-8")
+        hashed_password = await hash_password(input.password)
         
         new_user = await prisma_client.user.create(
             data={
@@ -558,7 +711,7 @@ class Mutation:
         input: UserInput
     ) -> User:
         # Ensure password is hashed before storing
-        hashed_password = bcrypt.hashpw(input.password.encode("utf-8"), bcrypt.gensalt()).decode("utf-8")
+        hashed_password = await hash_password(input.password)
         
         updated_user = await prisma_client.user.update(
             where={"id": user_id},
@@ -600,6 +753,7 @@ class Mutation:
                 "timemodified": now,
             }
         )
+        purge("Course")
         
         return new_course
 
@@ -630,6 +784,7 @@ class Mutation:
         if not updated_course:
             logger.error(f"Course not found: {course_id}")
             raise Exception("Course not found")
+        purge(entity_tag("Course", course_id))
         return updated_course
 
     # Assignment Mutations
@@ -650,6 +805,7 @@ class Mutation:
                 "introformat": 1,  # Default format
             }
         )
+        purge("Assignment")
         
         return new_assignment
 
@@ -676,6 +832,7 @@ class Mutation:
         if not updated_assignment:
             logger.error(f"Assignment not found: {assignment_id}")
             raise Exception("Assignment not found")
+        purge(entity_tag("Assignment", assignment_id))
         return updated_assignment
 
     # Enrollment Mutations
@@ -748,7 +905,7 @@ class Mutation:
                 )
 
             # Verificar la contraseña utilizando bcrypt
-            if not bcrypt.checkpw(password.encode("utf-8"), user.password.encode("utf-8")):
+            if not await verify_password(password, user.password):
                 logger.error(f"Login failed: Credenciales incorrectas - {email}")
                 return UserResponse(
                     error=ErrorResponse(
@@ -801,7 +958,7 @@ class Mutation:
                     )
                 )
 
-            hashed_new_password = bcrypt.hashpw(new_password.encode("utf-8"), bcrypt.gensalt()).decode("utf-8")
+            hashed_new_password = await hash_password(new_password)
 
             updated_user = await prisma_client.user.update(
                 where={"email": email},
@@ -841,10 +998,14 @@ class Mutation:
                 "timemodified": now,
             }
         )
+        invalidate_course_sections(new_section.course)
+        purge("CourseSection")
         return new_section
 
     @strawberry.mutation
     async def update_section(self, section_id: int, input: SectionInput) -> Section:
+        # Curso anterior: si la sección cambió de curso hay que invalidar ambos listados
+        existing_section = await prisma_client.coursesection.find_unique(where={"id": section_id})
         updated_section = await prisma_client.coursesection.update(
             where={"id": section_id},
             data={
@@ -858,6 +1019,10 @@ class Mutation:
         if not updated_section:
             logger.error(f"Section not found: {section_id}")
             raise Exception("Section not found")
+        if existing_section is not None and existing_section.course != updated_section.course:
+            invalidate_course_sections(existing_section.course)
+        invalidate_course_sections(updated_section.course)
+        purge(entity_tag("CourseSection", section_id))
         return updated_section
 
     @strawberry.mutation
@@ -866,8 +1031,36 @@ class Mutation:
         if not deleted_section:
             logger.error(f"Section not found: {section_id}")
             raise Exception("Section not found")
+        invalidate_course_sections(deleted_section.course)
+        purge("CourseSection")
         return deleted_section
 
 
+# Subscription Type
+# Eventos publicados por las rutas de escritura (services/pubsub.py); llegan
+# como JSON y se convierten al modelo de Prisma para reutilizar los tipos.
+# El contexto del websocket dura toda la conexión, así que cada evento usa
+# DataLoaders nuevos: sus relaciones no salen de una caché vieja ni sin límite
+@strawberry.type
+class Subscription:
+    @strawberry.subscription
+    async def forum_post_added(self, info: strawberry.Info, discussion_id: int) -> AsyncGenerator[ForumPost, None]:
+        async for message in pubsub.subscribe(channel(FORUM_POST_ADDED, discussion_id)):
+            info.context["loaders"] = create_loaders()
+            yield models.ForumPost.model_validate(message)
+
+    @strawberry.subscription
+    async def grade_published(self, info: strawberry.Info, user_id: int) -> AsyncGenerator[Grade, None]:
+        async for message in pubsub.subscribe(channel(GRADE_PUBLISHED, user_id)):
+            info.context["loaders"] = create_loaders()
+            yield models.Grade.model_validate(message)
+
+    @strawberry.subscription
+    async def submission_received(self, info: strawberry.Info, assignment_id: int) -> AsyncGenerator[Submission, None]:
+        async for message in pubsub.subscribe(channel(SUBMISSION_RECEIVED, assignment_id)):
+            info.context["loaders"] = create_loaders()
+            yield models.Submission.model_validate(message)
+
+
 # Create schema without extensions (usando un enfoque más sencillo)
-schema = strawberry.Schema(query=Query, mutation=Mutation)
+schema = strawberry.Schema(query=Query, mutation=Mutation, subscription=Subscription, extensions=[GraphQLMetricsExtension, DocumentCache, QueryCostLimiter, GraphQLResponseCache])
@@ -0,0 +1,188 @@
+-- Benchmark de índices: muestra los planes de consulta de los caminos más usados
+-- por la API antes y después de los índices de la migración hot_path_indexes.
+--
+-- Uso (no modifica la base de datos, todo se ejecuta dentro de una transacción
+-- que se revierte al final):
+--
+--   PGPASSWORD=postgres psql -h localhost -U postgres -d campus_virtual \
+--       -f scripts/benchmark_indexes.sql > bench_output.txt
+--
+-- Los índices se eliminan dentro de la transacción para medir el "antes" y se
+-- vuelven a crear para medir el "después".
+
+\set ON_ERROR_STOP on
+\timing off
+
+BEGIN;
+
+-- ----- DATOS DE PRUEBA ----- --
+-- Se usan ids explícitos por encima de los existentes para poder relacionar las tablas
+
+SELECT COALESCE(MAX(id), 0) AS user_base FROM "mdl_user" \gset
+SELECT COALESCE(MAX(id), 0) AS course_base FROM "mdl_course" \gset
+SELECT COALESCE(MAX(id), 0) AS section_base FROM "mdl_course_sections" \gset
+SELECT COALESCE(MAX(id), 0) AS assign_base FROM "mdl_assign" \gset
+SELECT COALESCE(MAX(id), 0) AS forum_base FROM "mdl_forum" \gset
+SELECT COALESCE(MAX(id), 0) AS discussion_base FROM "mdl_forum_discussions" \gset
+SELECT COALESCE(MAX(id), 0) AS item_base FROM "mdl_grade_items" \gset
+
+INSERT INTO "mdl_role" ("name", "shortname", "sortorder", "archetype")
+VALUES ('Benchmark', 'bench_role', 99, 'student')
+ON CONFLICT ("shortname") DO NOTHING;
+SELECT id AS bench_role FROM "mdl_role" WHERE "shortname" = 'bench_role' \gset
+
+-- 40.000 usuarios
+INSERT INTO "mdl_user" ("id", "username", "password", "firstname", "lastname", "email", "timecreated", "timemodified")
+SELECT :user_base + g, 'bench_user_' || g, 'x', 'Bench', 'User', 'bench_' || g || '@example.com', now(), now()
+FROM generate_series(1, 40000) g;
+
+-- 400 cursos con 10 secciones cada uno
+INSERT INTO "mdl_course" ("id", "category", "sortorder", "fullname", "shortname", "startdate", "timecreated", "timemodified")
+SELECT :course_base + g, 1, g, 'Curso ' || g, 'BENCH' || g, now(), now(), now()
+FROM generate_series(1, 400) g;
+
+INSERT INTO "mdl_course_sections" ("id", "course", "section", "name", "timemodified")
+SELECT :section_base + (c - 1) * 10 + s, :course_base + c, s, 'Sección ' || s, now()
+FROM generate_series(1, 400) c, generate_series(1, 10) s;
+
+-- 2 tareas por sección (8.000), con fechas de entrega repartidas en el año
+INSERT INTO "mdl_assign" ("id", "course", "name", "intro", "section", "duedate", "timemodified")
+SELECT :assign_base + (sec - 1) * 2 + a,
+       :course_base + ((sec - 1) / 10) + 1,
+       'Tarea ' || a, 'Descripción', :section_base + sec,
+       now() + ((sec * 2 + a) % 365 - 180) * interval '1 day', now()
+FROM generate_series(1, 4000) sec, generate_series(1, 2) a;
+
+-- Cada usuario matriculado en 5 cursos (200.000 matrículas)
+INSERT INTO "mdl_user_enrolments" ("enrolid", "userid", "courseid", "status", "timecreated", "timemodified")
+SELECT 1, :user_base + u, :course_base + ((u * 7 + k * 53) % 400) + 1, 0, now(), now()
+FROM generate_series(1, 40000) u, generate_series(1, 5) k;
+
+INSERT INTO "mdl_role_assignments" ("roleid", "contextid", "userid", "timemodified", "modifierid")
+SELECT :bench_role, :course_base + ((u * 7) % 400) + 1, :user_base + u, now(), 1
+FROM generate_series(1, 40000) u;
+
+-- 200.000 entregas
+INSERT INTO "mdl_assign_submission" ("assignment", "userid", "timecreated", "timemodified", "status", "latest")
+SELECT :assign_base + ((u * 13 + k * 101) % 8000) + 1, :user_base + u, now(), now(), 'submitted', true
+FROM generate_series(1, 40000) u, generate_series(1, 5) k;
+
+-- Un foro por curso, 20 discusiones por foro y 25 mensajes por discusión (200.000 mensajes)
+INSERT INTO "mdl_forum" ("id", "course", "name", "intro", "timemodified")
+SELECT :forum_base + c, :course_base + c, 'Foro ' || c, 'Intro', now()
+FROM generate_series(1, 400) c;
+
+INSERT INTO "mdl_forum_discussions" ("id", "course", "forum", "name", "firstpost", "userid", "timemodified")
+SELECT :discussion_base + (f - 1) * 20 + d, :course_base + f, :forum_base + f, 'Discusión ' || d, 0, :user_base + d, now()
+FROM generate_series(1, 400) f, generate_series(1, 20) d;
+
+INSERT INTO "mdl_forum_posts" ("discussion", "userid", "created", "modified", "subject", "message")
+SELECT :discussion_base + d, :user_base + ((d * 31 + p) % 40000) + 1, now() - p * interval '1 minute', now(), 'Re', 'Mensaje'
+FROM generate_series(1, 8000) d, generate_series(1, 25) p;
+
+-- Un ítem de calificación por tarea y 200.000 calificaciones
+INSERT INTO "mdl_grade_items" ("id", "courseid", "itemname", "itemtype", "itemmodule", "iteminstance", "timecreated", "timemodified")
+SELECT :item_base + a, :course_base + ((a - 1) / 20) + 1, 'Tarea ' || a, 'mod', 'assign', :assign_base + a, now(), now()
+FROM generate_series(1, 8000) a;
+
+INSERT INTO "mdl_grade_grades" ("itemid", "userid", "rawgrade", "finalgrade", "timecreated", "timemodified")
+SELECT :item_base + ((u * 17 + k * 211) % 8000) + 1, :user_base + u, 80, 80, now(), now()
+FROM generate_series(1, 40000) u, generate_series(1, 5) k;
+
+-- Valores de ejemplo para las consultas (un usuario con matrícula y entrega reales)
+SELECT :user_base + 20000 AS q_user,
+       :course_base + ((20000 * 7) % 400) + 1 AS q_course,
+       :assign_base + ((20000 * 13 + 101) % 8000) + 1 AS q_assign,
+       :forum_base + 200 AS q_forum,
+       :discussion_base + 4000 AS q_discussion \gset
+
+-- ----- CONSULTAS DE LOS CAMINOS CRÍTICOS ----- --
+
+\set explain 'EXPLAIN (ANALYZE, BUFFERS, COSTS OFF, SUMMARY ON)'
+
+\set q1 'SELECT * FROM "mdl_user_enrolments" WHERE "userid" = ' :q_user ' AND "courseid" = ' :q_course ' AND "status" = 0 LIMIT 1'
+\set q2 'SELECT * FROM "mdl_user_enrolments" WHERE "courseid" = ' :q_course
+\set q3 'SELECT * FROM "mdl_assign_submission" WHERE "assignment" = ' :q_assign ' AND "userid" = ' :q_user
+\set q4 'SELECT * FROM "mdl_assign_submission" WHERE "userid" = ' :q_user
+\set q5 'SELECT * FROM "mdl_forum_posts" WHERE "discussion" = ' :q_discussion ' ORDER BY "created"'
+\set q6 'SELECT * FROM "mdl_forum_discussions" WHERE "forum" = ' :q_forum
+\set q7 'SELECT * FROM "mdl_grade_grades" WHERE "userid" = ' :q_user ' AND "itemid" IN (SELECT "id" FROM "mdl_grade_items" WHERE "courseid" = ' :q_course ')'
+\set q8 'SELECT * FROM "mdl_role_assignments" WHERE "userid" = ' :q_user ' AND "contextid" = ' :q_course
+\set q9 'SELECT * FROM "mdl_course_sections" WHERE "course" = ' :q_course
+\set q10 'SELECT * FROM "mdl_assign" WHERE "course" = ' :q_course ' AND "duedate" >= now()'
+
+-- ----- ANTES: sin los índices de la migración ----- --
+
+DROP INDEX IF EXISTS "mdl_course_sections_course_section_idx";
+DROP INDEX IF EXISTS "mdl_role_assignments_userid_contextid_idx";
+DROP INDEX IF EXISTS "mdl_user_enrolments_userid_courseid_status_idx";
+DROP INDEX IF EXISTS "mdl_user_enrolments_courseid_idx";
+DROP INDEX IF EXISTS "mdl_assign_course_duedate_idx";
+DROP INDEX IF EXISTS "mdl_assign_duedate_idx";
+DROP INDEX IF EXISTS "mdl_assign_section_idx";
+DROP INDEX IF EXISTS "mdl_assign_submission_assignment_userid_idx";
+DROP INDEX IF EXISTS "mdl_assign_submission_userid_idx";
+DROP INDEX IF EXISTS "mdl_course_completions_userid_course_idx";
+DROP INDEX IF EXISTS "mdl_course_completions_course_idx";
+DROP INDEX IF EXISTS "mdl_forum_course_idx";
+DROP INDEX IF EXISTS "mdl_forum_discussions_forum_idx";
+DROP INDEX IF EXISTS "mdl_forum_posts_discussion_created_idx";
+DROP INDEX IF EXISTS "mdl_grade_items_courseid_idx";
+DROP INDEX IF EXISTS "mdl_grade_items_itemmodule_iteminstance_idx";
+DROP INDEX IF EXISTS "mdl_grade_grades_userid_itemid_idx";
+DROP INDEX IF EXISTS "mdl_grade_grades_itemid_idx";
+DROP INDEX IF EXISTS "mdl_resource_course_idx";
+
+ANALYZE;
+
+\echo '======================== ANTES (sin índices) ========================'
+\echo '--- Q1: matrícula activa (upload_assignment_file) ---'
+:explain :q1;
+\echo '--- Q2: matrículas de un curso ---'
+:explain :q2;
+\echo '--- Q3: entregas de un usuario en una tarea ---'
+:explain :q3;
+\echo '--- Q4: entregas de un usuario ---'
+:explain :q4;
+\echo '--- Q5: mensajes de una discusión ---'
+:explain :q5;
+\echo '--- Q6: discusiones de un foro ---'
+:explain :q6;
+\echo '--- Q7: calificaciones de un usuario en un curso ---'
+:explain :q7;
+\echo '--- Q8: roles de un usuario en un curso ---'
+:explain :q8;
+\echo '--- Q9: secciones de un curso ---'
+:explain :q9;
+\echo '--- Q10: tareas próximas de un curso ---'
+:explain :q10;
+
+-- ----- DESPUÉS: con los índices de la migración ----- --
+
+\ir ../prisma/migrations/20261017120000_hot_path_indexes/migration.sql
+
+ANALYZE;
+
+\echo '======================== DESPUÉS (con índices) ========================'
+\echo '--- Q1: matrícula activa (upload_assignment_file) ---'
+:explain :q1;
+\echo '--- Q2: matrículas de un curso ---'
+:explain :q2;
+\echo '--- Q3: entregas de un usuario en una tarea ---'
+:explain :q3;
+\echo '--- Q4: entregas de un usuario ---'
+:explain :q4;
+\echo '--- Q5: mensajes de una discusión ---'
+:explain :q5;
+\echo '--- Q6: discusiones de un foro ---'
+:explain :q6;
+\echo '--- Q7: calificaciones de un usuario en un curso ---'
+:explain :q7;
+\echo '--- Q8: roles de un usuario en un curso ---'
+:explain :q8;
+\echo '--- Q9: secciones de un curso ---'
+:explain :q9;
+\echo '--- Q10: tareas próximas de un curso ---'
+:explain :q10;
+
+ROLLBACK;
@@ -0,0 +1,121 @@
+import logging
+import os
+import re
+import zipfile
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Iterable, Iterator, List
+
+logger = logging.getLogger(__name__)
+
+# ZIP generado al vuelo: zipfile escribe sobre un flujo no posicionable (usa
+# descriptores de datos después de cada entrada) y cada bloque se entrega a la
+# respuesta apenas se produce, así que la memoria usada no depende del tamaño
+# total ni hace falta un archivo temporal.
+ARCHIVE_CHUNK_SIZE = int(os.getenv("ARCHIVE_CHUNK_SIZE", str(1024 * 1024)))
+
+# Formatos que ya vienen comprimidos; volver a comprimirlos solo gasta CPU
+_STORED_PREFIXES = ("image/", "video/", "audio/")
+_STORED_TYPES = {
+    "application/zip",
+    "application/gzip",
+    "application/x-7z-compressed",
+    "application/x-rar-compressed",
+    "application/pdf",
+    "application/vnd.openxmlformats-officedocument.wordprocessingml.document",
+    "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+    "application/vnd.openxmlformats-officedocument.presentationml.presentation",
+}
+
+
+@dataclass
+class ArchiveEntry:
+    name: str
+    path: str
+    size: int
+    modified: datetime
+    mimetype: str = None
+
+
+class _ChunkSink:
+    # Objeto tipo archivo que solo acumula lo escrito hasta que se vacía
+
+    def __init__(self):
+        self._chunks: List[bytes] = []
+        self._offset = 0
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        self._offset += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        # zipfile lo usa para calcular los desplazamientos del directorio central
+        return self._offset
+
+    def flush(self) -> None:
+        pass
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def _compression(mimetype: str) -> int:
+    if mimetype and (mimetype.startswith(_STORED_PREFIXES) or mimetype in _STORED_TYPES):
+        return zipfile.ZIP_STORED
+    return zipfile.ZIP_DEFLATED
+
+
+def secure_name(value: str) -> str:
+    # Evita separadores de ruta y caracteres problemáticos en los nombres de entrada
+    return re.sub(r"[^A-Za-z0-9._-]+", "_", value).strip("._") or "file"
+
+
+def unique_names(names: Iterable[str]) -> List[str]:
+    # Agrega un sufijo numérico a los nombres repetidos
+    seen = set()
+    result = []
+    for name in names:
+        candidate = name
+        stem, ext = os.path.splitext(name)
+        counter = 1
+        while candidate in seen:
+            counter += 1
+            candidate = f"{stem}-{counter}{ext}"
+        seen.add(candidate)
+        result.append(candidate)
+    return result
+
+
+def stream_zip(entries: Iterable[ArchiveEntry]) -> Iterator[bytes]:
+    # Generador síncrono: StreamingResponse lo recorre en el threadpool, así
+    # que las lecturas de disco y la compresión no bloquean el event loop
+    sink = _ChunkSink()
+    with zipfile.ZipFile(sink, mode="w", allowZip64=True) as archive:
+        for entry in entries:
+            try:
+                source = open(entry.path, "rb")
+            except FileNotFoundError:
+                logger.warning("Archivo no encontrado al exportar, se omite", extra={"fields": {"path": entry.path}})
+                continue
+            with source:
+                info = zipfile.ZipInfo(entry.name, date_time=entry.modified.timetuple()[:6])
+                info.compress_type = _compression(entry.mimetype)
+                # Con el tamaño conocido zipfile decide si la entrada necesita ZIP64
+                info.file_size = entry.size
+                with archive.open(info, mode="w") as target:
+                    while True:
+                        chunk = source.read(ARCHIVE_CHUNK_SIZE)
+                        if not chunk:
+                            break
+                        target.write(chunk)
+                        data = sink.drain()
+                        if data:
+                            yield data
+            data = sink.drain()
+            if data:
+                yield data
+    # Directorio central
+    yield sink.drain()
@@ -0,0 +1,162 @@
+import argparse
+import asyncio
+import os
+import shutil
+import time
+from typing import Dict, Set, Tuple
+
+from starlette.concurrency import run_in_threadpool
+
+from db import prisma_client
+
+# Almacenamiento direccionado por contenido: cada contenido distinto se guarda
+# una sola vez en uploads/blobs/<sha[:2]>/<sha> y cada subida lógica (la ruta
+# registrada en mdl_files) es un enlace duro a ese blob. Subir otra vez el mismo
+# PDF solo crea un enlace nuevo.
+#
+# Conteo de referencias: un blob sigue en uso mientras tenga enlaces lógicos
+# (st_nlink > 1) o alguna fila de mdl_files con su contenthash. El recolector
+# (python -m services.blob_store gc) borra los enlaces sin fila en mdl_files y
+# después los blobs que quedaron sin referencias.
+UPLOAD_DIR = "uploads"
+BLOB_DIR = os.path.join(UPLOAD_DIR, "blobs")
+LOGICAL_DIRS = ("assignments", "resources", "profiles")
+
+# Los archivos más nuevos que esto no se recolectan, para no competir con
+# subidas que todavía no registraron su fila en la base de datos
+GC_GRACE_SECONDS = int(os.getenv("BLOB_GC_GRACE_SECONDS", "3600"))
+
+
+def blob_path(sha256: str) -> str:
+    return os.path.join(BLOB_DIR, sha256[:2], sha256)
+
+
+def _link_or_copy(source: str, destination: str) -> None:
+    os.makedirs(os.path.dirname(destination), exist_ok=True)
+    try:
+        os.link(source, destination)
+    except FileExistsError:
+        os.remove(destination)
+        os.link(source, destination)
+    except OSError as e:
+        if isinstance(e, FileNotFoundError):
+            raise
+        # Sistemas de archivos sin enlaces duros: se guarda una copia
+        shutil.copyfile(source, destination)
+
+
+def store_blob(temp_path: str, sha256: str, destination: str) -> bool:
+    # Mueve el archivo temporal al blob (o lo descarta si el contenido ya
+    # existía) y enlaza la ruta lógica. Devuelve True si hubo deduplicación.
+    # Se ejecuta en el threadpool.
+    target = blob_path(sha256)
+    if os.path.exists(target):
+        try:
+            _link_or_copy(target, destination)
+            # Renueva el periodo de gracia del blob reutilizado
+            os.utime(target)
+            os.remove(temp_path)
+            return True
+        except FileNotFoundError:
+            # El recolector lo borró entre la comprobación y el enlace
+            pass
+
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+    os.chmod(temp_path, 0o444)
+    os.replace(temp_path, target)
+    _link_or_copy(target, destination)
+    return False
+
+
+def _blob_inodes() -> Dict[Tuple[int, int], str]:
+    inodes = {}
+    if not os.path.isdir(BLOB_DIR):
+        return inodes
+    for root, _, files in os.walk(BLOB_DIR):
+        for name in files:
+            path = os.path.join(root, name)
+            st = os.stat(path)
+            inodes[(st.st_dev, st.st_ino)] = path
+    return inodes
+
+
+def _logical_links(blob_inodes: Dict[Tuple[int, int], str]):
+    # Solo se consideran los archivos que son enlaces a un blob; los archivos
+    # subidos antes del almacenamiento por contenido nunca se tocan
+    for directory in LOGICAL_DIRS:
+        base = os.path.join(UPLOAD_DIR, directory)
+        for root, _, files in os.walk(base):
+            for name in files:
+                path = os.path.join(root, name)
+                st = os.stat(path)
+                if (st.st_dev, st.st_ino) in blob_inodes:
+                    yield os.path.relpath(path, UPLOAD_DIR), path, st
+
+
+async def _referenced(batch_size: int = 5000) -> Tuple[Set[str], Set[str]]:
+    paths, hashes = set(), set()
+    after_id = 0
+    while True:
+        files = await prisma_client.file.find_many(
+            where={"id": {"gt": after_id}},
+            order={"id": "asc"},
+            take=batch_size,
+        )
+        for record in files:
+            paths.add(record.path)
+            hashes.add(record.contenthash)
+        if len(files) < batch_size:
+            return paths, hashes
+        after_id = files[-1].id
+
+
+def _sweep(paths: Set[str], hashes: Set[str], grace_seconds: int, dry_run: bool) -> Dict[str, int]:
+    cutoff = time.time() - grace_seconds
+    stats = {"links_removed": 0, "blobs_removed": 0, "bytes_freed": 0}
+
+    blob_inodes = _blob_inodes()
+    for relative, path, st in list(_logical_links(blob_inodes)):
+        if relative not in paths and st.st_mtime < cutoff:
+            stats["links_removed"] += 1
+            if not dry_run:
+                os.remove(path)
+
+    for path in blob_inodes.values():
+        st = os.stat(path)
+        sha256 = os.path.basename(path)
+        # En modo de prueba los enlaces no se borraron, así que el conteo no baja
+        if st.st_nlink > 1 or sha256 in hashes or st.st_mtime >= cutoff:
+            continue
+        stats["blobs_removed"] += 1
+        stats["bytes_freed"] += st.st_size
+        if not dry_run:
+            os.remove(path)
+    return stats
+
+
+async def collect_garbage(grace_seconds: int = GC_GRACE_SECONDS, dry_run: bool = False) -> Dict[str, int]:
+    paths, hashes = await _referenced()
+    return await run_in_threadpool(_sweep, paths, hashes, grace_seconds, dry_run)
+
+
+async def _main(args) -> None:
+    await prisma_client.connect()
+    try:
+        stats = await collect_garbage(args.grace_seconds, args.dry_run)
+    finally:
+        await prisma_client.disconnect()
+    prefix = "[dry-run] " if args.dry_run else ""
+    print(
+        f"{prefix}Enlaces eliminados: {stats['links_removed']}, "
+        f"blobs eliminados: {stats['blobs_removed']}, "
+        f"bytes liberados: {stats['bytes_freed']}"
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Mantenimiento del almacenamiento de archivos por contenido")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    gc_parser = subparsers.add_parser("gc", help="Eliminar enlaces y blobs sin referencias")
+    gc_parser.add_argument("--grace-seconds", type=int, default=GC_GRACE_SECONDS)
+    gc_parser.add_argument("--dry-run", action="store_true")
+    asyncio.run(_main(parser.parse_args()))
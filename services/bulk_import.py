@@ -0,0 +1,97 @@
+import csv
+import io
+import json
+import os
+from typing import Any, Dict, Iterator, List, Sequence
+
+from fastapi import HTTPException, Request, status
+from pydantic import ValidationError
+from starlette.concurrency import run_in_threadpool
+
+# Utilidades comunes de las importaciones masivas: lectura del lote (JSON o CSV)
+# y escritura en bloques, cada uno en su propia transacción, para no mantener
+# abierta una transacción con decenas de miles de filas.
+BULK_CHUNK_SIZE = int(os.getenv("BULK_CHUNK_SIZE", "1000"))
+# Tamaño de las listas IN en las consultas de validación
+BULK_LOOKUP_SIZE = int(os.getenv("BULK_LOOKUP_SIZE", "10000"))
+BULK_MAX_ROWS = int(os.getenv("BULK_MAX_ROWS", "100000"))
+
+
+def chunked(items: Sequence[Any], size: int) -> Iterator[Sequence[Any]]:
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def parse_csv(text: str) -> List[Dict[str, Any]]:
+    # Las celdas vacías se toman como ausentes para que apliquen los valores por defecto
+    reader = csv.DictReader(io.StringIO(text))
+    return [
+        {key.strip(): value for key, value in row.items() if key and value not in (None, "")}
+        for row in reader
+    ]
+
+
+def _decode_csv(raw: bytes) -> str:
+    # utf-8-sig descarta el BOM que agrega Excel; otras codificaciones se rechazan
+    try:
+        return raw.decode("utf-8-sig")
+    except UnicodeDecodeError:
+        raise HTTPException(status_code=400, detail="CSV must be UTF-8")
+
+
+async def read_rows(request: Request) -> List[Dict[str, Any]]:
+    # JSON (lista de objetos), CSV en el cuerpo o CSV como archivo multipart
+    content_type = request.headers.get("content-type", "")
+    if content_type.startswith("multipart/form-data"):
+        form = await request.form()
+        upload = form.get("file")
+        if upload is None or isinstance(upload, str):
+            raise HTTPException(status_code=400, detail="Missing CSV file")
+        raw = await upload.read()
+        rows = await run_in_threadpool(parse_csv, _decode_csv(raw))
+    elif content_type.startswith("text/csv"):
+        raw = await request.body()
+        rows = await run_in_threadpool(parse_csv, _decode_csv(raw))
+    else:
+        try:
+            rows = json.loads(await request.body())
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid JSON body")
+        if not isinstance(rows, list) or not all(isinstance(row, dict) for row in rows):
+            raise HTTPException(status_code=400, detail="Expected a JSON list of objects")
+
+    if not rows:
+        raise HTTPException(status_code=400, detail="No rows to import")
+    if len(rows) > BULK_MAX_ROWS:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"At most {BULK_MAX_ROWS} rows per import"
+        )
+    return rows
+
+
+def validate_row(model: type, row: Dict[str, Any]):
+    # Devuelve (instancia, None) o (None, mensaje de error)
+    try:
+        return model.model_validate(row), None
+    except ValidationError as e:
+        errors = "; ".join(
+            f"{'.'.join(str(part) for part in error['loc'])}: {error['msg']}" for error in e.errors()
+        )
+        return None, errors
+
+
+def row_report(index: int, result: str, detail: str = None, **fields) -> Dict[str, Any]:
+    report = {"row": index, **fields, "result": result}
+    if detail:
+        report["detail"] = detail
+    return report
+
+
+def summarize(rows: List[Dict[str, Any]]) -> Dict[str, int]:
+    summary = {"total": len(rows), "created": 0, "skipped": 0, "failed": 0}
+    for row in rows:
+        key = {"created": "created", "skipped": "skipped"}.get(row["result"], "failed")
+        summary[key] += 1
+    return summary
+
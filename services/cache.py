@@ -0,0 +1,92 @@
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable
+
+from services.metrics import CACHE_ENTRIES, CACHE_REQUESTS
+
+
+class TTLCache:
+    # Caché en memoria del proceso con expiración por entrada y desalojo LRU
+    # cuando se supera maxsize. No es compartida entre workers: cada proceso
+    # puede servir datos con hasta `ttl` segundos de antigüedad tras una
+    # escritura hecha en otro proceso.
+    def __init__(self, name: str, ttl: float, maxsize: int = 1024):
+        self.name = name
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        # Cargas en curso, para que varias solicitudes simultáneas con la misma
+        # clave esperen una sola consulta a la base de datos
+        self._pending: Dict[Hashable, asyncio.Future] = {}
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        entry = self._entries.get(key)
+        if entry is None:
+            return default
+        expires_at, value = entry
+        if expires_at <= time.monotonic():
+            del self._entries[key]
+            CACHE_ENTRIES.labels(self.name).set(len(self._entries))
+            return default
+        self._entries.move_to_end(key)
+        return value
+
+    def set(self, key: Hashable, value: Any) -> None:
+        self._entries[key] = (time.monotonic() + self.ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+        CACHE_ENTRIES.labels(self.name).set(len(self._entries))
+
+    def invalidate(self, key: Hashable = None) -> None:
+        # Sin clave se vacía toda la caché
+        if key is None:
+            self._entries.clear()
+            self._pending.clear()
+        else:
+            self._entries.pop(key, None)
+            self._pending.pop(key, None)
+        CACHE_ENTRIES.labels(self.name).set(len(self._entries))
+
+    async def get_or_load(self, key: Hashable, loader: Callable[[], Awaitable[Any]]) -> Any:
+        missing = object()
+        value = self.get(key, missing)
+        if value is not missing:
+            CACHE_REQUESTS.labels(self.name, "hit").inc()
+            return value
+
+        CACHE_REQUESTS.labels(self.name, "miss").inc()
+        pending = self._pending.get(key)
+        if pending is not None:
+            try:
+                return await asyncio.shield(pending)
+            except asyncio.CancelledError:
+                # Se canceló la carga compartida y no esta espera: se vuelve a intentar
+                if not pending.cancelled() or asyncio.current_task().cancelling():
+                    raise
+            return await self.get_or_load(key, loader)
+
+        future = asyncio.get_running_loop().create_future()
+        self._pending[key] = future
+        try:
+            value = await loader()
+        except Exception as e:
+            future.set_exception(e)
+            # Evita el aviso de "exception was never retrieved" si nadie más esperaba
+            future.exception()
+            raise
+        except BaseException:
+            # Carga cancelada (desconexión, timeout, cierre): quienes la esperaban
+            # no deben quedar colgados en un future que nunca se resuelve
+            future.cancel()
+            raise
+        else:
+            future.set_result(value)
+            # Si se invalidó mientras se cargaba, el valor puede estar desactualizado
+            if self._pending.get(key) is future:
+                self.set(key, value)
+            return value
+        finally:
+            if self._pending.get(key) is future:
+                del self._pending[key]
@@ -0,0 +1,59 @@
+from db import prisma_client
+from exceptions import ConflictError, NotFoundError
+
+# Borrados en cascada con una cantidad fija de sentencias: cada nivel se borra
+# con un delete_many cuyo filtro por relación Prisma traduce a una subconsulta
+# (IN (SELECT ...)), así que el costo en idas y vueltas no depende de cuántas
+# discusiones, mensajes o entregas haya. Todo ocurre en una transacción.
+
+
+async def delete_forum(forum_id: int):
+    async with prisma_client.tx() as transaction:
+        forum = await transaction.forum.find_unique(where={"id": forum_id})
+        if not forum:
+            raise NotFoundError("Forum not found")
+
+        # Mensajes de todas las discusiones del foro en una sola sentencia
+        await transaction.forumpost.delete_many(
+            where={"discussionRelation": {"is": {"forum": forum_id}}}
+        )
+        await transaction.forumdiscussion.delete_many(where={"forum": forum_id})
+        return await transaction.forum.delete(where={"id": forum_id})
+
+
+async def delete_discussion(discussion_id: int):
+    async with prisma_client.tx() as transaction:
+        discussion = await transaction.forumdiscussion.find_unique(where={"id": discussion_id})
+        if not discussion:
+            raise NotFoundError("Discussion not found")
+
+        await transaction.forumpost.delete_many(where={"discussion": discussion_id})
+        return await transaction.forumdiscussion.delete(where={"id": discussion_id})
+
+
+async def delete_assignment(assignment_id: int):
+    grade_items = {"itemmodule": "assign", "iteminstance": assignment_id}
+    async with prisma_client.tx() as transaction:
+        assignment = await transaction.assignment.find_unique(where={"id": assignment_id})
+        if not assignment:
+            raise NotFoundError("Assignment not found")
+
+        # Calificaciones del ítem de la tarea y luego el ítem
+        await transaction.grade.delete_many(where={"gradeItem": {"is": grade_items}})
+        await transaction.gradeitem.delete_many(where=grade_items)
+        # Las filas de mdl_files de las entregas se borran por ON DELETE CASCADE;
+        # los archivos en disco quedan para el recolector (services.blob_store gc)
+        await transaction.submission.delete_many(where={"assignment": assignment_id})
+        return await transaction.assignment.delete(where={"id": assignment_id})
+
+
+async def delete_category(category_id: int):
+    async with prisma_client.tx() as transaction:
+        category = await transaction.category.find_unique(where={"id": category_id})
+        if not category:
+            raise NotFoundError("Category not found")
+
+        # La verificación y el borrado van en la misma transacción
+        if await transaction.categorycourse.count(where={"categoryId": category_id}):
+            raise ConflictError("Cannot delete category with associated courses")
+        return await transaction.category.delete(where={"id": category_id})
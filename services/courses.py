@@ -0,0 +1,121 @@
+import os
+from datetime import datetime, timedelta
+from typing import Any, Dict, List
+
+from db import prisma_client
+from exceptions import NotFoundError
+from models.base import CourseCreate
+from services.reference_data import get_category, invalidate_course_sections
+from services.response_cache import purge
+
+# Creación de cursos en una transacción interactiva: el curso, su relación con
+# la categoría y sus secciones van en un solo create anidado; los foros y los
+# ítems de calificación de plantilla (sin relación con el curso en el esquema)
+# se insertan con create_many. Si algo falla no quedan cursos huérfanos.
+COURSE_BATCH_MAX = int(os.getenv("COURSE_BATCH_MAX", "500"))
+# Un catálogo completo puede tardar más que el timeout por defecto de Prisma (5 s)
+COURSE_BATCH_TIMEOUT = timedelta(seconds=int(os.getenv("COURSE_BATCH_TIMEOUT_SECONDS", "120")))
+
+
+def _course_data(course: CourseCreate, now: datetime) -> Dict[str, Any]:
+    sections = [{
+        "section": 0,
+        "name": "General",
+        "summary": "Sección general",
+        "visible": True,
+        "timemodified": now
+    }]
+    sections += [
+        {
+            "section": number,
+            "name": f"Tema {number}",
+            "visible": True,
+            "timemodified": now
+        }
+        for number in range(1, course.sections + 1)
+    ]
+    return {
+        "category": course.category,
+        "sortorder": course.sortorder,
+        "fullname": course.fullname,
+        "shortname": course.shortname,
+        "idnumber": course.idnumber,
+        "summary": course.summary,
+        "format": course.format,
+        "showgrades": True,
+        "newsitems": 5,
+        "startdate": course.startdate,
+        "enddate": course.enddate,
+        "visible": course.visible,
+        "groupmode": 0,
+        "timecreated": now,
+        "timemodified": now,
+        # Escrituras anidadas: se resuelven en la misma consulta que el curso
+        "categories": {"create": [{"categoryId": course.category}]},
+        "sections": {"create": sections}
+    }
+
+
+def _template_rows(course: CourseCreate, course_id: int, now: datetime):
+    forums = [
+        {
+            "course": course_id,
+            "type": forum.type,
+            "name": forum.name,
+            "intro": forum.intro,
+            "timemodified": now
+        }
+        for forum in course.forums
+    ]
+    grade_items = [
+        {
+            "courseid": course_id,
+            "itemname": item.itemname,
+            "itemtype": item.itemtype,
+            "grademax": item.grademax,
+            "grademin": item.grademin,
+            "gradepass": item.gradepass,
+            "sortorder": sortorder,
+            "timecreated": now,
+            "timemodified": now
+        }
+        for sortorder, item in enumerate(course.grade_items, start=1)
+    ]
+    return forums, grade_items
+
+
+async def _check_categories(courses: List[CourseCreate]) -> None:
+    # Las categorías se leen de la caché, sin ir a la base de datos
+    for category_id in {course.category for course in courses}:
+        if await get_category(category_id) is None:
+            raise NotFoundError(f"Category {category_id} does not exist")
+
+
+async def create_courses(courses: List[CourseCreate]) -> List[Any]:
+    await _check_categories(courses)
+
+    now = datetime.utcnow()
+    created = []
+    forums, grade_items = [], []
+    async with prisma_client.tx(timeout=COURSE_BATCH_TIMEOUT) as transaction:
+        for course in courses:
+            new_course = await transaction.course.create(data=_course_data(course, now))
+            created.append(new_course)
+            course_forums, course_grade_items = _template_rows(course, new_course.id, now)
+            forums += course_forums
+            grade_items += course_grade_items
+
+        # Una sola inserción por tabla para todo el lote
+        if forums:
+            await transaction.forum.create_many(data=forums)
+        if grade_items:
+            await transaction.gradeitem.create_many(data=grade_items)
+
+    for new_course in created:
+        invalidate_course_sections(new_course.id)
+    purge("Course")
+    return created
+
+
+async def create_course(course: CourseCreate):
+    return (await create_courses([course]))[0]
@@ -0,0 +1,102 @@
+import os
+from email.utils import format_datetime
+
+from fastapi import Request
+from fastapi.responses import FileResponse, Response
+from starlette.concurrency import run_in_threadpool
+from starlette.types import Receive, Scope, Send
+
+from services.http_cache import _as_utc, _etag_matches
+
+# Descargas de archivos guardados en mdl_files. FileResponse ya resuelve Range,
+# If-Range, respuestas 206 (también multipart/byteranges) y 416; aquí se le da
+# un ETag fuerte a partir del SHA-256 guardado para que If-Range e If-None-Match
+# sigan siendo válidos aunque el archivo se vuelva a enlazar en disco.
+DOWNLOAD_CHUNK_SIZE = int(os.getenv("DOWNLOAD_CHUNK_SIZE", str(1024 * 1024)))
+DOWNLOAD_CACHE_CONTROL = os.getenv("DOWNLOAD_CACHE_CONTROL", "private, no-cache")
+
+# Extensiones ASGI para enviar el archivo sin copiarlo al proceso de Python
+ZEROCOPY_EXTENSION = "http.response.zerocopysend"
+PATHSEND_EXTENSION = "http.response.pathsend"
+
+
+class StoredFileResponse(FileResponse):
+    chunk_size = DOWNLOAD_CHUNK_SIZE
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        extensions = scope.get("extensions") or {}
+        self._zerocopy = ZEROCOPY_EXTENSION in extensions
+        self._pathsend = PATHSEND_EXTENSION in extensions
+        await super().__call__(scope, receive, send)
+
+    async def _handle_simple(self, send: Send, send_header_only: bool) -> None:
+        if send_header_only or not (self._zerocopy or self._pathsend):
+            return await super()._handle_simple(send, send_header_only)
+        await send({"type": "http.response.start", "status": self.status_code, "headers": self.raw_headers})
+        if self._pathsend:
+            await send({"type": PATHSEND_EXTENSION, "path": os.path.abspath(self.path)})
+        else:
+            await self._sendfile(send, 0, int(self.headers["content-length"]))
+
+    async def _handle_single_range(
+        self, send: Send, start: int, end: int, file_size: int, send_header_only: bool
+    ) -> None:
+        if send_header_only or not self._zerocopy:
+            return await super()._handle_single_range(send, start, end, file_size, send_header_only)
+        self.headers["content-range"] = f"bytes {start}-{end - 1}/{file_size}"
+        self.headers["content-length"] = str(end - start)
+        await send({"type": "http.response.start", "status": 206, "headers": self.raw_headers})
+        await self._sendfile(send, start, end - start)
+
+    async def _handle_multiple_ranges(self, send: Send, ranges, file_size: int, send_header_only: bool) -> None:
+        async def send_multipart(message) -> None:
+            if message["type"] == "http.response.start":
+                # Starlette anuncia el multipart en Content-Range; según RFC 9110
+                # va en Content-Type y la respuesta no lleva Content-Range
+                multipart = self.headers["content-range"]
+                del self.headers["content-range"]
+                self.headers["content-type"] = multipart
+                message["headers"] = self.raw_headers
+            await send(message)
+
+        await super()._handle_multiple_ranges(send_multipart, ranges, file_size, send_header_only)
+
+    async def _sendfile(self, send: Send, offset: int, count: int) -> None:
+        # El servidor usa os.sendfile sobre el descriptor; la apertura va al
+        # threadpool porque en discos de red puede bloquear el event loop
+        file = await run_in_threadpool(open, self.path, "rb")
+        with file:
+            await send({
+                "type": ZEROCOPY_EXTENSION,
+                "file": file,
+                "offset": offset,
+                "count": count,
+                "more_body": False,
+            })
+
+
+def file_download(
+    request: Request,
+    path: str,
+    stored_file,
+    filename: str = None,
+    variant: str = None,
+    media_type: str = None,
+) -> Response:
+    # variant distingue derivados del mismo contenido (por ejemplo miniaturas)
+    etag = f'"{stored_file.contenthash}-{variant}"' if variant else f'"{stored_file.contenthash}"'
+    headers = {
+        "ETag": etag,
+        "Cache-Control": DOWNLOAD_CACHE_CONTROL,
+        # La fecha del registro no cambia cuando el blob se reutiliza en otra subida
+        "Last-Modified": format_datetime(_as_utc(stored_file.timecreated), usegmt=True),
+    }
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None and _etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers=headers)
+    return StoredFileResponse(
+        path=path,
+        filename=filename,
+        media_type=media_type or stored_file.mimetype,
+        headers=headers,
+    )
@@ -0,0 +1,211 @@
+import argparse
+import asyncio
+import hashlib
+import mimetypes
+import os
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Set, Tuple
+
+from db import prisma_client
+from services.blob_store import UPLOAD_DIR
+from services.thumbnails import THUMBNAIL_SIZES, thumbnail_path
+
+# Registra en mdl_files los archivos subidos antes de la migración file_metadata,
+# para que las descargas por índice los sigan encontrando. La entrega o el
+# usuario salen de la estructura de directorios:
+#
+#   assignments/<tarea>/<usuario>/  -> última entrega de ese usuario en la tarea
+#   profiles/<usuario>/             -> imagen de perfil del usuario
+#   resources/<curso>/              -> recurso del curso cuyo timemodified está más
+#                                      cerca del mtime del archivo (--resource-owner)
+#
+# Se toma el archivo más reciente de cada directorio, como hacían las descargas
+# antes de la migración. Las entregas, perfiles y recursos que ya tienen fila no
+# se tocan, así que se puede ejecutar más de una vez.
+ASSIGNMENT_DIR = os.path.join(UPLOAD_DIR, "assignments")
+RESOURCE_DIR = os.path.join(UPLOAD_DIR, "resources")
+PROFILE_DIR = os.path.join(UPLOAD_DIR, "profiles")
+
+# Diferencia máxima entre el mtime del archivo y el timemodified del recurso
+RESOURCE_MATCH_SECONDS = int(os.getenv("FILE_BACKFILL_RESOURCE_MATCH_SECONDS", "300"))
+
+_HASH_CHUNK_SIZE = 1024 * 1024
+# Miniaturas de las imágenes de perfil (<nombre>_<tamaño>.webp)
+_THUMBNAIL_SUFFIXES = tuple(thumbnail_path("", size) for size in THUMBNAIL_SIZES)
+
+
+def _numbered_dirs(base: str) -> List[Tuple[int, str]]:
+    if not os.path.isdir(base):
+        return []
+    return [
+        (int(name), os.path.join(base, name))
+        for name in sorted(os.listdir(base))
+        if name.isdigit() and os.path.isdir(os.path.join(base, name))
+    ]
+
+
+def _candidates(directory: str, registered: Set[str], exclude_thumbnails: bool = False) -> List[Tuple[float, str]]:
+    # Archivos sin fila en mdl_files, del más reciente al más antiguo
+    files = []
+    for name in os.listdir(directory):
+        path = os.path.join(directory, name)
+        if name.endswith(".part") or not os.path.isfile(path):
+            continue
+        if exclude_thumbnails and name.endswith(_THUMBNAIL_SUFFIXES):
+            continue
+        if os.path.relpath(path, UPLOAD_DIR) in registered:
+            continue
+        files.append((os.path.getmtime(path), path))
+    files.sort(reverse=True)
+    return files
+
+
+def _hash_file(path: str) -> str:
+    hasher = hashlib.sha256()
+    with open(path, "rb") as handle:
+        while True:
+            chunk = handle.read(_HASH_CHUNK_SIZE)
+            if not chunk:
+                return hasher.hexdigest()
+            hasher.update(chunk)
+
+
+def _file_data(component: str, path: str, user_id: int) -> Dict:
+    name = os.path.basename(path)
+    return {
+        "component": component,
+        "path": os.path.relpath(path, UPLOAD_DIR),
+        "filename": name,
+        "filesize": os.path.getsize(path),
+        "contenthash": _hash_file(path),
+        "mimetype": mimetypes.guess_type(name)[0],
+        "userid": user_id,
+        "timecreated": datetime.utcfromtimestamp(os.path.getmtime(path)),
+    }
+
+
+def _timestamp(value: datetime) -> float:
+    # Prisma devuelve fechas con zona; los datos antiguos pueden venir sin ella
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value.timestamp()
+
+
+async def _registered_paths(batch_size: int = 5000) -> Set[str]:
+    paths = set()
+    after_id = 0
+    while True:
+        files = await prisma_client.file.find_many(
+            where={"id": {"gt": after_id}},
+            order={"id": "asc"},
+            take=batch_size,
+        )
+        paths.update(record.path for record in files)
+        if len(files) < batch_size:
+            return paths
+        after_id = files[-1].id
+
+
+async def _create(data: Dict, stats: Dict[str, int], key: str, dry_run: bool) -> None:
+    stats[key] += 1
+    if not dry_run:
+        await prisma_client.file.create(data=data)
+
+
+async def _backfill_submissions(registered: Set[str], stats: Dict[str, int], dry_run: bool) -> None:
+    for assignment_id, assignment_dir in _numbered_dirs(ASSIGNMENT_DIR):
+        for user_id, user_dir in _numbered_dirs(assignment_dir):
+            files = _candidates(user_dir, registered)
+            if not files:
+                continue
+            submission = await prisma_client.submission.find_first(
+                where={"assignment": assignment_id, "userid": user_id},
+                order={"attemptnumber": "desc"}
+            )
+            if submission is None:
+                stats["unmatched"] += 1
+                print(f"  sin entrega: {user_dir}")
+                continue
+            if await prisma_client.file.find_first(where={"submissionid": submission.id}):
+                continue
+            data = _file_data("assignment", files[0][1], user_id)
+            data["submissionid"] = submission.id
+            await _create(data, stats, "submissions", dry_run)
+
+
+async def _backfill_profiles(registered: Set[str], stats: Dict[str, int], dry_run: bool) -> None:
+    for user_id, user_dir in _numbered_dirs(PROFILE_DIR):
+        files = _candidates(user_dir, registered, exclude_thumbnails=True)
+        if not files:
+            continue
+        if await prisma_client.file.find_first(where={"userid": user_id, "component": "profile"}):
+            continue
+        if await prisma_client.user.find_unique(where={"id": user_id}) is None:
+            stats["unmatched"] += 1
+            print(f"  sin usuario: {user_dir}")
+            continue
+        await _create(_file_data("profile", files[0][1], user_id), stats, "profiles", dry_run)
+
+
+async def _backfill_resources(registered: Set[str], owner_id: Optional[int], stats: Dict[str, int], dry_run: bool) -> None:
+    for course_id, course_dir in _numbered_dirs(RESOURCE_DIR):
+        files = _candidates(course_dir, registered)
+        if not files:
+            continue
+        if owner_id is None:
+            stats["unmatched"] += len(files)
+            print(f"  recursos sin --resource-owner: {course_dir}")
+            continue
+        resources = await prisma_client.resource.find_many(
+            where={"course": course_id},
+            include={"files": True},
+            order={"timemodified": "desc"}
+        )
+        # Cada recurso sin archivo se queda con el archivo libre más cercano en el tiempo
+        for resource in resources:
+            if resource.files or not files:
+                continue
+            target = _timestamp(resource.timemodified)
+            mtime, path = min(files, key=lambda item: abs(item[0] - target))
+            if abs(mtime - target) > RESOURCE_MATCH_SECONDS:
+                continue
+            files.remove((mtime, path))
+            data = _file_data("resource", path, owner_id)
+            data["resourceid"] = resource.id
+            await _create(data, stats, "resources", dry_run)
+        for _, path in files:
+            stats["unmatched"] += 1
+            print(f"  sin recurso: {path}")
+
+
+async def backfill(owner_id: Optional[int] = None, dry_run: bool = False) -> Dict[str, int]:
+    stats = {"submissions": 0, "profiles": 0, "resources": 0, "unmatched": 0}
+    registered = await _registered_paths()
+    await _backfill_submissions(registered, stats, dry_run)
+    await _backfill_profiles(registered, stats, dry_run)
+    await _backfill_resources(registered, owner_id, stats, dry_run)
+    return stats
+
+
+async def _main(args) -> None:
+    await prisma_client.connect()
+    try:
+        stats = await backfill(args.resource_owner, args.dry_run)
+    finally:
+        await prisma_client.disconnect()
+    prefix = "[dry-run] " if args.dry_run else ""
+    print(
+        f"{prefix}Entregas: {stats['submissions']}, perfiles: {stats['profiles']}, "
+        f"recursos: {stats['resources']}, sin asociar: {stats['unmatched']}"
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Registrar en mdl_files los archivos subidos antes de file_metadata")
+    parser.add_argument(
+        "--resource-owner",
+        type=int,
+        help="Usuario (id) al que se atribuyen los recursos; sin él los recursos no se registran"
+    )
+    parser.add_argument("--dry-run", action="store_true")
+    asyncio.run(_main(parser.parse_args()))
@@ -0,0 +1,99 @@
+import hashlib
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from functools import lru_cache
+from typing import Any, List, Optional, Sequence, Type
+
+from fastapi import Request, Response
+from pydantic import BaseModel, TypeAdapter
+
+# GET condicionales (RFC 7232) para los endpoints REST de lectura que la SPA
+# consulta periódicamente. Cuando el validador enviado por el cliente coincide
+# se responde 304 sin cuerpo y sin serializar el modelo.
+
+
+@lru_cache(maxsize=None)
+def _list_adapter(model: Type[BaseModel]) -> TypeAdapter:
+    return TypeAdapter(List[model])
+
+
+def _as_utc(value: datetime) -> datetime:
+    # Prisma devuelve fechas con zona; los datos antiguos pueden venir sin ella
+    if value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value.astimezone(timezone.utc)
+
+
+def _etag_matches(if_none_match: str, etag: str) -> bool:
+    # Comparación débil: W/"x" y "x" se consideran el mismo validador
+    if if_none_match.strip() == "*":
+        return True
+    opaque = etag[2:] if etag.startswith("W/") else etag
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == opaque:
+            return True
+    return False
+
+
+def _not_modified_since(if_modified_since: str, last_modified: datetime) -> bool:
+    try:
+        since = parsedate_to_datetime(if_modified_since)
+    except (TypeError, ValueError):
+        return False
+    if since is None:
+        return False
+    # La cabecera HTTP tiene resolución de segundos
+    return _as_utc(last_modified).replace(microsecond=0) <= _as_utc(since)
+
+
+def _is_not_modified(request: Request, etag: str, last_modified: Optional[datetime]) -> bool:
+    # If-None-Match tiene precedencia sobre If-Modified-Since
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        return _etag_matches(if_none_match, etag)
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since is not None and last_modified is not None:
+        return _not_modified_since(if_modified_since, last_modified)
+    return False
+
+
+def _respond(
+    request: Request,
+    etag: str,
+    last_modified: Optional[datetime],
+    cache_control: str,
+    render,
+) -> Response:
+    headers = {"ETag": etag, "Cache-Control": cache_control}
+    if last_modified is not None:
+        headers["Last-Modified"] = format_datetime(_as_utc(last_modified), usegmt=True)
+    if _is_not_modified(request, etag, last_modified):
+        return Response(status_code=304, headers=headers)
+    return Response(content=render(), media_type="application/json", headers=headers)
+
+
+def entity_response(request: Request, model: Type[BaseModel], record: Any, cache_control: str) -> Response:
+    # ETag fuerte a partir del cuerpo serializado con el modelo de respuesta
+    body = model.model_validate(record, from_attributes=True).model_dump_json().encode("utf-8")
+    etag = f'"{hashlib.sha256(body).hexdigest()[:32]}"'
+    return _respond(request, etag, getattr(record, "timemodified", None), cache_control, lambda: body)
+
+
+def collection_response(request: Request, model: Type[BaseModel], records: Sequence[Any], cache_control: str) -> Response:
+    # ETag débil a partir de la cantidad, los ids y el timemodified de cada
+    # registro: cambia al crear, borrar o modificar cualquier registro y se
+    # calcula sin serializar la lista. Sin Last-Modified: el máximo timemodified
+    # no cambia al borrar un registro y If-Modified-Since daría un 304 falso
+    digest = hashlib.sha256()
+    for record in records:
+        digest.update(f"{record.id}:{getattr(record, 'timemodified', '')};".encode("utf-8"))
+    etag = f'W/"{len(records)}-{digest.hexdigest()[:32]}"'
+
+    def render() -> bytes:
+        adapter = _list_adapter(model)
+        return adapter.dump_json(adapter.validate_python(list(records), from_attributes=True))
+
+    return _respond(request, etag, None, cache_control, render)
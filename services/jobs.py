@@ -0,0 +1,102 @@
+import asyncio
+import logging
+import os
+import time
+import uuid
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+# Tareas de mantenimiento en segundo plano. Se ejecutan en el event loop del
+# worker que recibió la petición y el progreso se consulta por id; el registro
+# es en memoria, así que la consulta debe llegar al mismo worker (o usar un
+# solo worker para las tareas administrativas).
+JOB_RETENTION_SECONDS = int(os.getenv("JOB_RETENTION_SECONDS", "3600"))
+
+
+class Job:
+    def __init__(self, kind: str, params: Dict[str, Any]):
+        self.id = uuid.uuid4().hex
+        self.kind = kind
+        self.params = params
+        self.status = "pending"
+        self.total: Optional[int] = None
+        self.processed = 0
+        self.result: Any = None
+        self.error: Optional[str] = None
+        self.created = time.time()
+        self.started: Optional[float] = None
+        self.finished: Optional[float] = None
+
+    def progress(self, processed: int, total: Optional[int] = None) -> None:
+        self.processed = processed
+        if total is not None:
+            self.total = total
+
+    def snapshot(self) -> Dict[str, Any]:
+        end = self.finished or time.time()
+        return {
+            "id": self.id,
+            "kind": self.kind,
+            "status": self.status,
+            "params": self.params,
+            "total": self.total,
+            "processed": self.processed,
+            "percent": round(100 * self.processed / self.total, 1) if self.total else None,
+            "elapsed_seconds": round(end - self.started, 3) if self.started else None,
+            "result": self.result,
+            "error": self.error,
+        }
+
+
+class JobRegistry:
+    def __init__(self, retention: int):
+        self.retention = retention
+        self._jobs: Dict[str, Job] = {}
+        # Referencias fuertes: asyncio solo guarda referencias débiles a las tareas
+        self._tasks: Dict[str, asyncio.Task] = {}
+
+    def _purge(self) -> None:
+        cutoff = time.time() - self.retention
+        for job_id, job in list(self._jobs.items()):
+            if job.finished is not None and job.finished < cutoff:
+                del self._jobs[job_id]
+
+    def start(self, kind: str, params: Dict[str, Any], run: Callable[[Job], Awaitable[Any]]) -> Job:
+        self._purge()
+        job = Job(kind, params)
+        self._jobs[job.id] = job
+        self._tasks[job.id] = asyncio.get_running_loop().create_task(self._run(job, run))
+        return job
+
+    async def _run(self, job: Job, run: Callable[[Job], Awaitable[Any]]) -> None:
+        job.status = "running"
+        job.started = time.time()
+        try:
+            job.result = await run(job)
+            job.status = "completed"
+        except asyncio.CancelledError:
+            job.status = "cancelled"
+            raise
+        except Exception as e:
+            logger.exception("Error en tarea en segundo plano", extra={"fields": {"job_id": job.id, "kind": job.kind}})
+            job.status = "failed"
+            job.error = str(e)
+        finally:
+            job.finished = time.time()
+            self._tasks.pop(job.id, None)
+
+    def get(self, job_id: str) -> Optional[Job]:
+        return self._jobs.get(job_id)
+
+    def list(self):
+        self._purge()
+        return sorted(self._jobs.values(), key=lambda job: job.created, reverse=True)
+
+    async def shutdown(self) -> None:
+        for task in list(self._tasks.values()):
+            task.cancel()
+        await asyncio.gather(*self._tasks.values(), return_exceptions=True)
+
+
+jobs = JobRegistry(JOB_RETENTION_SECONDS)
@@ -0,0 +1,63 @@
+from collections import defaultdict
+from typing import Any, Dict, List
+
+from strawberry.dataloader import DataLoader
+
+from db import prisma_client
+
+# DataLoaders por solicitud para resolver relaciones del esquema GraphQL.
+# Cada loader agrupa las claves pedidas durante un mismo tick del event loop
+# y las resuelve con un único find_many(where={campo: {"in": [...]}}).
+
+
+def _by_id_loader(model: str) -> DataLoader:
+    delegate = getattr(prisma_client, model)
+
+    async def load(keys: List[int]) -> List[Any]:
+        records = await delegate.find_many(where={"id": {"in": list(keys)}})
+        by_id = {record.id: record for record in records}
+        return [by_id.get(key) for key in keys]
+
+    return DataLoader(load_fn=load)
+
+
+def _group_loader(model: str, field: str, order: Dict[str, str] = None) -> DataLoader:
+    delegate = getattr(prisma_client, model)
+
+    async def load(keys: List[int]) -> List[List[Any]]:
+        records = await delegate.find_many(
+            where={field: {"in": list(keys)}},
+            order=order or {"id": "asc"},
+        )
+        grouped = defaultdict(list)
+        for record in records:
+            grouped[getattr(record, field)].append(record)
+        return [grouped.get(key, []) for key in keys]
+
+    return DataLoader(load_fn=load)
+
+
+def create_loaders() -> Dict[str, DataLoader]:
+    # Se crean nuevos en cada solicitud para que la caché de los DataLoaders
+    # no mezcle datos entre usuarios ni sobreviva a escrituras posteriores
+    return {
+        # Búsquedas por clave primaria
+        "user_by_id": _by_id_loader("user"),
+        "course_by_id": _by_id_loader("course"),
+        "section_by_id": _by_id_loader("coursesection"),
+        "assignment_by_id": _by_id_loader("assignment"),
+        "forum_by_id": _by_id_loader("forum"),
+        "discussion_by_id": _by_id_loader("forumdiscussion"),
+        "grade_item_by_id": _by_id_loader("gradeitem"),
+        # Relaciones uno a muchos
+        "sections_by_course": _group_loader("coursesection", "course", {"section": "asc"}),
+        "assignments_by_course": _group_loader("assignment", "course"),
+        "assignments_by_section": _group_loader("assignment", "section"),
+        "forums_by_course": _group_loader("forum", "course"),
+        "discussions_by_forum": _group_loader("forumdiscussion", "forum"),
+        "posts_by_discussion": _group_loader("forumpost", "discussion", {"created": "asc"}),
+        "submissions_by_assignment": _group_loader("submission", "assignment"),
+        "grades_by_item": _group_loader("grade", "itemid"),
+        "grade_items_by_course": _group_loader("gradeitem", "courseid"),
+        "enrollments_by_course": _group_loader("enrollment", "courseid"),
+    }
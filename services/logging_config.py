@@ -0,0 +1,126 @@
+import atexit
+import json
+import logging
+import os
+import queue
+import random
+import time
+import uuid
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+from typing import Optional
+
+from services.metrics import route_template
+
+# Los registros se encolan desde el event loop y un hilo en segundo plano los
+# formatea como JSON y los escribe, así la E/S de logging no bloquea solicitudes.
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+# Fracción de respuestas exitosas (< 400) que se registran en el access log
+ACCESS_LOG_SAMPLE_RATE = float(os.getenv("ACCESS_LOG_SAMPLE_RATE", "0.1"))
+# Las solicitudes más lentas que este umbral se registran siempre
+ACCESS_LOG_SLOW_MS = float(os.getenv("ACCESS_LOG_SLOW_MS", "1000"))
+
+REQUEST_ID_HEADER = b"x-request-id"
+
+access_logger = logging.getLogger("access")
+
+_listener: Optional[QueueListener] = None
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "timestamp": datetime.fromtimestamp(record.created, tz=timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        # Campos estructurados pasados con extra={"fields": {...}}
+        fields = getattr(record, "fields", None)
+        if fields:
+            entry.update(fields)
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+def configure_logging() -> None:
+    global _listener
+    if _listener is not None:
+        return
+
+    log_queue = queue.SimpleQueue()
+    stream_handler = logging.StreamHandler()
+    stream_handler.setFormatter(JsonFormatter())
+    _listener = QueueListener(log_queue, stream_handler, respect_handler_level=True)
+
+    root = logging.getLogger()
+    root.handlers = [QueueHandler(log_queue)]
+    root.setLevel(LOG_LEVEL)
+
+    # El access log propio reemplaza al de uvicorn
+    logging.getLogger("uvicorn.access").disabled = True
+
+    _listener.start()
+    # Vacía la cola antes de terminar el proceso
+    atexit.register(_listener.stop)
+
+
+def _should_log(status_code: int, duration_ms: float) -> bool:
+    if status_code >= 400 or duration_ms >= ACCESS_LOG_SLOW_MS:
+        return True
+    return random.random() < ACCESS_LOG_SAMPLE_RATE
+
+
+class AccessLogMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        request_id = None
+        for name, value in scope["headers"]:
+            if name == REQUEST_ID_HEADER:
+                request_id = value.decode("latin-1")
+                break
+        if not request_id:
+            request_id = uuid.uuid4().hex
+
+        status_code = 500
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                # Se devuelve el id para poder correlacionar la respuesta con el log
+                headers = list(message.get("headers", []))
+                headers.append((REQUEST_ID_HEADER, request_id.encode("latin-1")))
+                message["headers"] = headers
+            await send(message)
+
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            duration_ms = (time.perf_counter() - start) * 1000
+            if _should_log(status_code, duration_ms):
+                level = logging.ERROR if status_code >= 500 else logging.WARNING if status_code >= 400 else logging.INFO
+                access_logger.log(
+                    level,
+                    "%s %s %s",
+                    scope["method"],
+                    scope["path"],
+                    status_code,
+                    extra={"fields": {
+                        "request_id": request_id,
+                        "method": scope["method"],
+                        "route": route_template(scope),
+                        "path": scope["path"],
+                        "status": status_code,
+                        "duration_ms": round(duration_ms, 2),
+                        "slow": duration_ms >= ACCESS_LOG_SLOW_MS,
+                    }},
+                )
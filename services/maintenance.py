@@ -0,0 +1,84 @@
+import hmac
+import os
+from typing import Any, Dict, Optional
+
+from fastapi import HTTPException, status
+
+from db import prisma_client
+from services.jobs import Job, jobs
+from services.passwords import hash_password
+
+# Operaciones administrativas sobre muchos usuarios. Se expresan como
+# update_many sobre un filtro y se ejecutan como tareas en segundo plano.
+# La clave de administrador se configura con ADMIN_SECRET_KEY; sin ella los
+# endpoints administrativos quedan deshabilitados.
+ADMIN_SECRET_KEY = os.getenv("ADMIN_SECRET_KEY")
+# Cantidad de ids por sentencia UPDATE: mantiene cortos los bloqueos de filas y
+# permite informar el progreso
+PASSWORD_RESET_BATCH_SIZE = int(os.getenv("PASSWORD_RESET_BATCH_SIZE", "5000"))
+
+
+def check_admin_key(admin_key: str) -> None:
+    if not ADMIN_SECRET_KEY:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Operaciones administrativas deshabilitadas: falta ADMIN_SECRET_KEY"
+        )
+    if not hmac.compare_digest(admin_key.encode("utf-8"), ADMIN_SECRET_KEY.encode("utf-8")):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Clave de administrador incorrecta"
+        )
+
+
+def user_filter(
+    role: Optional[str] = None,
+    course_id: Optional[int] = None,
+    institution: Optional[str] = None,
+    department: Optional[str] = None,
+) -> Dict[str, Any]:
+    # Filtro de usuarios por rol (shortname), curso en el que están matriculados
+    # o cohorte (institución/departamento)
+    where: Dict[str, Any] = {}
+    if role is not None:
+        where["roles"] = {"some": {"role": {"is": {"shortname": role}}}}
+    if course_id is not None:
+        where["enrollments"] = {"some": {"courseid": course_id}}
+    if institution is not None:
+        where["institution"] = institution
+    if department is not None:
+        where["department"] = department
+    return where
+
+
+async def _reset_passwords(job: Job, hashed_password: str, where: Dict[str, Any]) -> Dict[str, int]:
+    total = await prisma_client.user.count(where=where)
+    job.progress(0, total)
+    if total == 0:
+        return {"updated": 0}
+
+    first = await prisma_client.user.find_first(where=where, order={"id": "asc"})
+    last = await prisma_client.user.find_first(where=where, order={"id": "desc"})
+    updated = 0
+    start = first.id
+    while start <= last.id:
+        end = start + PASSWORD_RESET_BATCH_SIZE
+        updated += await prisma_client.user.update_many(
+            where={"AND": [where, {"id": {"gte": start, "lt": end}}]},
+            data={"password": hashed_password}
+        )
+        job.progress(updated)
+        start = end
+    return {"updated": updated}
+
+
+async def start_password_reset(new_password: str, **filters) -> Job:
+    # La nueva contraseña se hashea una sola vez, todos comparten el mismo hash
+    hashed_password = await hash_password(new_password)
+    where = user_filter(**filters)
+    params = {key: value for key, value in filters.items() if value is not None}
+    return jobs.start(
+        "password_reset",
+        params,
+        lambda job: _reset_passwords(job, hashed_password, where)
+    )
@@ -0,0 +1,286 @@
+import inspect
+import os
+import time
+from typing import Any
+
+from prometheus_client import CONTENT_TYPE_LATEST, Counter, Gauge, Histogram, generate_latest
+from starlette.responses import Response
+from strawberry.extensions import SchemaExtension
+from strawberry.extensions.tracing.utils import should_skip_tracing
+
+from services.passwords import password_hasher
+
+# Métricas expuestas en /metrics para el job "app" de prometheus.yml.
+# Las etiquetas usan siempre plantillas (ruta, modelo, campo) y nunca valores
+# concretos como ids, para que la cardinalidad de las series quede acotada.
+
+# Nombres de operación GraphQL que se usan como etiqueta. El nombre lo elige el
+# cliente: fuera de la lista (o, sin lista, de las consultas ya registradas en
+# la caché de documentos, hasta GRAPHQL_METRICS_MAX_OPERATIONS nombres) se
+# agrupa como "other"
+GRAPHQL_METRICS_OPERATIONS = frozenset(
+    name.strip() for name in os.getenv("GRAPHQL_METRICS_OPERATIONS", "").split(",") if name.strip()
+)
+GRAPHQL_METRICS_MAX_OPERATIONS = int(os.getenv("GRAPHQL_METRICS_MAX_OPERATIONS", "200"))
+OTHER_OPERATION = "other"
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SIZE_BUCKETS = (100, 1_000, 10_000, 100_000, 1_000_000, 10_000_000, 100_000_000)
+
+HTTP_REQUEST_DURATION = Histogram(
+    "http_request_duration_seconds",
+    "Latencia de las solicitudes HTTP",
+    ["method", "route", "status"],
+    buckets=LATENCY_BUCKETS,
+)
+HTTP_REQUESTS_IN_PROGRESS = Gauge(
+    "http_requests_in_progress",
+    "Solicitudes HTTP en curso",
+    ["method"],
+)
+HTTP_RESPONSE_SIZE = Histogram(
+    "http_response_size_bytes",
+    "Tamaño del cuerpo de las respuestas HTTP",
+    ["method", "route"],
+    buckets=SIZE_BUCKETS,
+)
+
+GRAPHQL_OPERATION_DURATION = Histogram(
+    "graphql_operation_duration_seconds",
+    "Latencia de las operaciones GraphQL",
+    ["operation_type", "operation_name", "status"],
+    buckets=LATENCY_BUCKETS,
+)
+GRAPHQL_REJECTED_OPERATIONS = Counter(
+    "graphql_rejected_operations_total",
+    "Operaciones GraphQL rechazadas por profundidad, costo o presupuesto",
+    ["reason"],
+)
+GRAPHQL_RESOLVER_DURATION = Histogram(
+    "graphql_resolver_duration_seconds",
+    "Latencia de los resolvers GraphQL",
+    ["parent_type", "field"],
+    buckets=LATENCY_BUCKETS,
+)
+
+PRISMA_QUERIES = Counter(
+    "prisma_queries_total",
+    "Consultas enviadas a Prisma",
+    ["model", "method", "status"],
+)
+PRISMA_QUERY_DURATION = Histogram(
+    "prisma_query_duration_seconds",
+    "Latencia de las consultas de Prisma",
+    ["model", "method"],
+    buckets=LATENCY_BUCKETS,
+)
+
+UPLOAD_BYTES = Counter(
+    "upload_bytes_total",
+    "Bytes recibidos en subidas de archivos",
+    ["kind"],
+)
+UPLOAD_DURATION = Histogram(
+    "upload_duration_seconds",
+    "Tiempo de copia de cada archivo subido a disco",
+    ["kind"],
+    buckets=LATENCY_BUCKETS,
+)
+UPLOAD_THROUGHPUT = Histogram(
+    "upload_throughput_bytes_per_second",
+    "Velocidad de copia de cada archivo subido",
+    ["kind"],
+    buckets=(1e5, 1e6, 5e6, 1e7, 5e7, 1e8, 5e8, 1e9),
+)
+UPLOAD_DEDUPLICATED = Counter(
+    "upload_deduplicated_total",
+    "Subidas cuyo contenido ya existía en el almacenamiento por contenido",
+    ["kind"],
+)
+UPLOAD_REJECTED = Counter(
+    "upload_rejected_total",
+    "Subidas rechazadas",
+    ["kind", "reason"],
+)
+
+CACHE_REQUESTS = Counter(
+    "cache_requests_total",
+    "Lecturas de las cachés en memoria",
+    ["cache", "result"],
+)
+CACHE_ENTRIES = Gauge(
+    "cache_entries",
+    "Entradas almacenadas en cada caché en memoria",
+    ["cache"],
+)
+
+PASSWORD_HASH_WAITING = Gauge("password_hash_waiting", "Operaciones de contraseña esperando turno")
+PASSWORD_HASH_WAITING.set_function(lambda: password_hasher.snapshot()["waiting"])
+PASSWORD_HASH_ACTIVE = Gauge("password_hash_active", "Operaciones de contraseña en ejecución")
+PASSWORD_HASH_ACTIVE.set_function(lambda: password_hasher.snapshot()["active"])
+PASSWORD_HASH_CONCURRENCY = Gauge("password_hash_concurrency", "Límite de operaciones de contraseña simultáneas")
+PASSWORD_HASH_CONCURRENCY.set(password_hasher.concurrency)
+
+UNMATCHED_ROUTE = "unmatched"
+
+_paths_by_endpoint = {}
+
+
+def route_template(scope) -> str:
+    # El router completa el scope con la ruta encontrada durante la solicitud
+    route = scope.get("route")
+    if route is not None:
+        return route.path
+    # Las rutas añadidas con app.add_route (GraphQL) solo dejan el endpoint
+    endpoint = scope.get("endpoint")
+    if endpoint is None:
+        return UNMATCHED_ROUTE
+    app = scope["app"]
+    paths = _paths_by_endpoint.get(id(app))
+    if paths is None:
+        paths = {
+            id(getattr(r, "endpoint", None)): r.path
+            for r in app.routes
+            if hasattr(r, "path")
+        }
+        _paths_by_endpoint[id(app)] = paths
+    return paths.get(id(endpoint), UNMATCHED_ROUTE)
+
+
+def metrics_endpoint(request) -> Response:
+    return Response(generate_latest(), media_type=CONTENT_TYPE_LATEST)
+
+
+class PrometheusMiddleware:
+    # Middleware ASGI puro: no envuelve el cuerpo de la respuesta como
+    # BaseHTTPMiddleware, solo observa los mensajes que pasan por send
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        status_code = 500
+        response_size = 0
+        content_length = 0
+
+        async def send_wrapper(message):
+            nonlocal status_code, response_size, content_length
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                for name, value in message.get("headers", ()):
+                    if name.lower() == b"content-length":
+                        content_length = int(value)
+            elif message["type"] == "http.response.body":
+                response_size += len(message.get("body", b""))
+            elif message["type"] == "http.response.zerocopysend":
+                # Las descargas con sendfile no pasan el cuerpo por send
+                count = message.get("count")
+                response_size += count if count is not None else content_length
+            elif message["type"] == "http.response.pathsend":
+                response_size += content_length
+            await send(message)
+
+        HTTP_REQUESTS_IN_PROGRESS.labels(method).inc()
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            duration = time.perf_counter() - start
+            HTTP_REQUESTS_IN_PROGRESS.labels(method).dec()
+            route = route_template(scope)
+            HTTP_REQUEST_DURATION.labels(method, route, str(status_code)).observe(duration)
+            HTTP_RESPONSE_SIZE.labels(method, route).observe(response_size)
+
+
+_operation_names = set()
+
+
+def operation_label(execution_context) -> str:
+    name = execution_context.operation_name
+    if not name:
+        return "anonymous"
+    if name in GRAPHQL_METRICS_OPERATIONS or name in _operation_names:
+        return name
+    if GRAPHQL_METRICS_OPERATIONS or len(_operation_names) >= GRAPHQL_METRICS_MAX_OPERATIONS:
+        return OTHER_OPERATION
+    # Importación diferida: persisted_queries importa este módulo
+    from services.persisted_queries import documents, query_hash
+
+    query = execution_context.query
+    if query is None or documents.get(query_hash(query)) is None:
+        return OTHER_OPERATION
+    _operation_names.add(name)
+    return name
+
+
+class GraphQLMetricsExtension(SchemaExtension):
+    def on_operation(self):
+        start = time.perf_counter()
+        yield
+        duration = time.perf_counter() - start
+        execution_context = self.execution_context
+        try:
+            operation_type = execution_context.operation_type.value
+        except Exception:
+            # Documento inválido: no se pudo determinar el tipo de operación
+            operation_type = "unknown"
+        result = execution_context.result
+        status = "error" if result is not None and result.errors else "ok"
+        GRAPHQL_OPERATION_DURATION.labels(
+            operation_type,
+            operation_label(execution_context),
+            status,
+        ).observe(duration)
+
+    def resolve(self, _next, root, info, *args, **kwargs) -> Any:
+        # Los campos escalares con el resolver por defecto no se miden: son
+        # la mayoría y solo agregarían costo
+        if should_skip_tracing(_next, info):
+            return _next(root, info, *args, **kwargs)
+
+        labels = (info.parent_type.name, info.field_name)
+        start = time.perf_counter()
+        result = _next(root, info, *args, **kwargs)
+        if inspect.isawaitable(result):
+            return _observe_async(result, labels, start)
+        GRAPHQL_RESOLVER_DURATION.labels(*labels).observe(time.perf_counter() - start)
+        return result
+
+
+async def _observe_async(awaitable, labels, start) -> Any:
+    try:
+        return await awaitable
+    finally:
+        GRAPHQL_RESOLVER_DURATION.labels(*labels).observe(time.perf_counter() - start)
+
+
+def instrument_prisma(client) -> None:
+    # El cliente generado declara __slots__, así que se envuelve _execute en la
+    # clase. Todas las acciones de los modelos (y las transacciones, que son
+    # copias del cliente) pasan por ese método.
+    cls = type(client)
+    if getattr(cls, "_metrics_instrumented", False):
+        return
+    original_execute = cls._execute
+
+    async def _execute(self, *, method, arguments, model=None, root_selection=None):
+        model_name = model.__name__ if model is not None else "raw"
+        start = time.perf_counter()
+        status = "error"
+        try:
+            result = await original_execute(
+                self, method=method, arguments=arguments, model=model, root_selection=root_selection
+            )
+            status = "ok"
+            return result
+        finally:
+            PRISMA_QUERY_DURATION.labels(model_name, method).observe(time.perf_counter() - start)
+            PRISMA_QUERIES.labels(model_name, method, status).inc()
+
+    cls._execute = _execute
+    cls._metrics_instrumented = True
+
@@ -0,0 +1,61 @@
+import base64
+import os
+from typing import Any, Dict, List, Optional, Tuple
+
+# Tamaños de página (límite duro del servidor, sin importar lo que pida el cliente)
+DEFAULT_PAGE_SIZE = int(os.getenv("DEFAULT_PAGE_SIZE", "50"))
+MAX_PAGE_SIZE = int(os.getenv("MAX_PAGE_SIZE", "200"))
+
+_CURSOR_PREFIX = "cursor:"
+
+
+def clamp_limit(limit: Optional[int]) -> int:
+    if limit is None:
+        return DEFAULT_PAGE_SIZE
+    return max(1, min(limit, MAX_PAGE_SIZE))
+
+
+def encode_cursor(record_id: int) -> str:
+    return base64.urlsafe_b64encode(f"{_CURSOR_PREFIX}{record_id}".encode("utf-8")).decode("ascii")
+
+
+def decode_cursor(cursor: Optional[str]) -> Optional[int]:
+    if not cursor:
+        return None
+    try:
+        decoded = base64.urlsafe_b64decode(cursor.encode("ascii")).decode("utf-8")
+        if not decoded.startswith(_CURSOR_PREFIX):
+            raise ValueError
+        return int(decoded[len(_CURSOR_PREFIX):])
+    except (ValueError, UnicodeError):
+        raise ValueError(f"Invalid cursor: {cursor}") from None
+
+
+def keyset_args(where: Optional[Dict[str, Any]], after_id: Optional[int], limit: int) -> Dict[str, Any]:
+    # Paginación por clave (id > último visto) en lugar de OFFSET: el costo de
+    # cada página es constante aunque el cliente avance hasta el final de la tabla.
+    # Se pide un registro extra para saber si existe una página siguiente.
+    conditions = dict(where or {})
+    if after_id is not None:
+        conditions["id"] = {"gt": after_id}
+    return {
+        "where": conditions,
+        "take": limit + 1,
+        "order": {"id": "asc"},
+    }
+
+
+def split_page(records: List[Any], limit: int) -> Tuple[List[Any], bool]:
+    has_next = len(records) > limit
+    return records[:limit], has_next
+
+
+async def fetch_page(delegate, where: Optional[Dict[str, Any]], after_id: Optional[int], limit: int) -> Tuple[List[Any], bool]:
+    records = await delegate.find_many(**keyset_args(where, after_id, limit))
+    return split_page(records, limit)
+
+
+def set_next_page_header(response, records: List[Any], has_next: bool) -> None:
+    # En REST el cursor es directamente el último id entregado (?after=<id>)
+    if has_next and records:
+        response.headers["X-Next-Cursor"] = str(records[-1].id)
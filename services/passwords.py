@@ -0,0 +1,105 @@
+import asyncio
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List
+
+import bcrypt
+
+# bcrypt con costo 12 tarda ~250 ms por llamada. Ejecutarlo dentro de un handler
+# async bloquea el event loop de uvicorn, así que todas las operaciones de
+# contraseñas pasan por este pool. bcrypt libera el GIL mientras calcula el hash,
+# por lo que un pool de hilos escala con la cantidad de núcleos.
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", str(os.cpu_count() or 1)))
+# Máximo de operaciones en ejecución al mismo tiempo; el resto espera en cola
+PASSWORD_HASH_CONCURRENCY = int(os.getenv("PASSWORD_HASH_CONCURRENCY", str(PASSWORD_HASH_WORKERS)))
+
+
+class PasswordHasher:
+    def __init__(self, workers: int, concurrency: int):
+        self.workers = max(1, workers)
+        self.concurrency = max(1, concurrency)
+        self._executor = None
+        self._semaphore = None
+        self._waiting = 0
+        self._active = 0
+        self._completed = 0
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=self.workers,
+                thread_name_prefix="password-hash",
+            )
+        return self._executor
+
+    def _get_semaphore(self) -> asyncio.Semaphore:
+        # Se crea de forma diferida para quedar ligado al event loop de la aplicación
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.concurrency)
+        return self._semaphore
+
+    async def _run(self, func, *args):
+        self._waiting += 1
+        try:
+            await self._get_semaphore().acquire()
+        finally:
+            self._waiting -= 1
+
+        self._active += 1
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._get_executor(), func, *args)
+        finally:
+            self._active -= 1
+            self._completed += 1
+            self._semaphore.release()
+
+    async def hash(self, password: str) -> str:
+        return await self._run(_hash_sync, password)
+
+    async def verify(self, password: str, hashed_password: str) -> bool:
+        return await self._run(_verify_sync, password, hashed_password)
+
+    def snapshot(self) -> Dict[str, int]:
+        return {
+            "workers": self.workers,
+            "concurrency": self.concurrency,
+            "waiting": self._waiting,
+            "active": self._active,
+            "completed": self._completed,
+        }
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+        self._semaphore = None
+
+
+def _hash_sync(password: str) -> str:
+    return bcrypt.hashpw(password.encode("utf-8"), bcrypt.gensalt()).decode("utf-8")
+
+
+def _hash_many(passwords: List[str]) -> List[str]:
+    # Para pools de procesos: varias contraseñas por tarea para no pagar la
+    # comunicación entre procesos en cada una
+    return [_hash_sync(password) for password in passwords]
+
+
+def _verify_sync(password: str, hashed_password: str) -> bool:
+    try:
+        return bcrypt.checkpw(password.encode("utf-8"), hashed_password.encode("utf-8"))
+    except ValueError:
+        # Hash almacenado con formato inválido
+        return False
+
+
+password_hasher = PasswordHasher(PASSWORD_HASH_WORKERS, PASSWORD_HASH_CONCURRENCY)
+
+
+async def hash_password(password: str) -> str:
+    return await password_hasher.hash(password)
+
+
+async def verify_password(password: str, hashed_password: str) -> bool:
+    return await password_hasher.verify(password, hashed_password)
@@ -0,0 +1,109 @@
+import hashlib
+import os
+from typing import Any, Dict, Optional
+
+from strawberry.extensions import SchemaExtension
+
+from services.cache import TTLCache
+from services.metrics import CACHE_REQUESTS
+
+# Persisted queries automáticas (protocolo de Apollo) y caché de documentos.
+# El cliente envía el sha256 de la consulta en extensions.persistedQuery; si
+# el servidor no la conoce responde PersistedQueryNotFound y el cliente reintenta
+# una vez con el texto completo. Cada consulta se parsea y valida una sola vez:
+# el DocumentNode y el resultado de la validación quedan en una caché LRU por
+# hash, así que las operaciones repetidas no vuelven a gastar CPU en eso.
+GRAPHQL_DOCUMENT_CACHE_SIZE = int(os.getenv("GRAPHQL_DOCUMENT_CACHE_SIZE", "1000"))
+GRAPHQL_DOCUMENT_CACHE_TTL = int(os.getenv("GRAPHQL_DOCUMENT_CACHE_TTL", str(24 * 3600)))
+
+PERSISTED_QUERY_NOT_FOUND = "PERSISTED_QUERY_NOT_FOUND"
+PERSISTED_QUERY_NOT_SUPPORTED = "PERSISTED_QUERY_NOT_SUPPORTED"
+INVALID_PERSISTED_QUERY = "INVALID_PERSISTED_QUERY"
+
+
+class PersistedQueryError(Exception):
+    def __init__(self, message: str, code: str):
+        super().__init__(message)
+        self.message = message
+        self.code = code
+
+
+class CachedDocument:
+    def __init__(self, query: str):
+        self.query = query
+        self.document = None
+        self.validated = False
+        # Datos derivados del documento que otras extensiones memorizan
+        self.metadata: Dict[str, Any] = {}
+
+
+documents = TTLCache("graphql_documents", GRAPHQL_DOCUMENT_CACHE_TTL, GRAPHQL_DOCUMENT_CACHE_SIZE)
+
+
+def query_hash(query: str) -> str:
+    return hashlib.sha256(query.encode("utf-8")).hexdigest()
+
+
+def _cached(key: str) -> CachedDocument:
+    entry = documents.get(key)
+    CACHE_REQUESTS.labels(documents.name, "hit" if entry is not None else "miss").inc()
+    return entry
+
+
+def persisted_hash(extensions: Optional[Dict[str, Any]]) -> Optional[str]:
+    persisted = (extensions or {}).get("persistedQuery")
+    if persisted is None:
+        return None
+    if not isinstance(persisted, dict) or persisted.get("version") != 1:
+        raise PersistedQueryError("PersistedQueryNotSupported", PERSISTED_QUERY_NOT_SUPPORTED)
+    sha256_hash = persisted.get("sha256Hash")
+    if not isinstance(sha256_hash, str):
+        raise PersistedQueryError("Missing sha256Hash in persistedQuery", INVALID_PERSISTED_QUERY)
+    return sha256_hash.lower()
+
+
+def resolve_query(query: Optional[str], sha256_hash: str) -> str:
+    # Con el texto se verifica y registra el hash; sin texto se busca en la caché
+    if query:
+        if query_hash(query) != sha256_hash:
+            raise PersistedQueryError("provided sha does not match query", INVALID_PERSISTED_QUERY)
+        if documents.get(sha256_hash) is None:
+            documents.set(sha256_hash, CachedDocument(query))
+        return query
+
+    entry = _cached(sha256_hash)
+    if entry is None:
+        raise PersistedQueryError("PersistedQueryNotFound", PERSISTED_QUERY_NOT_FOUND)
+    return entry.query
+
+
+class DocumentCache(SchemaExtension):
+    # Se registra como clase: una instancia por operación
+    key = None
+    entry = None
+
+    def on_parse(self):
+        execution_context = self.execution_context
+        query = execution_context.query
+        if query and execution_context.graphql_document is None:
+            self.key = query_hash(query)
+            self.entry = _cached(self.key)
+            if self.entry is not None and self.entry.document is not None:
+                # Strawberry no vuelve a parsear si el documento ya está presente
+                execution_context.graphql_document = self.entry.document
+        yield
+        if query and self.entry is None and execution_context.graphql_document is not None:
+            self.entry = CachedDocument(query)
+            documents.set(self.key, self.entry)
+        if self.entry is not None and self.entry.document is None:
+            self.entry.document = execution_context.graphql_document
+
+    def on_validate(self):
+        execution_context = self.execution_context
+        entry = self.entry
+        if entry is not None and entry.validated and entry.document is execution_context.graphql_document:
+            # Sin reglas Strawberry omite la validación (ya pasó antes)
+            execution_context.validation_rules = ()
+        yield
+        if entry is not None and not entry.validated and execution_context.errors == []:
+            entry.validated = True
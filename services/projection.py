@@ -0,0 +1,79 @@
+from functools import lru_cache
+from typing import FrozenSet, Iterable, Type
+
+from pydantic import create_model
+from strawberry.types.nodes import FragmentSpread, InlineFragment
+
+from db import prisma_client
+
+# Proyección de columnas para los resolvers de GraphQL. Prisma Client Python
+# arma el SELECT con los campos del modelo que recibe la consulta, así que se
+# crea un modelo parcial con solo las columnas pedidas en la operación (más el
+# id y las claves foráneas que usan los resolvers de relaciones) y la consulta
+# se ejecuta con ese modelo. Columnas como Assignment.intro, Course.summary o
+# User.password dejan de viajar desde Postgres si el cliente no las pide.
+
+# Columnas que se cargan siempre: el id (cursores, DataLoaders) y las claves
+# foráneas que leen los resolvers de relaciones
+KEY_COLUMNS = {
+    "User": ("id",),
+    "Course": ("id", "category"),
+    "CourseSection": ("id", "course"),
+    "Assignment": ("id", "course", "section"),
+    "Submission": ("id", "assignment", "userid"),
+    "Forum": ("id", "course"),
+    "ForumDiscussion": ("id", "course", "forum", "userid"),
+    "ForumPost": ("id", "discussion", "parent", "userid"),
+    "GradeItem": ("id", "courseid"),
+    "Grade": ("id", "itemid", "userid"),
+    "CourseCompletion": ("id", "userid", "course"),
+}
+
+
+def _flatten(selections: Iterable) -> Iterable:
+    # Los fragmentos se reemplazan por sus campos
+    for selection in selections:
+        if isinstance(selection, (FragmentSpread, InlineFragment)):
+            yield from _flatten(selection.selections)
+        else:
+            yield selection
+
+
+def _selected_names(info, path) -> set:
+    fields = [child for field in info.selected_fields for child in field.selections]
+    # Baja por el camino dentro del tipo devuelto (p. ej. edges -> node en las conexiones)
+    for name in path:
+        fields = [child for field in _flatten(fields) if field.name == name for child in field.selections]
+    return {field.name for field in _flatten(fields)}
+
+
+def selected_columns(info, model: Type, path: Iterable[str] = ()) -> FrozenSet[str]:
+    # El tipo de Strawberry se llama igual que el modelo de Prisma
+    name = model.__name__
+    definition = info.schema.get_type_by_name(name)
+    converter = info.schema.config.name_converter
+    columns = {
+        converter.get_graphql_name(field): field.python_name
+        for field in definition.fields
+        # Los campos con resolver propio son relaciones, no columnas
+        if field.base_resolver is None and field.python_name in model.model_fields
+    }
+    selected = {columns[field] for field in _selected_names(info, path) if field in columns}
+    return frozenset(selected.union(KEY_COLUMNS.get(name, ("id",))))
+
+
+@lru_cache(maxsize=256)
+def partial_model(model: Type, columns: FrozenSet[str]) -> Type:
+    # Mismo nombre que el modelo original para no cambiar las etiquetas de las
+    # métricas de Prisma; la base generada (BaseUser, ...) aporta __prisma_model__
+    fields = {
+        column: (model.model_fields[column].annotation, model.model_fields[column])
+        for column in sorted(columns)
+    }
+    return create_model(model.__name__, __base__=model.__bases__[0], **fields)
+
+
+def projected(info, model: Type, path: Iterable[str] = ()):
+    # Acciones de Prisma (find_many, find_unique, ...) que solo leen las columnas pedidas
+    partial = partial_model(model, selected_columns(info, model, path))
+    return partial.prisma(prisma_client)
@@ -0,0 +1,138 @@
+import asyncio
+import json
+import logging
+import os
+from typing import Any, AsyncIterator, Dict, Optional, Set
+
+logger = logging.getLogger(__name__)
+
+# Pub/sub para las suscripciones GraphQL. Las rutas de escritura (mensajes del
+# foro, calificaciones, entregas) publican el registro creado en un canal y
+# cada suscripción abierta en este worker lo recibe en su propia cola. Con
+# PUBSUB_REDIS_URL los eventos pasan por Redis y llegan a todos los workers;
+# sin esa variable solo se reparten dentro del proceso.
+PUBSUB_REDIS_URL = os.getenv("PUBSUB_REDIS_URL")
+PUBSUB_CHANNEL_PREFIX = os.getenv("PUBSUB_CHANNEL_PREFIX", "campus")
+# Eventos pendientes por suscriptor; si un cliente lento la llena se descartan los más viejos
+PUBSUB_QUEUE_SIZE = int(os.getenv("PUBSUB_QUEUE_SIZE", "100"))
+
+FORUM_POST_ADDED = "forum_post_added"
+GRADE_PUBLISHED = "grade_published"
+SUBMISSION_RECEIVED = "submission_received"
+
+
+def channel(topic: str, key: int) -> str:
+    return f"{topic}:{key}"
+
+
+class PubSub:
+    # Reparto dentro del proceso
+    def __init__(self, queue_size: int):
+        self.queue_size = queue_size
+        self._subscribers: Dict[str, Set[asyncio.Queue]] = {}
+
+    def _deliver(self, name: str, message: Any) -> None:
+        for queue in self._subscribers.get(name, ()):
+            if queue.full():
+                queue.get_nowait()
+                logger.warning("Evento descartado por suscriptor lento", extra={"fields": {"channel": name}})
+            queue.put_nowait(message)
+
+    async def _send(self, name: str, message: Any) -> None:
+        self._deliver(name, message)
+
+    async def publish(self, name: str, message: Any) -> None:
+        # Un fallo al publicar nunca debe revertir la escritura que lo originó
+        try:
+            await self._send(name, message)
+        except Exception:
+            logger.exception("Error publicando evento", extra={"fields": {"channel": name}})
+
+    async def _on_subscribe(self, name: str) -> None:
+        pass
+
+    async def _on_unsubscribe(self, name: str) -> None:
+        pass
+
+    async def subscribe(self, name: str) -> AsyncIterator[Any]:
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.queue_size)
+        subscribers = self._subscribers.setdefault(name, set())
+        subscribers.add(queue)
+        if len(subscribers) == 1:
+            await self._on_subscribe(name)
+        try:
+            while True:
+                yield await queue.get()
+        finally:
+            subscribers.discard(queue)
+            if not subscribers:
+                del self._subscribers[name]
+                await self._on_unsubscribe(name)
+
+    async def close(self) -> None:
+        self._subscribers.clear()
+
+
+class RedisPubSub(PubSub):
+    # Los eventos se publican en Redis y una única conexión por worker escucha
+    # los canales que tienen suscriptores locales
+    def __init__(self, url: str, prefix: str, queue_size: int):
+        super().__init__(queue_size)
+        try:
+            from redis import asyncio as redis
+        except ImportError:
+            raise RuntimeError("PUBSUB_REDIS_URL requiere el paquete redis (pip install redis)") from None
+        self.prefix = prefix
+        self._redis = redis.from_url(url)
+        self._pubsub = self._redis.pubsub(ignore_subscribe_messages=True)
+        self._listener: Optional[asyncio.Task] = None
+
+    def _key(self, name: str) -> str:
+        return f"{self.prefix}:{name}"
+
+    async def _send(self, name: str, message: Any) -> None:
+        await self._redis.publish(self._key(name), json.dumps(message))
+
+    async def _on_subscribe(self, name: str) -> None:
+        await self._pubsub.subscribe(self._key(name))
+        if self._listener is None or self._listener.done():
+            self._listener = asyncio.get_running_loop().create_task(self._listen())
+
+    async def _on_unsubscribe(self, name: str) -> None:
+        await self._pubsub.unsubscribe(self._key(name))
+
+    async def _listen(self) -> None:
+        prefix = f"{self.prefix}:"
+        while self._subscribers:
+            try:
+                message = await self._pubsub.get_message(timeout=1.0)
+            except Exception:
+                logger.exception("Error leyendo eventos de Redis")
+                await asyncio.sleep(1)
+                continue
+            if message is None or message["type"] != "message":
+                continue
+            name = message["channel"].decode("utf-8")[len(prefix):]
+            self._deliver(name, json.loads(message["data"]))
+
+    async def close(self) -> None:
+        await super().close()
+        if self._listener is not None:
+            self._listener.cancel()
+            await asyncio.gather(self._listener, return_exceptions=True)
+        await self._pubsub.aclose()
+        await self._redis.aclose()
+
+
+def create_pubsub() -> PubSub:
+    if PUBSUB_REDIS_URL:
+        return RedisPubSub(PUBSUB_REDIS_URL, PUBSUB_CHANNEL_PREFIX, PUBSUB_QUEUE_SIZE)
+    return PubSub(PUBSUB_QUEUE_SIZE)
+
+
+pubsub = create_pubsub()
+
+
+async def publish_record(topic: str, key: int, record: Any) -> None:
+    # Se publica el registro serializado (JSON) para que sirva con cualquier backend
+    await pubsub.publish(channel(topic, key), record.model_dump(mode="json"))
@@ -0,0 +1,272 @@
+import logging
+import os
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+from graphql import (
+    FieldNode,
+    FragmentSpreadNode,
+    GraphQLError,
+    GraphQLInterfaceType,
+    GraphQLList,
+    GraphQLObjectType,
+    InlineFragmentNode,
+    OperationDefinitionNode,
+    Undefined,
+    get_named_type,
+    get_nullable_type,
+    value_from_ast,
+)
+from starlette.requests import Request
+from starlette.responses import Response
+from strawberry.extensions import SchemaExtension
+
+from services.metrics import GRAPHQL_REJECTED_OPERATIONS
+from services.pagination import MAX_PAGE_SIZE
+
+logger = logging.getLogger(__name__)
+
+# Análisis estático del costo de cada operación GraphQL antes de ejecutarla.
+# Cada campo con resolver propio (objeto o lista) cuesta 1 y el costo de sus
+# hijos se multiplica por la cantidad de elementos esperada: el argumento
+# "first" cuando existe y, si no, una estimación para las listas sin paginar.
+# Las operaciones demasiado profundas o caras se rechazan sin tocar la base, y
+# cada cliente (API key registrada o IP) tiene un presupuesto de costo que se
+# repone con el tiempo (token bucket). El presupuesto es por worker.
+GRAPHQL_MAX_DEPTH = int(os.getenv("GRAPHQL_MAX_DEPTH", "10"))
+GRAPHQL_MAX_COST = int(os.getenv("GRAPHQL_MAX_COST", "5000"))
+# Elementos estimados para las listas sin argumentos de paginación: las raíces
+# devuelven como máximo MAX_PAGE_SIZE registros, pero las relaciones anidadas
+# (enrollments, submissions, posts...) no tienen tope
+GRAPHQL_LIST_SIZE = int(os.getenv("GRAPHQL_LIST_SIZE", str(MAX_PAGE_SIZE)))
+GRAPHQL_RELATION_LIST_SIZE = int(os.getenv("GRAPHQL_RELATION_LIST_SIZE", str(2 * MAX_PAGE_SIZE)))
+# Presupuesto por cliente: capacidad del bucket y reposición por segundo (0 lo desactiva)
+GRAPHQL_BUDGET = int(os.getenv("GRAPHQL_BUDGET", "20000"))
+GRAPHQL_BUDGET_REFILL = float(os.getenv("GRAPHQL_BUDGET_REFILL", "200"))
+GRAPHQL_BUDGET_MAX_CLIENTS = int(os.getenv("GRAPHQL_BUDGET_MAX_CLIENTS", "10000"))
+# API keys con presupuesto propio (separadas por comas); cualquier otro valor del
+# header se ignora y el cliente se identifica por IP
+GRAPHQL_API_KEYS = frozenset(key.strip() for key in os.getenv("GRAPHQL_API_KEYS", "").split(",") if key.strip())
+
+API_KEY_HEADER = "x-api-key"
+PAGINATION_ARGUMENTS = ("first", "last", "limit", "take")
+
+
+class TokenBucket:
+    def __init__(self, capacity: float, refill: float):
+        self.capacity = capacity
+        self.refill = refill
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float) -> None:
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.refill)
+        self.updated = now
+
+    def consume(self, amount: float) -> Tuple[bool, float]:
+        # Devuelve (aceptado, segundos hasta poder pagar el monto)
+        self._refill(time.monotonic())
+        if amount <= self.tokens:
+            self.tokens -= amount
+            return True, 0.0
+        if self.refill <= 0:
+            return False, float("inf")
+        return False, (amount - self.tokens) / self.refill
+
+
+class ClientBudgets:
+    def __init__(self, capacity: int, refill: float, max_clients: int):
+        self.capacity = capacity
+        self.refill = refill
+        self.max_clients = max_clients
+        # LRU: los clientes inactivos salen primero cuando se alcanza el máximo
+        self._buckets: "OrderedDict[str, TokenBucket]" = OrderedDict()
+
+    def consume(self, client: str, cost: int) -> Tuple[bool, float, float]:
+        bucket = self._buckets.get(client)
+        if bucket is None:
+            bucket = self._buckets[client] = TokenBucket(self.capacity, self.refill)
+            while len(self._buckets) > self.max_clients:
+                self._buckets.popitem(last=False)
+        else:
+            self._buckets.move_to_end(client)
+        accepted, retry_after = bucket.consume(cost)
+        return accepted, retry_after, bucket.tokens
+
+
+budgets = ClientBudgets(GRAPHQL_BUDGET, GRAPHQL_BUDGET_REFILL, GRAPHQL_BUDGET_MAX_CLIENTS)
+
+
+def client_key(request: Any) -> str:
+    # Una key inventada en cada solicitud no debe conseguir un bucket nuevo
+    api_key = request.headers.get(API_KEY_HEADER)
+    if api_key and api_key in GRAPHQL_API_KEYS:
+        return f"key:{api_key}"
+    return f"ip:{request.client.host if request.client else 'unknown'}"
+
+
+def _list_size(field_node: FieldNode, field_def, variables: Dict[str, Any]) -> Optional[int]:
+    # Valor del argumento de paginación (literal, variable o valor por defecto)
+    for name in PAGINATION_ARGUMENTS:
+        arg_def = field_def.args.get(name)
+        if arg_def is None:
+            continue
+        value = None
+        for argument in field_node.arguments:
+            if argument.name.value == name:
+                value = value_from_ast(argument.value, arg_def.type, variables)
+        if value in (None, Undefined) and arg_def.default_value is not Undefined:
+            value = arg_def.default_value
+        if isinstance(value, int):
+            return max(1, min(value, MAX_PAGE_SIZE))
+    return None
+
+
+class _CostVisitor:
+    def __init__(self, schema, fragments, variables: Dict[str, Any]):
+        self.schema = schema
+        self.fragments = fragments
+        self.variables = variables
+
+    def selection_set(self, selection_set, parent_type, visited=frozenset()) -> Tuple[int, int]:
+        # Devuelve (costo, profundidad) de un conjunto de selecciones
+        cost, depth = 0, 0
+        if selection_set is None:
+            return cost, depth
+        for selection in selection_set.selections:
+            if isinstance(selection, FieldNode):
+                field_cost, field_depth = self.field(selection, parent_type, visited)
+            elif isinstance(selection, InlineFragmentNode):
+                fragment_type = parent_type
+                if selection.type_condition is not None:
+                    fragment_type = self.schema.get_type(selection.type_condition.name.value) or parent_type
+                field_cost, field_depth = self.selection_set(selection.selection_set, fragment_type, visited)
+            elif isinstance(selection, FragmentSpreadNode):
+                name = selection.name.value
+                fragment = self.fragments.get(name)
+                # Los ciclos los reporta la validación estándar
+                if fragment is None or name in visited:
+                    continue
+                fragment_type = self.schema.get_type(fragment.type_condition.name.value) or parent_type
+                field_cost, field_depth = self.selection_set(fragment.selection_set, fragment_type, visited | {name})
+            else:
+                continue
+            cost += field_cost
+            depth = max(depth, field_depth)
+        return cost, depth
+
+    def field(self, node: FieldNode, parent_type, visited) -> Tuple[int, int]:
+        name = node.name.value
+        # La introspección está acotada por el propio esquema
+        if name.startswith("__") or not isinstance(parent_type, (GraphQLObjectType, GraphQLInterfaceType)):
+            return 0, 0
+        field_def = parent_type.fields.get(name)
+        if field_def is None:
+            # Campo inexistente: lo informa la validación estándar
+            return 0, 0
+        named_type = get_named_type(field_def.type)
+        if node.selection_set is None:
+            return 0, 1
+
+        children_cost, children_depth = self.selection_set(node.selection_set, named_type, visited)
+        multiplier = _list_size(node, field_def, self.variables)
+        if multiplier is None:
+            multiplier = 1
+            # Las listas internas de una conexión (edges) ya están contadas por "first"
+            if isinstance(get_nullable_type(field_def.type), GraphQLList) and not parent_type.name.endswith("Connection"):
+                root_types = (self.schema.query_type, self.schema.mutation_type, self.schema.subscription_type)
+                multiplier = GRAPHQL_LIST_SIZE if parent_type in root_types else GRAPHQL_RELATION_LIST_SIZE
+        return 1 + multiplier * children_cost, 1 + children_depth
+
+
+def operation_cost(schema, document, operation_name: Optional[str], variables: Dict[str, Any]) -> Optional[Tuple[int, int]]:
+    fragments = {}
+    operations = []
+    for definition in document.definitions:
+        if isinstance(definition, OperationDefinitionNode):
+            operations.append(definition)
+        elif hasattr(definition, "type_condition"):
+            fragments[definition.name.value] = definition
+
+    if operation_name:
+        operations = [op for op in operations if op.name and op.name.value == operation_name]
+    if len(operations) != 1:
+        # Sin operación a ejecutar: la validación o la ejecución reportan el error
+        return None
+    operation = operations[0]
+    root_type = schema.get_root_type(operation.operation)
+    if root_type is None:
+        return None
+    return _CostVisitor(schema, fragments, variables).selection_set(operation.selection_set, root_type)
+
+
+def _reject(context, reason: str, message: str, status_code: int, **details) -> GraphQLError:
+    GRAPHQL_REJECTED_OPERATIONS.labels(reason).inc()
+    logger.warning("Operación GraphQL rechazada", extra={"fields": {"reason": reason, **details}})
+    response = context.get("response") if isinstance(context, dict) else None
+    if isinstance(response, Response):
+        response.status_code = status_code
+        if "retryAfter" in details:
+            response.headers["Retry-After"] = str(details["retryAfter"])
+    return GraphQLError(message, extensions={"code": reason, **details})
+
+
+class QueryCostLimiter(SchemaExtension):
+    # Se registra como clase para que Strawberry cree una instancia por
+    # operación: execution_context no se comparte entre solicitudes concurrentes
+    max_depth = GRAPHQL_MAX_DEPTH
+    max_cost = GRAPHQL_MAX_COST
+    client_budgets: Optional[ClientBudgets] = budgets
+
+    def check(self, document) -> Optional[GraphQLError]:
+        execution_context = self.execution_context
+        context = execution_context.context
+        costs = operation_cost(
+            execution_context.schema._schema,
+            document,
+            execution_context.operation_name,
+            execution_context.variables or {},
+        )
+        if costs is None:
+            return None
+        cost, depth = costs
+
+        if depth > self.max_depth:
+            return _reject(
+                context, "QUERY_TOO_DEEP",
+                f"Query depth {depth} exceeds the maximum of {self.max_depth}", 400,
+                depth=depth, maxDepth=self.max_depth, cost=cost,
+            )
+        if cost > self.max_cost:
+            return _reject(
+                context, "QUERY_TOO_EXPENSIVE",
+                f"Query cost {cost} exceeds the maximum of {self.max_cost}", 400,
+                cost=cost, maxCost=self.max_cost, depth=depth,
+            )
+
+        request = context.get("request") if isinstance(context, dict) else None
+        if self.client_budgets is not None and self.client_budgets.capacity > 0 and isinstance(request, Request):
+            accepted, retry_after, remaining = self.client_budgets.consume(client_key(request), cost)
+            if not accepted:
+                details = {"cost": cost, "remaining": int(remaining)}
+                # Sin reposición (GRAPHQL_BUDGET_REFILL=0) no hay un momento para reintentar
+                if retry_after != float("inf"):
+                    details["retryAfter"] = int(retry_after) + 1
+                return _reject(
+                    context, "RATE_LIMITED",
+                    f"Query cost {cost} exceeds the remaining budget for this client", 429,
+                    **details,
+                )
+        return None
+
+    def on_validate(self):
+        # Se verifica antes de la validación estándar: si la operación se
+        # rechaza, Strawberry omite la validación y devuelve este error. Así el
+        # límite también se aplica a los documentos con validación en caché.
+        execution_context = self.execution_context
+        if execution_context.graphql_document is not None and execution_context.errors is None:
+            error = self.check(execution_context.graphql_document)
+            if error is not None:
+                execution_context.errors = [error]
+        yield
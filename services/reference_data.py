@@ -0,0 +1,100 @@
+import os
+from typing import Any, Dict, Iterable, List, Optional
+
+from db import prisma_client
+from services.cache import TTLCache
+
+# Datos de referencia que cambian pocas veces por periodo: se leen desde memoria
+# y los handlers de escritura llaman a invalidate_* después de modificarlos.
+roles_cache = TTLCache("roles", ttl=float(os.getenv("CACHE_TTL_ROLES", "600")), maxsize=1)
+categories_cache = TTLCache("categories", ttl=float(os.getenv("CACHE_TTL_CATEGORIES", "300")), maxsize=1)
+sections_cache = TTLCache(
+    "course_sections",
+    ttl=float(os.getenv("CACHE_TTL_SECTIONS", "120")),
+    maxsize=int(os.getenv("CACHE_MAX_SECTIONS", "2048")),
+)
+
+TEACHER_ROLES = ("teacher", "editingteacher")
+
+_ALL = "all"
+
+
+async def _load_roles() -> Dict[int, Any]:
+    roles = await prisma_client.role.find_many(order={"id": "asc"})
+    return {role.id: role for role in roles}
+
+
+async def get_roles_by_id() -> Dict[int, Any]:
+    return await roles_cache.get_or_load(_ALL, _load_roles)
+
+
+async def get_roles() -> List[Any]:
+    return list((await get_roles_by_id()).values())
+
+
+async def get_role(role_id: int, refresh_missing: bool = False) -> Optional[Any]:
+    roles = await get_roles_by_id()
+    if role_id not in roles and refresh_missing:
+        # Puede haberse creado en otro worker después de la última carga
+        roles_cache.invalidate()
+        roles = await get_roles_by_id()
+    return roles.get(role_id)
+
+
+async def get_user_roles(user_id: int, context_id: Optional[int] = None) -> List[Any]:
+    # Solo se consultan las asignaciones; los roles se toman de la caché
+    where = {"userid": user_id}
+    if context_id is not None:
+        where["contextid"] = context_id
+    assignments = await prisma_client.userrole.find_many(where=where)
+    roles = []
+    for assignment in assignments:
+        role = await get_role(assignment.roleid, refresh_missing=True)
+        if role is not None:
+            roles.append(role)
+    return roles
+
+
+async def user_has_role(user_id: int, context_id: int, shortnames: Iterable[str]) -> bool:
+    roles = await get_user_roles(user_id, context_id)
+    return any(role.shortname in shortnames for role in roles)
+
+
+def invalidate_roles() -> None:
+    roles_cache.invalidate()
+
+
+async def _load_categories() -> List[Any]:
+    return await prisma_client.category.find_many(order={"id": "asc"})
+
+
+async def get_categories(parent: Optional[int] = None) -> List[Any]:
+    categories = await categories_cache.get_or_load(_ALL, _load_categories)
+    if parent is not None:
+        return [category for category in categories if category.parent == parent]
+    return list(categories)
+
+
+async def get_category(category_id: int) -> Optional[Any]:
+    for category in await get_categories():
+        if category.id == category_id:
+            return category
+    return None
+
+
+def invalidate_categories() -> None:
+    categories_cache.invalidate()
+
+
+async def get_course_sections(course_id: int) -> List[Any]:
+    async def load():
+        return await prisma_client.coursesection.find_many(
+            where={"course": course_id},
+            order={"section": "asc"},
+        )
+
+    return list(await sections_cache.get_or_load(course_id, load))
+
+
+def invalidate_course_sections(course_id: Optional[int] = None) -> None:
+    sections_cache.invalidate(course_id)
@@ -0,0 +1,367 @@
+import asyncio
+import hashlib
+import inspect
+import json
+import logging
+import os
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from enum import Enum
+from typing import Any, Dict, Iterable, Optional, Set, Tuple
+
+import strawberry
+from graphql import (
+    FieldNode,
+    FragmentSpreadNode,
+    GraphQLInterfaceType,
+    GraphQLObjectType,
+    InlineFragmentNode,
+    OperationDefinitionNode,
+    OperationType,
+    get_named_type,
+    is_leaf_type,
+    print_ast,
+)
+from strawberry.extensions import SchemaExtension
+from strawberry.schema_directive import Location
+from strawberry.types import ExecutionResult
+
+from services.metrics import CACHE_ENTRIES, CACHE_REQUESTS
+from services.persisted_queries import documents, query_hash
+from services.pubsub import RedisPubSub, pubsub
+
+logger = logging.getLogger(__name__)
+
+# Caché de respuestas de las consultas GraphQL (nunca mutaciones). La clave es
+# el hash del documento normalizado, la operación, las variables y, si algún
+# campo es PRIVATE, el usuario (header Authorization). El tiempo de vida sale
+# de las pistas @cacheControl(maxAge) del esquema con la semántica de Apollo:
+# los campos raíz y los que devuelven objetos sin pista valen 0 (no se cachea),
+# los escalares heredan del padre y se toma el mínimo de toda la operación.
+# Cada entrada queda etiquetada con los tipos que toca y con "Tipo:id" de cada
+# registro devuelto; las escrituras llaman a purge() con esas etiquetas.
+GRAPHQL_RESPONSE_CACHE_SIZE = int(os.getenv("GRAPHQL_RESPONSE_CACHE_SIZE", "5000"))
+# Límite superior para cualquier maxAge del esquema (0 desactiva la caché)
+GRAPHQL_RESPONSE_CACHE_MAX_AGE = int(os.getenv("GRAPHQL_RESPONSE_CACHE_MAX_AGE", "300"))
+
+PURGE_CHANNEL = "response_cache_purge"
+# Clave del contexto donde queda la política de la operación ejecutada
+CACHE_POLICY = "cache_policy"
+
+
+@strawberry.enum
+class CacheControlScope(Enum):
+    PUBLIC = "PUBLIC"
+    PRIVATE = "PRIVATE"
+
+
+@strawberry.schema_directive(locations=[Location.FIELD_DEFINITION, Location.OBJECT], name="cacheControl")
+class CacheControl:
+    max_age: Optional[int] = None
+    scope: Optional[CacheControlScope] = None
+    inherit_max_age: bool = False
+
+
+@dataclass
+class CachePolicy:
+    max_age: int
+    private: bool
+    types: frozenset
+
+
+def _hint(definition) -> Optional[CacheControl]:
+    definition = (definition.extensions or {}).get("strawberry-definition") if definition is not None else None
+    for directive in getattr(definition, "directives", None) or ():
+        if isinstance(directive, CacheControl):
+            return directive
+    return None
+
+
+class _PolicyVisitor:
+    def __init__(self, schema, fragments):
+        self.schema = schema
+        self.fragments = fragments
+        self.max_age: Optional[int] = None
+        self.private = False
+        self.types: Set[str] = set()
+
+    def _restrict(self, age: int) -> None:
+        self.max_age = age if self.max_age is None else min(self.max_age, age)
+
+    def selection_set(self, selection_set, parent_type, parent_age: Optional[int], visited=frozenset()) -> None:
+        for selection in selection_set.selections:
+            if isinstance(selection, FieldNode):
+                self.field(selection, parent_type, parent_age, visited)
+            elif isinstance(selection, InlineFragmentNode):
+                fragment_type = parent_type
+                if selection.type_condition is not None:
+                    fragment_type = self.schema.get_type(selection.type_condition.name.value) or parent_type
+                self.selection_set(selection.selection_set, fragment_type, parent_age, visited)
+            elif isinstance(selection, FragmentSpreadNode):
+                name = selection.name.value
+                fragment = self.fragments.get(name)
+                if fragment is None or name in visited:
+                    continue
+                fragment_type = self.schema.get_type(fragment.type_condition.name.value) or parent_type
+                self.selection_set(fragment.selection_set, fragment_type, parent_age, visited | {name})
+
+    def field(self, node: FieldNode, parent_type, parent_age: Optional[int], visited) -> None:
+        name = node.name.value
+        if name == "__typename":
+            return
+        if name.startswith("__") or not isinstance(parent_type, (GraphQLObjectType, GraphQLInterfaceType)):
+            # Introspección: no se cachea
+            self._restrict(0)
+            return
+        field_def = parent_type.fields.get(name)
+        if field_def is None:
+            self._restrict(0)
+            return
+        named_type = get_named_type(field_def.type)
+        hint = _hint(field_def)
+        if hint is None and not is_leaf_type(named_type):
+            hint = _hint(named_type)
+
+        if hint is not None and hint.max_age is not None:
+            age = hint.max_age
+        elif (hint is not None and hint.inherit_max_age) or (is_leaf_type(named_type) and parent_age is not None):
+            age = parent_age
+        else:
+            age = 0
+        if hint is not None and hint.scope == CacheControlScope.PRIVATE:
+            self.private = True
+        self._restrict(age if age is not None else 0)
+
+        if node.selection_set is not None:
+            self.types.add(named_type.name)
+            self.selection_set(node.selection_set, named_type, age, visited)
+
+
+def cache_control(policy: Optional[CachePolicy]) -> str:
+    # Cache-Control HTTP equivalente a la política de la operación
+    if policy is None or policy.max_age <= 0:
+        return "no-store"
+    return f"{'private' if policy.private else 'public'}, max-age={policy.max_age}"
+
+
+def cache_policy(schema, document, operation_name: Optional[str]) -> Optional[CachePolicy]:
+    fragments = {}
+    operations = []
+    for definition in document.definitions:
+        if isinstance(definition, OperationDefinitionNode):
+            operations.append(definition)
+        elif hasattr(definition, "type_condition"):
+            fragments[definition.name.value] = definition
+    if operation_name:
+        operations = [op for op in operations if op.name and op.name.value == operation_name]
+    if len(operations) != 1 or operations[0].operation != OperationType.QUERY:
+        return None
+    visitor = _PolicyVisitor(schema, fragments)
+    visitor.selection_set(operations[0].selection_set, schema.query_type, None)
+    max_age = min(visitor.max_age or 0, GRAPHQL_RESPONSE_CACHE_MAX_AGE)
+    return CachePolicy(max_age=max_age, private=visitor.private, types=frozenset(visitor.types))
+
+
+class ResponseCache:
+    def __init__(self, name: str, maxsize: int):
+        self.name = name
+        self.maxsize = maxsize
+        self._entries: "OrderedDict[str, Tuple[float, Any, frozenset]]" = OrderedDict()
+        self._tags: Dict[str, Set[str]] = {}
+        self._listener: Optional[asyncio.Task] = None
+        self._broadcasts: Set[asyncio.Task] = set()
+        # Una consulta que empezó antes de una purga pudo leer datos viejos: cada
+        # purga sube la generación y, mientras haya ejecuciones en curso, se
+        # anota la generación de cada etiqueta purgada para no guardar su resultado
+        self._generation = 0
+        self._purged: Dict[str, int] = {}
+        self._in_flight: Dict[int, int] = {}
+
+    def _remove(self, key: str) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        for tag in entry[2]:
+            keys = self._tags.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._tags[tag]
+
+    def get(self, key: str) -> Optional[Any]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry[0] <= time.monotonic():
+            self._remove(key)
+            CACHE_ENTRIES.labels(self.name).set(len(self._entries))
+            return None
+        self._entries.move_to_end(key)
+        return entry[1]
+
+    def begin(self) -> int:
+        # Marca el inicio de una ejecución que después llamará a set()
+        generation = self._generation
+        self._in_flight[generation] = self._in_flight.get(generation, 0) + 1
+        return generation
+
+    def end(self, generation: int) -> None:
+        remaining = self._in_flight[generation] - 1
+        if remaining:
+            self._in_flight[generation] = remaining
+        else:
+            del self._in_flight[generation]
+        if not self._in_flight:
+            self._purged.clear()
+        elif len(self._purged) > self.maxsize:
+            # Solo importan las purgas posteriores a la ejecución más antigua en curso
+            oldest = min(self._in_flight)
+            self._purged = {tag: purged for tag, purged in self._purged.items() if purged > oldest}
+
+    def set(self, key: str, value: Any, max_age: int, tags: Iterable[str], since: Optional[int] = None) -> None:
+        tags = frozenset(tags)
+        if since is not None and any(self._purged.get(tag, 0) > since for tag in tags):
+            # Una escritura purgó estas etiquetas mientras se ejecutaba la consulta
+            return
+        self._remove(key)
+        self._entries[key] = (time.monotonic() + max_age, value, tags)
+        for tag in tags:
+            self._tags.setdefault(tag, set()).add(key)
+        while len(self._entries) > self.maxsize:
+            self._remove(next(iter(self._entries)))
+        CACHE_ENTRIES.labels(self.name).set(len(self._entries))
+
+    def purge_local(self, tags: Iterable[str]) -> int:
+        self._generation += 1
+        keys = set()
+        for tag in tags:
+            if self._in_flight:
+                self._purged[tag] = self._generation
+            keys.update(self._tags.get(tag, ()))
+        for key in keys:
+            self._remove(key)
+        CACHE_ENTRIES.labels(self.name).set(len(self._entries))
+        return len(keys)
+
+    def purge(self, *tags: str) -> None:
+        # Se purga en este worker de inmediato y, con Redis, en el resto
+        self.purge_local(tags)
+        if isinstance(pubsub, RedisPubSub):
+            task = asyncio.get_running_loop().create_task(pubsub.publish(PURGE_CHANNEL, list(tags)))
+            self._broadcasts.add(task)
+            task.add_done_callback(self._broadcasts.discard)
+
+    async def _listen(self) -> None:
+        async for tags in pubsub.subscribe(PURGE_CHANNEL):
+            self.purge_local(tags)
+
+    def start(self) -> None:
+        if isinstance(pubsub, RedisPubSub) and self._listener is None:
+            self._listener = asyncio.get_running_loop().create_task(self._listen())
+
+    async def shutdown(self) -> None:
+        if self._listener is not None:
+            self._listener.cancel()
+            await asyncio.gather(self._listener, return_exceptions=True)
+            self._listener = None
+
+
+response_cache = ResponseCache("graphql_responses", GRAPHQL_RESPONSE_CACHE_SIZE)
+
+
+def purge(*tags: str) -> None:
+    response_cache.purge(*tags)
+
+
+def entity_tag(type_name: str, entity_id: Any) -> str:
+    return f"{type_name}:{entity_id}"
+
+
+def _viewer(context) -> Optional[str]:
+    request = context.get("request") if isinstance(context, dict) else None
+    authorization = request.headers.get("authorization") if request is not None else None
+    if not authorization:
+        return None
+    return hashlib.sha256(authorization.encode("utf-8")).hexdigest()
+
+
+def _document_info(execution_context) -> Tuple[str, Optional[CachePolicy]]:
+    # Hash normalizado y política por operación, memorizados en la caché de documentos
+    document = execution_context.graphql_document
+    entry = documents.get(query_hash(execution_context.query)) if execution_context.query else None
+    memo = entry.metadata if entry is not None and entry.document is document else {}
+    operation_name = execution_context.operation_name
+    if "normalized_hash" not in memo:
+        memo["normalized_hash"] = hashlib.sha256(print_ast(document).encode("utf-8")).hexdigest()
+    policies = memo.setdefault("cache_policies", {})
+    if operation_name not in policies:
+        policies[operation_name] = cache_policy(execution_context.schema._schema, document, operation_name)
+    return memo["normalized_hash"], policies[operation_name]
+
+
+class GraphQLResponseCache(SchemaExtension):
+    # Se registra como clase: una instancia por operación
+    key = None
+    policy = None
+    tags = None
+
+    def on_execute(self):
+        execution_context = self.execution_context
+        if execution_context.graphql_document is None:
+            yield
+            return
+        normalized_hash, policy = _document_info(execution_context)
+        # La misma política define el Cache-Control de los GET persistidos
+        if isinstance(execution_context.context, dict):
+            execution_context.context[CACHE_POLICY] = policy
+        viewer = _viewer(execution_context.context)
+        if policy is None or policy.max_age <= 0 or (policy.private and viewer is None):
+            CACHE_REQUESTS.labels(response_cache.name, "skip").inc()
+            yield
+            return
+
+        variables = json.dumps(execution_context.variables or {}, sort_keys=True, default=str)
+        scope = viewer if policy.private else "public"
+        self.key = hashlib.sha256(
+            "\0".join((normalized_hash, execution_context.operation_name or "", variables, scope)).encode("utf-8")
+        ).hexdigest()
+        data = response_cache.get(self.key)
+        if data is not None:
+            CACHE_REQUESTS.labels(response_cache.name, "hit").inc()
+            # Strawberry no ejecuta la operación si el resultado ya está presente
+            execution_context.result = ExecutionResult(data=data, errors=None)
+            yield
+            return
+
+        CACHE_REQUESTS.labels(response_cache.name, "miss").inc()
+        self.policy = policy
+        self.tags = set(policy.types)
+        generation = response_cache.begin()
+        try:
+            yield
+            result = execution_context.result
+            if result is not None and not result.errors and result.data is not None:
+                response_cache.set(self.key, result.data, policy.max_age, self.tags, since=generation)
+        finally:
+            response_cache.end(generation)
+
+    def _record(self, value: Any) -> None:
+        for item in value if isinstance(value, list) else (value,):
+            model = getattr(item, "__prisma_model__", None)
+            if model is not None:
+                self.tags.add(entity_tag(model, getattr(item, "id", None)))
+
+    async def _record_async(self, awaitable) -> Any:
+        value = await awaitable
+        self._record(value)
+        return value
+
+    def resolve(self, _next, root, info, *args, **kwargs) -> Any:
+        result = _next(root, info, *args, **kwargs)
+        if self.tags is None:
+            return result
+        if inspect.isawaitable(result):
+            return self._record_async(result)
+        self._record(result)
+        return result
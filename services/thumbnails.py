@@ -0,0 +1,106 @@
+import asyncio
+import logging
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Dict, List, Optional
+
+from fastapi import HTTPException
+from PIL import Image, ImageOps
+
+logger = logging.getLogger(__name__)
+
+# Miniaturas de las imágenes de perfil. Decodificar y redimensionar una imagen
+# ocupa la CPU y mantiene el GIL, así que se hace en un pool de procesos al
+# subir la imagen y nunca en el event loop. Las miniaturas se guardan junto al
+# original como <nombre>_<tamaño>.webp.
+THUMBNAIL_SIZES = tuple(
+    sorted(int(size) for size in os.getenv("THUMBNAIL_SIZES", "32,64,256").split(","))
+)
+THUMBNAIL_WORKERS = int(os.getenv("THUMBNAIL_WORKERS", "2"))
+THUMBNAIL_QUALITY = int(os.getenv("THUMBNAIL_QUALITY", "80"))
+# Límite contra imágenes diseñadas para agotar la memoria al decodificarse
+THUMBNAIL_MAX_PIXELS = int(os.getenv("THUMBNAIL_MAX_PIXELS", str(40_000_000)))
+
+THUMBNAIL_MEDIA_TYPE = "image/webp"
+
+
+def thumbnail_path(path: str, size: int) -> str:
+    return f"{os.path.splitext(path)[0]}_{size}.webp"
+
+
+def thumbnail_paths(path: str) -> List[str]:
+    return [thumbnail_path(path, size) for size in THUMBNAIL_SIZES]
+
+
+def thumbnail_size(requested: int) -> Optional[int]:
+    # El tamaño más chico que cubre el pedido; None si hace falta el original
+    for size in THUMBNAIL_SIZES:
+        if size >= requested:
+            return size
+    return None
+
+
+def _render(path: str, sizes: List[int]) -> Dict[int, str]:
+    # Se ejecuta en un proceso del pool
+    Image.MAX_IMAGE_PIXELS = THUMBNAIL_MAX_PIXELS
+    with Image.open(path) as image:
+        # Respeta la orientación EXIF de las fotos tomadas con el celular;
+        # en los GIF animados solo se usa el primer cuadro
+        image = ImageOps.exif_transpose(image)
+        image = image.convert("RGBA" if image.mode in ("RGBA", "LA", "P") else "RGB")
+        results = {}
+        for size in sizes:
+            thumbnail = ImageOps.fit(image, (size, size), Image.Resampling.LANCZOS)
+            target = thumbnail_path(path, size)
+            temp_path = f"{target}.{os.getpid()}.part"
+            thumbnail.save(temp_path, "WEBP", quality=THUMBNAIL_QUALITY, method=4)
+            os.replace(temp_path, target)
+            results[size] = target
+        return results
+
+
+class ThumbnailGenerator:
+    def __init__(self, workers: int):
+        self.workers = max(1, workers)
+        self._executor = None
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            # spawn en lugar de fork: el proceso principal ya tiene hilos
+            # (threadpool, logging) y un fork podría heredar locks tomados
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return self._executor
+
+    async def generate(self, path: str, sizes=THUMBNAIL_SIZES) -> Dict[int, str]:
+        loop = asyncio.get_running_loop()
+        executor = self._get_executor()
+        try:
+            return await loop.run_in_executor(executor, _render, path, list(sizes))
+        except BrokenProcessPool:
+            # Un proceso murió (p. ej. sin memoria con una imagen enorme) y el
+            # pool ya no acepta tareas: la próxima llamada crea uno nuevo
+            logger.error("El pool de miniaturas se rompió", extra={"fields": {"path": path}})
+            if self._executor is executor:
+                self._executor = None
+                executor.shutdown(wait=False)
+            raise HTTPException(status_code=503, detail="Image processing failed, try again later")
+        except (OSError, ValueError, Image.DecompressionBombError):
+            # UnidentifiedImageError hereda de OSError
+            raise HTTPException(status_code=400, detail="Invalid or corrupt image")
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+
+thumbnail_generator = ThumbnailGenerator(THUMBNAIL_WORKERS)
+
+
+async def generate_thumbnails(path: str) -> Dict[int, str]:
+    return await thumbnail_generator.generate(path)
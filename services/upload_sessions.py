@@ -0,0 +1,187 @@
+import json
+import os
+import re
+import shutil
+import time
+import uuid
+from typing import List, Optional
+
+from fastapi import HTTPException, Request, status
+from starlette.concurrency import run_in_threadpool
+
+from services.blob_store import UPLOAD_DIR
+from services.uploads import UPLOAD_LIMITS, _MB, _discard, _too_large
+
+# Subidas reanudables: el cliente crea una sesión, envía los bloques numerados
+# en cualquier orden (y los reintenta si falla la conexión), consulta cuáles
+# llegaron y al final la cierra. Cada sesión vive en uploads/staging/<id>/ con
+# su session.json y un archivo por bloque; el estado está en disco para que
+# cualquier worker pueda atender cualquier bloque.
+STAGING_DIR = os.path.join(UPLOAD_DIR, "staging")
+UPLOAD_SESSION_CHUNK_SIZE = int(os.getenv("UPLOAD_SESSION_CHUNK_MB", "5")) * _MB
+UPLOAD_SESSION_TTL = int(os.getenv("UPLOAD_SESSION_TTL_HOURS", "24")) * 3600
+
+_SESSION_FILE = "session.json"
+_LOCK_FILE = "complete.lock"
+_SESSION_ID = re.compile(r"[0-9a-f]{32}")
+
+
+def _session_dir(upload_id: str) -> str:
+    # El id se valida antes de usarlo en una ruta
+    if not _SESSION_ID.fullmatch(upload_id):
+        raise HTTPException(status_code=404, detail="Upload session not found")
+    return os.path.join(STAGING_DIR, upload_id)
+
+
+def chunk_path(session: dict, index: int) -> str:
+    return os.path.join(STAGING_DIR, session["id"], str(index))
+
+
+def expected_chunk_size(session: dict, index: int) -> int:
+    if index == session["total_chunks"] - 1:
+        return session["size"] - index * session["chunk_size"]
+    return session["chunk_size"]
+
+
+def _write_session(session: dict) -> None:
+    directory = os.path.join(STAGING_DIR, session["id"])
+    os.makedirs(directory, exist_ok=True)
+    temp_path = os.path.join(directory, f"{_SESSION_FILE}.part")
+    with open(temp_path, "w") as handle:
+        json.dump(session, handle)
+    os.replace(temp_path, os.path.join(directory, _SESSION_FILE))
+
+
+def _read_session(upload_id: str) -> Optional[dict]:
+    try:
+        with open(os.path.join(_session_dir(upload_id), _SESSION_FILE)) as handle:
+            return json.load(handle)
+    except FileNotFoundError:
+        return None
+
+
+def _purge_expired() -> None:
+    if not os.path.isdir(STAGING_DIR):
+        return
+    cutoff = time.time() - UPLOAD_SESSION_TTL
+    for name in os.listdir(STAGING_DIR):
+        directory = os.path.join(STAGING_DIR, name)
+        try:
+            if os.stat(directory).st_mtime < cutoff:
+                shutil.rmtree(directory, ignore_errors=True)
+        except FileNotFoundError:
+            pass
+
+
+def _received(session: dict) -> List[int]:
+    directory = os.path.join(STAGING_DIR, session["id"])
+    return sorted(int(name) for name in os.listdir(directory) if name.isdigit())
+
+
+async def create_session(kind: str, owner: dict, filename: str, size: int, content_type: Optional[str]) -> dict:
+    if size <= 0:
+        raise HTTPException(status_code=400, detail="File size must be greater than zero")
+    if size > UPLOAD_LIMITS[kind]:
+        raise _too_large(kind)
+
+    # Las sesiones abandonadas se limpian al crear otras nuevas
+    await run_in_threadpool(_purge_expired)
+
+    chunk_size = UPLOAD_SESSION_CHUNK_SIZE
+    session = {
+        "id": uuid.uuid4().hex,
+        "kind": kind,
+        "filename": filename,
+        "content_type": content_type,
+        "size": size,
+        "chunk_size": chunk_size,
+        "total_chunks": (size + chunk_size - 1) // chunk_size,
+        "created": time.time(),
+        **owner,
+    }
+    await run_in_threadpool(_write_session, session)
+    return session
+
+
+async def get_session(upload_id: str) -> dict:
+    session = await run_in_threadpool(_read_session, upload_id)
+    if session is None or time.time() - session["created"] > UPLOAD_SESSION_TTL:
+        raise HTTPException(status_code=404, detail="Upload session not found")
+    return session
+
+
+async def session_status(session: dict) -> dict:
+    received = set(await run_in_threadpool(_received, session))
+    return {
+        "upload_id": session["id"],
+        "filename": session["filename"],
+        "size": session["size"],
+        "chunk_size": session["chunk_size"],
+        "total_chunks": session["total_chunks"],
+        "received": sorted(received),
+        "missing": [index for index in range(session["total_chunks"]) if index not in received],
+    }
+
+
+def _open_chunk(path: str):
+    return open(path, "wb")
+
+
+async def save_chunk(session: dict, index: int, request: Request) -> int:
+    if index < 0 or index >= session["total_chunks"]:
+        raise HTTPException(status_code=400, detail="Chunk index out of range")
+    expected = expected_chunk_size(session, index)
+
+    # Igual que en save_upload: temporal + rename, así un bloque cortado a la
+    # mitad nunca cuenta como recibido y el reintento lo sobrescribe
+    final_path = chunk_path(session, index)
+    temp_path = f"{final_path}.{uuid.uuid4().hex}.part"
+    received = 0
+    buffer = await run_in_threadpool(_open_chunk, temp_path)
+    try:
+        async for data in request.stream():
+            received += len(data)
+            if received > expected:
+                raise HTTPException(status_code=400, detail=f"Chunk {index} must be {expected} bytes")
+            await run_in_threadpool(buffer.write, data)
+        await run_in_threadpool(buffer.close)
+        if received != expected:
+            raise HTTPException(status_code=400, detail=f"Chunk {index} must be {expected} bytes")
+        await run_in_threadpool(os.replace, temp_path, final_path)
+    except BaseException:
+        await run_in_threadpool(buffer.close)
+        await run_in_threadpool(_discard, temp_path)
+        raise
+    return received
+
+
+def _lock(session: dict) -> bool:
+    try:
+        os.close(os.open(os.path.join(STAGING_DIR, session["id"], _LOCK_FILE), os.O_CREAT | os.O_EXCL))
+        return True
+    except FileExistsError:
+        return False
+
+
+def _unlock(session: dict) -> None:
+    _discard(os.path.join(STAGING_DIR, session["id"], _LOCK_FILE))
+
+
+async def begin_completion(session: dict) -> List[str]:
+    # Devuelve las rutas de los bloques en orden; solo una petición puede
+    # cerrar la sesión a la vez
+    if not await run_in_threadpool(_lock, session):
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Upload is already being completed")
+    missing = (await session_status(session))["missing"]
+    if missing:
+        await run_in_threadpool(_unlock, session)
+        raise HTTPException(status_code=400, detail=f"Missing chunks: {missing}")
+    return [chunk_path(session, index) for index in range(session["total_chunks"])]
+
+
+async def abort_completion(session: dict) -> None:
+    await run_in_threadpool(_unlock, session)
+
+
+async def discard_session(session: dict) -> None:
+    await run_in_threadpool(shutil.rmtree, os.path.join(STAGING_DIR, session["id"]), True)
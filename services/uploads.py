@@ -0,0 +1,137 @@
+import hashlib
+import os
+import time
+import uuid
+from dataclasses import dataclass
+from typing import List, Tuple
+
+from fastapi import HTTPException, UploadFile, status
+from starlette.concurrency import run_in_threadpool
+
+from services.blob_store import store_blob
+from services.metrics import UPLOAD_BYTES, UPLOAD_DEDUPLICATED, UPLOAD_DURATION, UPLOAD_REJECTED, UPLOAD_THROUGHPUT
+
+# Las subidas se copian en bloques de tamaño fijo; la escritura a disco y el
+# hash de cada bloque se hacen en el threadpool para no bloquear el event loop.
+UPLOAD_CHUNK_SIZE = int(os.getenv("UPLOAD_CHUNK_SIZE", str(1024 * 1024)))
+
+_MB = 1024 * 1024
+
+# Tamaño máximo por tipo de archivo, en bytes
+UPLOAD_LIMITS = {
+    "assignment": int(os.getenv("MAX_ASSIGNMENT_UPLOAD_MB", "50")) * _MB,
+    "resource": int(os.getenv("MAX_RESOURCE_UPLOAD_MB", "200")) * _MB,
+    "profile": int(os.getenv("MAX_PROFILE_UPLOAD_MB", "5")) * _MB,
+}
+
+
+@dataclass
+class StoredUpload:
+    path: str
+    size: int
+    sha256: str
+    deduplicated: bool = False
+
+
+def _too_large(kind: str) -> HTTPException:
+    UPLOAD_REJECTED.labels(kind, "too_large").inc()
+    return HTTPException(
+        status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+        detail=f"File exceeds the maximum size of {UPLOAD_LIMITS[kind] // _MB} MB",
+    )
+
+
+def _open_for_write(path: str):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    return open(path, "wb")
+
+
+def _write_chunk(buffer, hasher, chunk: bytes) -> None:
+    # hashlib libera el GIL con bloques grandes, así que ambas operaciones
+    # corren realmente fuera del event loop
+    hasher.update(chunk)
+    buffer.write(chunk)
+
+
+def _discard(path: str) -> None:
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+async def save_upload(file: UploadFile, destination: str, kind: str) -> StoredUpload:
+    limit = UPLOAD_LIMITS[kind]
+    # Starlette ya conoce el tamaño cuando terminó de recibir el multipart
+    if file.size is not None and file.size > limit:
+        raise _too_large(kind)
+
+    # Se escribe a un archivo temporal y al final se guarda en el almacenamiento
+    # por contenido, para que nunca quede un archivo a medio escribir en la ruta
+    # definitiva
+    temp_path = f"{destination}.{uuid.uuid4().hex}.part"
+    hasher = hashlib.sha256()
+    size = 0
+    start = time.perf_counter()
+
+    buffer = await run_in_threadpool(_open_for_write, temp_path)
+    try:
+        while True:
+            chunk = await file.read(UPLOAD_CHUNK_SIZE)
+            if not chunk:
+                break
+            size += len(chunk)
+            if size > limit:
+                raise _too_large(kind)
+            await run_in_threadpool(_write_chunk, buffer, hasher, chunk)
+        await run_in_threadpool(buffer.close)
+        deduplicated = await run_in_threadpool(store_blob, temp_path, hasher.hexdigest(), destination)
+    except BaseException:
+        await run_in_threadpool(buffer.close)
+        await run_in_threadpool(_discard, temp_path)
+        raise
+
+    _record(kind, size, time.perf_counter() - start, deduplicated)
+    return StoredUpload(path=destination, size=size, sha256=hasher.hexdigest(), deduplicated=deduplicated)
+
+
+def _record(kind: str, size: int, duration: float, deduplicated: bool) -> None:
+    UPLOAD_BYTES.labels(kind).inc(size)
+    UPLOAD_DURATION.labels(kind).observe(duration)
+    if duration > 0:
+        UPLOAD_THROUGHPUT.labels(kind).observe(size / duration)
+    if deduplicated:
+        UPLOAD_DEDUPLICATED.labels(kind).inc()
+
+
+def _assemble(chunk_paths: List[str], temp_path: str) -> Tuple[int, str]:
+    # Copia bloque a bloque: nunca hay más de UPLOAD_CHUNK_SIZE bytes en memoria
+    hasher = hashlib.sha256()
+    size = 0
+    with _open_for_write(temp_path) as buffer:
+        for path in chunk_paths:
+            with open(path, "rb") as source:
+                while True:
+                    chunk = source.read(UPLOAD_CHUNK_SIZE)
+                    if not chunk:
+                        break
+                    size += len(chunk)
+                    _write_chunk(buffer, hasher, chunk)
+    return size, hasher.hexdigest()
+
+
+async def assemble_upload(chunk_paths: List[str], destination: str, kind: str) -> StoredUpload:
+    # Une los bloques de una subida reanudable y la guarda igual que save_upload
+    temp_path = f"{destination}.{uuid.uuid4().hex}.part"
+    start = time.perf_counter()
+    try:
+        size, sha256 = await run_in_threadpool(_assemble, chunk_paths, temp_path)
+        if size > UPLOAD_LIMITS[kind]:
+            raise _too_large(kind)
+        deduplicated = await run_in_threadpool(store_blob, temp_path, sha256, destination)
+    except BaseException:
+        await run_in_threadpool(_discard, temp_path)
+        raise
+
+    _record(kind, size, time.perf_counter() - start, deduplicated)
+    return StoredUpload(path=destination, size=size, sha256=sha256, deduplicated=deduplicated)
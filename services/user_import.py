@@ -0,0 +1,196 @@
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from typing import Any, Dict, List
+
+from db import prisma_client
+from models.base import UserBase
+from services.bulk_import import BULK_CHUNK_SIZE, BULK_LOOKUP_SIZE, chunked, parse_csv, row_report, summarize, validate_row
+from services.passwords import _hash_many
+
+# Alta masiva de usuarios. Lo caro es bcrypt (~250 ms por contraseña), así que
+# los hashes se calculan en un pool de procesos con todos los núcleos; la
+# unicidad se verifica con una sola consulta por conjuntos y las inserciones van
+# con create_many por bloques.
+USER_IMPORT_HASH_WORKERS = int(os.getenv("USER_IMPORT_HASH_WORKERS", str(os.cpu_count() or 1)))
+
+_executor = None
+
+
+def _get_executor() -> ProcessPoolExecutor:
+    global _executor
+    if _executor is None:
+        # spawn: el proceso principal ya tiene hilos y no conviene hacer fork;
+        # los procesos solo importan services.passwords
+        _executor = ProcessPoolExecutor(
+            max_workers=max(1, USER_IMPORT_HASH_WORKERS),
+            mp_context=multiprocessing.get_context("spawn"),
+        )
+    return _executor
+
+
+def shutdown() -> None:
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=True)
+        _executor = None
+
+
+async def hash_passwords(passwords: List[str]) -> List[str]:
+    if not passwords:
+        return []
+    loop = asyncio.get_running_loop()
+    workers = max(1, USER_IMPORT_HASH_WORKERS)
+    # Varias tareas por proceso para repartir bien la carga
+    size = max(1, -(-len(passwords) // (workers * 4)))
+    batches = await asyncio.gather(*(
+        loop.run_in_executor(_get_executor(), _hash_many, list(batch))
+        for batch in chunked(passwords, size)
+    ))
+    return [hashed for batch in batches for hashed in batch]
+
+
+def new_user_data(user: UserBase, hashed_password: str, now: datetime) -> Dict[str, Any]:
+    return {
+        "username": user.username,
+        "password": hashed_password,
+        "firstname": user.firstname,
+        "lastname": user.lastname,
+        "email": user.email,
+        "institution": user.institution,
+        "department": user.department,
+        "auth": "manual",
+        "confirmed": False,
+        "lang": "es",
+        "timezone": "99",
+        "deleted": False,
+        "suspended": False,
+        "mnethostid": 1,
+        "timecreated": now,
+        "timemodified": now
+    }
+
+
+async def _taken(usernames: List[str], emails: List[str]):
+    # Usuarios o emails ya registrados, en una consulta por bloque de la lista IN
+    taken_usernames, taken_emails = set(), set()
+    for usernames_chunk, emails_chunk in zip(
+        chunked(usernames, BULK_LOOKUP_SIZE), chunked(emails, BULK_LOOKUP_SIZE)
+    ):
+        users = await prisma_client.user.find_many(
+            where={
+                "OR": [
+                    {"username": {"in": list(usernames_chunk)}},
+                    {"email": {"in": list(emails_chunk)}}
+                ]
+            }
+        )
+        taken_usernames.update(user.username for user in users)
+        taken_emails.update(user.email for user in users)
+    return taken_usernames, taken_emails
+
+
+async def import_users(rows: List[Dict[str, Any]]) -> Dict[str, Any]:
+    started = time.perf_counter()
+    report = [None] * len(rows)
+    valid = []
+    for index, row in enumerate(rows):
+        user, error = validate_row(UserBase, row)
+        if error:
+            report[index] = row_report(index, "error", error, username=row.get("username"))
+        else:
+            valid.append((index, user))
+
+    taken_usernames, taken_emails = await _taken(
+        [user.username for _, user in valid], [user.email for _, user in valid]
+    )
+    pending = []
+    batch_usernames, batch_emails = set(), set()
+    for index, user in valid:
+        if user.username in taken_usernames or user.email in taken_emails:
+            report[index] = row_report(index, "skipped", "Username or email already exists", username=user.username)
+        elif user.username in batch_usernames or user.email in batch_emails:
+            report[index] = row_report(index, "skipped", "Duplicate username or email in this import", username=user.username)
+        else:
+            batch_usernames.add(user.username)
+            batch_emails.add(user.email)
+            pending.append((index, user))
+    validated = time.perf_counter()
+
+    hashed_passwords = await hash_passwords([user.password for _, user in pending])
+    hashed = time.perf_counter()
+
+    now = datetime.utcnow()
+    for batch in chunked(list(zip(pending, hashed_passwords)), BULK_CHUNK_SIZE):
+        try:
+            async with prisma_client.tx() as transaction:
+                await transaction.user.create_many(
+                    data=[new_user_data(user, hashed_password, now) for (_, user), hashed_password in batch]
+                )
+            result, detail = "created", None
+        except Exception as e:
+            # Por ejemplo, un usuario creado por otra petición entre la validación y la inserción
+            result, detail = "error", f"Error creating user: {str(e)}"
+        for (index, user), _ in batch:
+            report[index] = row_report(index, result, detail, username=user.username)
+    finished = time.perf_counter()
+
+    summary = summarize(report)
+    elapsed = finished - started
+    summary["timing"] = {
+        "validation_seconds": round(validated - started, 3),
+        "hashing_seconds": round(hashed - validated, 3),
+        "insert_seconds": round(finished - hashed, 3),
+        "total_seconds": round(elapsed, 3),
+        "users_per_second": round(summary["created"] / elapsed, 1) if elapsed > 0 else None,
+        "hash_workers": USER_IMPORT_HASH_WORKERS,
+    }
+    return {"summary": summary, "rows": report}
+
+
+def _read_file(path: str) -> List[Dict[str, Any]]:
+    with open(path, encoding="utf-8-sig") as handle:
+        text = handle.read()
+    if path.lower().endswith(".json"):
+        return json.loads(text)
+    return parse_csv(text)
+
+
+async def _main(args) -> None:
+    rows = _read_file(args.path)
+    await prisma_client.connect()
+    try:
+        result = await import_users(rows)
+    finally:
+        await prisma_client.disconnect()
+        shutdown()
+
+    summary = result["summary"]
+    timing = summary["timing"]
+    print(
+        f"Usuarios: {summary['total']}, creados: {summary['created']}, "
+        f"omitidos: {summary['skipped']}, con error: {summary['failed']}"
+    )
+    print(
+        f"Tiempo: {timing['total_seconds']} s (validación {timing['validation_seconds']} s, "
+        f"hash {timing['hashing_seconds']} s con {timing['hash_workers']} procesos, "
+        f"inserción {timing['insert_seconds']} s), {timing['users_per_second']} usuarios/s"
+    )
+    for row in result["rows"]:
+        if row["result"] != "created":
+            print(f"  fila {row['row']} ({row.get('username')}): {row['result']} - {row.get('detail')}")
+    if args.report:
+        with open(args.report, "w", encoding="utf-8") as handle:
+            json.dump(result, handle, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Alta masiva de usuarios desde un CSV o JSON")
+    parser.add_argument("path", help="Archivo .csv (username,password,firstname,lastname,email,...) o .json")
+    parser.add_argument("--report", help="Guardar el resultado por fila en un archivo JSON")
+    asyncio.run(_main(parser.parse_args()))
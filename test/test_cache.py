@@ -0,0 +1,78 @@
+import asyncio
+
+import pytest
+
+from services.cache import TTLCache
+
+
+def test_waiter_retries_when_shared_load_is_cancelled():
+    async def scenario():
+        cache = TTLCache("test_cancel", ttl=60)
+        started = asyncio.Event()
+
+        async def slow_loader():
+            started.set()
+            await asyncio.sleep(60)
+            return "slow"
+
+        async def fast_loader():
+            return "fast"
+
+        first = asyncio.create_task(cache.get_or_load("k", slow_loader))
+        await started.wait()
+        second = asyncio.create_task(cache.get_or_load("k", fast_loader))
+        await asyncio.sleep(0)
+
+        first.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await first
+        # Antes quedaba esperando para siempre un future sin resolver
+        assert await asyncio.wait_for(second, timeout=1) == "fast"
+        assert cache.get("k") == "fast"
+
+    asyncio.run(scenario())
+
+
+def test_cancelled_waiter_does_not_cancel_shared_load():
+    async def scenario():
+        cache = TTLCache("test_cancel_waiter", ttl=60)
+        release = asyncio.Event()
+
+        async def loader():
+            await release.wait()
+            return "value"
+
+        first = asyncio.create_task(cache.get_or_load("k", loader))
+        await asyncio.sleep(0)
+        second = asyncio.create_task(cache.get_or_load("k", loader))
+        await asyncio.sleep(0)
+
+        second.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await second
+        release.set()
+        assert await asyncio.wait_for(first, timeout=1) == "value"
+
+    asyncio.run(scenario())
+
+
+def test_loader_error_is_shared_with_waiters():
+    async def scenario():
+        cache = TTLCache("test_error", ttl=60)
+        release = asyncio.Event()
+
+        async def failing_loader():
+            await release.wait()
+            raise ValueError("boom")
+
+        first = asyncio.create_task(cache.get_or_load("k", failing_loader))
+        await asyncio.sleep(0)
+        second = asyncio.create_task(cache.get_or_load("k", failing_loader))
+        await asyncio.sleep(0)
+        release.set()
+
+        for task in (first, second):
+            with pytest.raises(ValueError):
+                await asyncio.wait_for(task, timeout=1)
+
+    asyncio.run(scenario())
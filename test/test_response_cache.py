@@ -0,0 +1,31 @@
+from services.response_cache import ResponseCache
+
+
+def test_purge_during_execution_skips_stale_result():
+    cache = ResponseCache("test_purge_race", maxsize=10)
+    generation = cache.begin()
+    # Una mutación purga el tipo mientras la consulta todavía se ejecuta
+    cache.purge_local({"Course"})
+    cache.set("k", {"course": "viejo"}, 60, {"Course", "Course:1"}, since=generation)
+    cache.end(generation)
+    assert cache.get("k") is None
+
+
+def test_purge_of_other_tags_keeps_result():
+    cache = ResponseCache("test_purge_other", maxsize=10)
+    generation = cache.begin()
+    cache.purge_local({"User"})
+    cache.set("k", {"course": "nuevo"}, 60, {"Course"}, since=generation)
+    cache.end(generation)
+    assert cache.get("k") == {"course": "nuevo"}
+
+
+def test_execution_started_after_purge_is_stored():
+    cache = ResponseCache("test_purge_after", maxsize=10)
+    before = cache.begin()
+    cache.purge_local({"Course"})
+    after = cache.begin()
+    cache.set("k", "nuevo", 60, {"Course"}, since=after)
+    cache.end(before)
+    cache.end(after)
+    assert cache.get("k") == "nuevo"